@@ -0,0 +1,94 @@
+"""
+Compare the per-item cost of adding the ``index`` asset and serializing an item
+in the ETL, with and without copying the item.
+
+    python benchmarks/etl_serialization.py [--number N]
+
+The item is created from a synthetic flood map with statistics, so it has
+``cube:dimensions`` and a depth histogram like the real items.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+import pystac
+import xarray as xr
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "azure"))
+
+import etl  # noqa: E402
+
+from stactools.deltares import stac, validation  # noqa: E402
+
+URL = "https://deltaresfloodssa.blob.core.windows.net/floods/v2021.06/global/LIDAR/5km/GFM_global_LIDAR5km_2018slr_rp0000.nc"  # noqa: E501
+ENDPOINT = "https://deltaresfloodssa.blob.core.windows.net/references"
+
+
+def make_item() -> pystac.Item:
+    rng = np.random.default_rng(0)
+    inun = rng.gamma(0.5, 2.0, size=(1, 360, 720)).astype("float32")
+    inun[inun < 1] = np.nan
+    ds = xr.Dataset(
+        {"inun": (("time", "lat", "lon"), inun, {"units": "m"})},
+        coords={
+            "time": (
+                "time",
+                np.array(["2010-01-01"], dtype="datetime64[ns]"),
+                {"standard_name": "time", "axis": "T"},
+            ),
+            "lat": (
+                "lat",
+                np.linspace(89.75, -89.75, 360),
+                {"standard_name": "latitude", "axis": "Y"},
+            ),
+            "lon": (
+                "lon",
+                np.linspace(-179.75, 179.75, 720),
+                {"standard_name": "longitude", "axis": "X"},
+            ),
+        },
+        attrs={"crs": "EPSG:4326"},
+    )
+    # xstac validates the item, so use the cached schemas.
+    validation.use_cached_schemas()
+    return stac.create_item_from_dataset(ds, URL, statistics=True)
+
+
+def before(item: pystac.Item) -> bytes:
+    item, _ = etl.do_one_sansio(item, ENDPOINT, should_make_refs=False)
+    return json.dumps(item.to_dict()).encode()
+
+
+def after(item: pystac.Item) -> bytes:
+    item, _ = etl.do_one_sansio(item, ENDPOINT, should_make_refs=False, copy=False)
+    data: bytes = etl.item_to_json_bytes(item)
+    return data
+
+
+def main(args: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=2000)
+    number = parser.parse_args(args).number
+
+    template = make_item()
+    assert json.loads(before(template.clone())) == json.loads(after(template.clone()))
+
+    # Both paths start from a freshly created item, so each run gets a copy
+    # made outside the timed section.
+    results = {}
+    for name, func in [("before", before), ("after", after)]:
+        items = [template.clone() for _ in range(number)]
+        it = iter(items)
+        seconds = timeit.timeit(lambda: func(next(it)), number=number)
+        results[name] = seconds / number * 1e6
+        print(f"{name:>6}: {results[name]:8.1f} µs per item")
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Synthetic datasets with the layout of the Deltares flood and water
+availability NetCDF files, for benchmarking without network access.
+
+The values are random but deterministic, so the files (and the items created
+from them) are the same on every run.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+#: Flood map grids, by name, as (lat, lon) sizes. The real 5km, 1km and 90m
+#: maps are 3600 x 7200 and larger; these keep the layout at sizes that
+#: are quick to generate.
+FLOOD_SIZES = {
+    "small": (180, 360),
+    "medium": (900, 1800),
+    "large": (3600, 7200),
+}
+#: Water availability files, by name, as (years, reservoirs).
+AVAILABILITY_SIZES = {
+    "small": (1, 10),
+    "medium": (10, 50),
+    "large": (50, 100),
+}
+AVAILABILITY_VARIABLES = {
+    "P_res": "mm per day",
+    "Ea_res": "mm per day",
+    "Qout_res": "m3 per s",
+    "Qin_res": "m3 per s",
+    "S_res": "m3",
+    "FracFull": "m3",
+    "P": "mm per day",
+    "ETa": "mm per day",
+    "Snow": "mm",
+    "Melt": "mm per day",
+    "Temp": "degrees C",
+    "PET": "mm per day",
+}
+KSATHORFRAC = [5, 20, 50, 100, 250]
+
+FLOOD_URL = (
+    "https://deltaresfloodssa.blob.core.windows.net/floods/v2021.06/global/"
+    "NASADEM/{resolution}/GFM_global_NASADEM{resolution}_2050slr_rp0100.nc"
+)
+AVAILABILITY_URL = (
+    "https://deltaresreservoirssa.blob.core.windows.net/reservoirs/v2021.12/"
+    "reservoirs_{name}.nc"
+)
+
+
+def flood_dataset(n_lat: int, n_lon: int, seed: int = 0) -> xr.Dataset:
+    """
+    A global flood map: ``inun`` on ``time`` / ``lat`` / ``lon``, with patches
+    covering about 5% of the cells flooded and the rest NaN, and a
+    ``projection`` grid mapping variable.
+    """
+    rng = np.random.default_rng(seed)
+    dlat, dlon = 180 / n_lat, 360 / n_lon
+    # Flooding is in contiguous patches, like coastal flooding, rather than
+    # scattered cells.
+    y, x = np.meshgrid(
+        np.linspace(0, 12 * np.pi, n_lat),
+        np.linspace(0, 24 * np.pi, n_lon),
+        indexing="ij",
+    )
+    flooded = np.sin(y) * np.cos(x) + 0.1 * np.sin(3.7 * x + 1.3 * y) > 0.8
+    inun = np.full((1, n_lat, n_lon), np.nan, dtype="float32")
+    inun[0, flooded] = rng.gamma(0.5, 2.0, size=int(flooded.sum()))
+    return xr.Dataset(
+        {
+            "inun": (
+                ("time", "lat", "lon"),
+                inun,
+                {
+                    "units": "m",
+                    "standard_name": "water_surface_height_above_reference_datum",
+                    "long_name": "Coastal flooding",
+                    "grid_mapping": "projection",
+                },
+            ),
+            "projection": (
+                (),
+                np.int32(0),
+                {
+                    "long_name": "wgs84",
+                    "EPSG_code": "EPSG:4326",
+                    "grid_mapping_name": "latitude_longitude",
+                },
+            ),
+        },
+        coords={
+            "time": (
+                "time",
+                pd.to_datetime(["2010-01-01"]),
+                {"standard_name": "time", "axis": "T"},
+            ),
+            "lat": (
+                "lat",
+                np.linspace(90 - dlat / 2, -90 + dlat / 2, n_lat),
+                {"standard_name": "latitude", "units": "degrees_north", "axis": "Y"},
+            ),
+            "lon": (
+                "lon",
+                np.linspace(-180 + dlon / 2, 180 - dlon / 2, n_lon),
+                {"standard_name": "longitude", "units": "degrees_east", "axis": "X"},
+            ),
+        },
+    )
+
+
+def availability_dataset(years: int, n_reservoirs: int, seed: int = 0) -> xr.Dataset:
+    """
+    A water availability file: daily values of each variable in
+    :data:`AVAILABILITY_VARIABLES` on ``time`` / ``GrandID`` /
+    ``ksathorfrac``, and the reservoirs' locations.
+    """
+    rng = np.random.default_rng(seed)
+    time = pd.date_range("1970-01-01", periods=365 * years, freq="D")
+    shape = (len(time), n_reservoirs, len(KSATHORFRAC))
+    data_vars: dict[str, Any] = {
+        name: (
+            ("time", "GrandID", "ksathorfrac"),
+            rng.random(shape, dtype="float32"),
+            {"units": units},
+        )
+        for name, units in AVAILABILITY_VARIABLES.items()
+    }
+    data_vars["latitude"] = (
+        ("GrandID",),
+        rng.uniform(-60, 70, n_reservoirs),
+        {"units": "degrees", "description": "Latitude of reservoir"},
+    )
+    data_vars["longitude"] = (
+        ("GrandID",),
+        rng.uniform(-180, 180, n_reservoirs),
+        {"units": "degrees", "description": "Longitude of reservoir"},
+    )
+    return xr.Dataset(
+        data_vars,
+        coords={
+            "time": time,
+            "GrandID": np.arange(1, n_reservoirs + 1),
+            "ksathorfrac": KSATHORFRAC,
+        },
+    )
+
+
+def write_netcdf(ds: xr.Dataset, path: str) -> str:
+    """Write a dataset like the source files, as compressed NetCDF4."""
+    encoding = {
+        name: {"zlib": True, "complevel": 4}
+        for name, var in ds.data_vars.items()
+        if var.ndim > 1
+    }
+    ds.to_netcdf(path, engine="h5netcdf", encoding=encoding)
+    return path
+
+
+def flood_file(directory: str, size: str) -> tuple[str, str]:
+    """
+    Write the flood map of a size to ``directory``, unless it's already there.
+
+    Returns
+    -------
+    filename, url
+        The local file, and a URL in the form of the real files for it.
+    """
+    # The resolution only makes the item IDs differ by size.
+    resolution = {"small": "5km", "medium": "1km", "large": "90m"}[size]
+    filename = os.path.join(directory, f"floods-{size}.nc")
+    if not os.path.exists(filename):
+        write_netcdf(flood_dataset(*FLOOD_SIZES[size]), filename)
+    return filename, FLOOD_URL.format(resolution=resolution)
+
+
+def availability_file(directory: str, size: str) -> tuple[str, str]:
+    """Like :func:`flood_file`, for a water availability file."""
+    filename = os.path.join(directory, f"reservoirs-{size}.nc")
+    if not os.path.exists(filename):
+        write_netcdf(availability_dataset(*AVAILABILITY_SIZES[size]), filename)
+    return filename, AVAILABILITY_URL.format(name=size)
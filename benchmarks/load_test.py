@@ -0,0 +1,345 @@
+"""
+Measure the throughput of the ETL's ``do_one`` offline.
+
+    python benchmarks/load_test.py --files 200 --workers 8 [--latency 0.05]
+
+Synthetic NetCDF files (see ``fixtures.py``) are served by a local HTTP
+server that supports range requests, and the ``references`` and ``*-stac``
+containers are replaced by an in-process stand-in for Azure Blob Storage.
+Everything else is the real ``do_one`` path: downloading the file, opening
+it, creating the item, making the Kerchunk references and serializing and
+"uploading" the references and item.
+
+Latency can be added to each HTTP request and blob operation, and the HTTP
+server's bandwidth and number of concurrent connections can be limited, to
+see how the ETL behaves against slow or throttled storage.
+
+Item creation validates the items, so the schemas are read from the cache
+of :mod:`stactools.deltares.validation`.
+"""
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import functools
+import http.server
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Iterator
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "azure"))
+
+import etl  # noqa: E402
+import fixtures  # noqa: E402
+
+from stactools.deltares import telemetry, validation  # noqa: E402
+
+BLOCK_SIZE = 2**16
+RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Serve files from a directory, supporting single byte-range requests,
+    with optional latency, bandwidth and connection limits.
+
+    The limits are attributes of the server: ``latency`` (seconds before
+    each response), ``bandwidth`` (bytes per second per response, or
+    ``None``) and ``connections`` (a semaphore bounding the requests being
+    served at once).
+    """
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def send_head(self) -> Any:
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = RANGE.match(self.headers.get("Range", ""))
+        if match:
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            elif last:
+                start = max(size - int(last), 0)
+            if start > end or start >= size:
+                self.send_error(416)
+                return None
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "application/x-netcdf")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        f = open(path, "rb")
+        f.seek(start)
+        self.remaining = end - start + 1
+        return f
+
+    def copyfile(self, source: Any, outputfile: Any) -> None:
+        bandwidth = getattr(self.server, "bandwidth", None)
+        while self.remaining > 0:
+            block = source.read(min(BLOCK_SIZE, self.remaining))
+            if not block:
+                break
+            outputfile.write(block)
+            self.remaining -= len(block)
+            if bandwidth:
+                time.sleep(len(block) / bandwidth)
+
+    def handle_one_request(self) -> None:
+        with self.server.connections:  # type: ignore[attr-defined]
+            time.sleep(self.server.latency)  # type: ignore[attr-defined]
+            super().handle_one_request()
+
+
+def serve(
+    directory: str,
+    latency: float = 0.0,
+    bandwidth: float | None = None,
+    max_connections: int = 64,
+) -> tuple[http.server.ThreadingHTTPServer, str]:
+    """Serve ``directory`` on a background thread, returning the server and URL."""
+    handler = functools.partial(RangeRequestHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.latency = latency  # type: ignore[attr-defined]
+    server.bandwidth = bandwidth  # type: ignore[attr-defined]
+    server.connections = threading.BoundedSemaphore(  # type: ignore[attr-defined]
+        max_connections
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class FakeBlobClient:
+    def __init__(self, container: FakeContainerClient, name: str) -> None:
+        self.container = container
+        self.name = name
+
+    def __enter__(self) -> FakeBlobClient:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def exists(self) -> bool:
+        time.sleep(self.container.latency)
+        return self.name in self.container.blobs
+
+    def upload_blob(self, data: Any, overwrite: bool = False, **kwargs: Any) -> None:
+        time.sleep(self.container.latency)
+        if not isinstance(data, bytes):
+            data = data.read()
+        if not overwrite and self.name in self.container.blobs:
+            raise FileExistsError(self.name)
+        self.container.blobs[self.name] = data
+
+
+class FakeContainerClient:
+    """
+    An in-memory stand-in for :class:`azure.storage.blob.ContainerClient`,
+    with the methods the ETL uses.
+
+    The blobs of each container are kept in ``store``, keyed by account URL
+    and container name, so clients created for the same container share
+    them. Each blob operation takes ``latency`` seconds.
+    """
+
+    def __init__(
+        self,
+        account_url: str,
+        container_name: str,
+        credential: Any = None,
+        store: dict[tuple[str, str], dict[str, bytes]] | None = None,
+        latency: float = 0.0,
+    ) -> None:
+        self.account_url = account_url
+        self.container_name = container_name
+        self.latency = latency
+        store = {} if store is None else store
+        self.blobs = store.setdefault((account_url, container_name), {})
+
+    @property
+    def primary_endpoint(self) -> str:
+        return f"{self.account_url}/{self.container_name}"
+
+    def get_blob_client(self, name: str) -> FakeBlobClient:
+        return FakeBlobClient(self, name)
+
+    def list_blobs(self, name_starts_with: str | None = None) -> Iterator[Any]:
+        time.sleep(self.latency)
+        for name, data in list(self.blobs.items()):
+            if name.startswith(name_starts_with or ""):
+                yield argparse.Namespace(name=name, size=len(data))
+
+
+def urls(n: int) -> list[str]:
+    """``n`` distinct flood map URLs, differing in the return period."""
+    return [
+        fixtures.FLOOD_URL.format(resolution="5km").replace("rp0100", f"rp{i:04d}")
+        for i in range(n)
+    ]
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    validation.use_cached_schemas()
+    tmpdir = tempfile.mkdtemp()
+    server = None
+    try:
+        filename, _ = fixtures.flood_file(tmpdir, args.size)
+        server, server_url = serve(
+            tmpdir,
+            latency=args.latency,
+            bandwidth=args.bandwidth,
+            max_connections=args.max_connections,
+        )
+        file_url = f"{server_url}/{os.path.basename(filename)}"
+        store: dict[tuple[str, str], dict[str, bytes]] = {}
+        account_url = "https://deltaresfloodssa.blob.core.windows.net"
+        do_one = functools.partial(
+            etl.do_one_recorded,
+            references_container_client_options=dict(
+                account_url=account_url, container_name="references"
+            ),
+            stac_container_client_options=dict(
+                account_url=account_url, container_name="floods-stac"
+            ),
+            kind="floods",
+            transform_href=functools.partial(_local_url, file_url),
+            item_kwargs={"statistics": args.statistics},
+            container_client_class=functools.partial(
+                FakeContainerClient, store=store, latency=args.blob_latency
+            ),
+            max_memory_size=args.max_memory_size,
+        )
+
+        pool_class = (
+            concurrent.futures.ProcessPoolExecutor
+            if args.processes
+            else concurrent.futures.ThreadPoolExecutor
+        )
+        spans: list[telemetry.Span] = []
+        latencies = []
+        failures = 0
+        start = time.perf_counter()
+        with pool_class(args.workers) as pool:
+            futures = {
+                pool.submit(_timed, do_one, url): url for url in urls(args.files)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    seconds, (_, item_spans, _) = future.result()
+                except Exception as e:
+                    print(f"{futures[future]}: {e}", file=sys.stderr)
+                    failures += 1
+                    continue
+                latencies.append(seconds)
+                spans.extend(item_spans)
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(tmpdir)
+
+    nbytes = sum(span.bytes_read + span.bytes_written for span in spans)
+    percentiles: list[float] = (
+        np.percentile(latencies, telemetry.PERCENTILES).tolist() if latencies else []
+    )
+    report = {
+        "files": args.files,
+        "failures": failures,
+        "workers": args.workers,
+        "seconds": elapsed,
+        "items_per_second": len(latencies) / elapsed,
+        "bytes_per_second": nbytes / elapsed,
+        "latency": {
+            f"p{q}": float(value)
+            for q, value in zip(telemetry.PERCENTILES, percentiles)
+        },
+        "stages": telemetry.summarize(spans),
+    }
+    print(telemetry.format_report(spans))
+    print(
+        f"{len(latencies)} items, {failures} failures, in {elapsed:.1f} s: "
+        f"{report['items_per_second']:.2f} items/s, "
+        f"{report['bytes_per_second'] / 2**20:.1f} MiB/s, "
+        + ", ".join(f"{k} {v:.2f} s" for k, v in report["latency"].items())
+    )
+    return report
+
+
+def _local_url(file_url: str, href: str) -> str:
+    return file_url
+
+
+def _timed(func: Any, *args: Any) -> tuple[float, Any]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="Use processes instead of threads. Each process has its own blobs.",
+    )
+    parser.add_argument("--size", choices=list(fixtures.FLOOD_SIZES), default="small")
+    parser.add_argument("--statistics", action="store_true")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to each request"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        default=None,
+        help="Bytes per second per response from the HTTP server",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=64,
+        help="Requests the HTTP server serves at once",
+    )
+    parser.add_argument(
+        "--blob-latency",
+        type=float,
+        default=0.0,
+        help="Seconds added to each blob operation",
+    )
+    parser.add_argument(
+        "--max-memory-size",
+        type=int,
+        default=etl.DEFAULT_MAX_MEMORY_SIZE,
+        help="Read files of up to this many bytes into memory (0 for none)",
+    )
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
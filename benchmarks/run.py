@@ -0,0 +1,242 @@
+"""
+Benchmark item creation, Kerchunk references, the ETL's ``index`` asset and
+item serialization on synthetic Deltares-shaped files.
+
+    python benchmarks/run.py run [--sizes small medium] [--output results.json]
+    python benchmarks/run.py compare base.json head.json
+
+``run`` writes the timings, with the commit, Python and library versions,
+to a JSON file. ``compare`` prints the ratio of each benchmark's median
+between two such files, so a change can be judged by running the suite
+before and after it on the same machine.
+
+Item creation validates the items, so the schemas are read from the cache
+of :mod:`stactools.deltares.validation` (run ``stac deltares fetch-schemas``
+once beforehand when working offline).
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Callable, Iterator
+
+import xarray as xr
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "azure"))
+
+import etl  # noqa: E402
+import fixtures  # noqa: E402
+
+from stactools.deltares import stac, validation  # noqa: E402
+from stactools.deltares.availability import stac as availability_stac  # noqa: E402
+
+PACKAGES = [
+    "stactools-deltares",
+    "pystac",
+    "xarray",
+    "xstac",
+    "h5netcdf",
+    "h5py",
+    "kerchunk",
+    "numpy",
+]
+ENDPOINT = "https://deltaresfloodssa.blob.core.windows.net/references"
+#: A benchmark is reported as a regression or improvement by ``compare`` when
+#: its median changes by more than this factor.
+DEFAULT_THRESHOLD = 1.1
+
+
+def benchmarks(directory: str, size: str) -> Iterator[tuple[str, Callable[[], Any]]]:
+    """The benchmarks for one size, as (name, function) pairs."""
+    filename, url = fixtures.flood_file(directory, size)
+    ds = xr.open_dataset(filename, engine="h5netcdf")
+    yield "floods.create_item", lambda: stac.create_item_from_dataset(ds, url)
+    yield "floods.create_item_statistics", lambda: stac.create_item_from_dataset(
+        ds, url, statistics=True
+    )
+    yield "floods.create_item_footprint", lambda: stac.create_item_from_dataset(
+        ds, url, footprint=True
+    )
+
+    item = stac.create_item_from_dataset(ds, url, statistics=True)
+    yield "floods.make_refs", lambda: etl.make_refs(item, filename=filename)
+    yield "floods.do_one_sansio", lambda: etl.do_one_sansio(
+        item, ENDPOINT, should_make_refs=False
+    )
+    # Adding the asset again replaces it, so the item can be reused.
+    yield "floods.do_one_sansio_no_copy", lambda: etl.do_one_sansio(
+        item, ENDPOINT, should_make_refs=False, copy=False
+    )
+    yield "floods.clone", item.clone
+    yield "floods.to_json", lambda: json.dumps(item.to_dict()).encode()
+    yield "floods.item_to_json_bytes", functools.partial(etl.item_to_json_bytes, item)
+
+    filename, url = fixtures.availability_file(directory, size)
+    ds = xr.open_dataset(filename, engine="h5netcdf")
+    yield "availability.create_item", lambda: (
+        availability_stac.create_item_from_dataset(ds, url)
+    )
+    yield "availability.create_item_statistics", lambda: (
+        availability_stac.create_item_from_dataset(ds, url, statistics=True)
+    )
+    item = availability_stac.create_item_from_dataset(ds, url)
+    yield "availability.make_refs", lambda: etl.make_refs(item, filename=filename)
+    yield "availability.to_json", lambda: json.dumps(item.to_dict()).encode()
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float) -> dict[str, Any]:
+    """
+    Time a function, calling it enough times per repeat to take at least
+    ``min_time`` seconds, like ``python -m timeit``.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def environment() -> dict[str, Any]:
+    def git(*args: str) -> str:
+        try:
+            return subprocess.run(
+                ["git", *args],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    versions: dict[str, str | None] = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def run(args: argparse.Namespace) -> None:
+    validation.use_cached_schemas()
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        directory = args.data_dir or tmpdir
+        os.makedirs(directory, exist_ok=True)
+        for size in args.sizes:
+            for name, func in benchmarks(directory, size):
+                if args.filter and args.filter not in name:
+                    continue
+                result = {"name": name, "size": size}
+                result.update(measure(func, args.repeat, args.min_time))
+                results.append(result)
+                print(
+                    f"{name:<40}{size:<8}{result['median'] * 1e3:>12.3f} ms "
+                    f"(min {result['min'] * 1e3:.3f}, n={result['number']})"
+                )
+
+    output = {**environment(), "results": results}
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+def compare(args: argparse.Namespace) -> None:
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    print(f"base: {base['commit'][:10]}{' (dirty)' if base['dirty'] else ''}")
+    print(f"head: {head['commit'][:10]}{' (dirty)' if head['dirty'] else ''}")
+    if base["platform"] != head["platform"]:
+        print("warning: the results are from different platforms")
+
+    base_results = {(r["name"], r["size"]): r for r in base["results"]}
+    regressions = 0
+    for result in head["results"]:
+        key = (result["name"], result["size"])
+        if key not in base_results:
+            continue
+        ratio = result["median"] / base_results[key]["median"]
+        if ratio > args.threshold:
+            flag = "slower"
+            regressions += 1
+        elif ratio < 1 / args.threshold:
+            flag = "faster"
+        else:
+            flag = ""
+        print(
+            f"{key[0]:<40}{key[1]:<8}{base_results[key]['median'] * 1e3:>12.3f}"
+            f"{result['median'] * 1e3:>12.3f} ms{ratio:>8.2f}x  {flag}"
+        )
+    if regressions:
+        sys.exit(1)
+
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(fixtures.FLOOD_SIZES),
+        default=["small", "medium"],
+    )
+    run_parser.add_argument("--filter", default=None, help="Only run matching names")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="Minimum seconds per repeat",
+    )
+    run_parser.add_argument(
+        "--data-dir",
+        default=None,
+        help="Directory to keep the synthetic files in between runs",
+    )
+    run_parser.add_argument("--output", default="benchmarks.json")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare the results of two runs"
+    )
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.set_defaults(func=compare)
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.func(args)
@@ -1,32 +1,97 @@
 from __future__ import annotations
 
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import io
+import itertools
 import json
 import logging
+import math
 import os
+import queue
 import tempfile
+import time
+import urllib.parse
 import urllib.request
-from typing import Any, Callable
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
 
 import dask.distributed
 import dask_gateway
+import fsspec
+import numpy as np
 import planetary_computer.sas
 import pystac
 import xarray as xr
 
 import azure.storage.blob
+from stactools.deltares import bulk, download, profiling, telemetry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
+#: Files of up to this many bytes are read into memory by :func:`do_one`,
+#: rather than saved to a temporary file.
+DEFAULT_MAX_MEMORY_SIZE = 2**28
+#: Number of prefixes listed at once by :func:`iter_blobs`.
+DEFAULT_LISTING_WORKERS = 8
+
+# Items and references are trees built fresh for each file, so the check for
+# circular references is skipped. The output matches ``json.dumps``.
+_encoder = json.JSONEncoder(check_circular=False)
+
+
+def to_json_bytes(obj: Any) -> bytes:
+    """
+    Serialize to JSON, with orjson if it's installed.
+
+    orjson is several times faster than the standard library. Its output is
+    compact, writes floats like ``1e-5`` rather than ``1e-05``, and writes
+    non-finite floats as ``null``, so it parses to the same values. Without
+    orjson, or for objects it can't serialize (like integers over 64 bits),
+    the output is the same bytes as ``json.dumps(obj).encode()``.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return _encoder.encode(obj).encode()
+
 
-def make_refs(item: pystac.Item, filename: str | None = None) -> dict[str, Any]:
+def item_to_json_bytes(item: pystac.Item) -> bytes:
+    """
+    Serialize an item like ``json.dumps(item.to_dict())``, with
+    :func:`to_json_bytes`.
+
+    The ETL's items don't have links, so the hrefs don't need transforming.
+    """
+    return to_json_bytes(item.to_dict(transform_hrefs=bool(item.links)))
+
+
+def make_refs(
+    item: pystac.Item,
+    filename: str | None = None,
+    buffer: bytearray | None = None,
+) -> dict[str, Any]:
     import kerchunk.hdf
 
     asset = item.assets["data"]
 
-    if filename is None:
-        filename, _ = urllib.request.urlretrieve(asset.href)
+    if buffer is not None:
+        f: Any = io.BufferedReader(download.BufferFile(buffer))
+    else:
+        if filename is None:
+            filename, _ = urllib.request.urlretrieve(asset.href)
+        f = open(filename, "rb")
 
-    with open(filename, "rb") as f:
+    with f:
         z = kerchunk.hdf.SingleHdf5ToZarr(f, asset.href)
         refs: dict[str, Any] = z.translate()
 
@@ -46,13 +111,27 @@ def do_one_sansio(
     endpoint: str,
     filename: str | None = None,
     should_make_refs: bool = True,
+    copy: bool = True,
+    buffer: bytearray | None = None,
 ) -> tuple[pystac.Item, dict[str, Any] | None]:
+    """
+    Make the Kerchunk references for an item's data and add an ``index`` asset
+    pointing to them.
+
+    The data is read from ``buffer``, if it's been downloaded to memory, or
+    ``filename``.
+
+    With ``copy=False`` the asset is added to ``item`` itself rather than to
+    a deep copy, which is much cheaper for items with large properties (e.g.
+    histograms and ``cube:dimensions``).
+    """
     if should_make_refs:
-        refs = make_refs(item, filename=filename)
+        refs = make_refs(item, filename=filename, buffer=buffer)
     else:
         refs = None
     refs_name = get_references_blob_name(item)
-    item = item.clone()
+    if copy:
+        item = item.clone()
     item.add_asset(
         "index",
         pystac.Asset(
@@ -66,6 +145,113 @@ def do_one_sansio(
     return item, refs
 
 
+def get_cog_blob_name(item: pystac.Item) -> str:
+    return f"floods/{item.id}.tif"
+
+
+def do_cog(
+    ds: xr.Dataset,
+    item: pystac.Item,
+    cog_container_client_options: dict[str, Any],
+    overwrite: bool = False,
+    container_client_class: Callable[..., Any] = azure.storage.blob.ContainerClient,
+) -> pystac.Item:
+    """
+    Convert a flood map to a COG, upload it, and add it as an asset on the item.
+    """
+    from stactools.deltares import cog
+
+    cog_cc = container_client_class(**cog_container_client_options)
+    cog_name = get_cog_blob_name(item)
+
+    with cog_cc.get_blob_client(cog_name) as bc:
+        if overwrite or not bc.exists():
+            with tempfile.TemporaryDirectory() as tmpdir:
+                filename = os.path.join(tmpdir, "cog.tif")
+                cog.write_cog(ds.inun, filename)
+                with open(filename, "rb") as f:
+                    bc.upload_blob(
+                        f,
+                        overwrite=True,
+                        max_concurrency=4,
+                        content_settings=azure.storage.blob.ContentSettings(
+                            content_type=str(pystac.MediaType.COG)
+                        ),
+                    )
+
+    return cog.add_cog_asset(
+        item, f"{cog_cc.primary_endpoint.split('?')[0]}/{cog_name}"
+    )
+
+
+def get_zarr_blob_name(item: pystac.Item) -> str:
+    return f"reservoirs/{item.id}.zarr"
+
+
+def do_zarr(
+    ds: xr.Dataset,
+    item: pystac.Item,
+    zarr_container_client_options: dict[str, Any],
+    overwrite: bool = False,
+) -> pystac.Item:
+    """
+    Write a time-series Zarr copy of an availability dataset and add it as an asset.
+    """
+    from stactools.deltares.availability import rechunk
+
+    account_url = zarr_container_client_options["account_url"]
+    container_name = zarr_container_client_options["container_name"]
+    zarr_name = get_zarr_blob_name(item)
+    store = fsspec.get_mapper(
+        f"az://{container_name}/{zarr_name}",
+        account_name=urllib.parse.urlparse(account_url).netloc.split(".")[0],
+        credential=zarr_container_client_options["credential"],
+    )
+    exists = ".zgroup" in store or "zarr.json" in store
+    if overwrite or not exists:
+        rechunk.write_timeseries_zarr(ds, store)
+
+    return rechunk.add_zarr_asset(item, f"{account_url}/{container_name}/{zarr_name}")
+
+
+def get_aggregates_blob_prefix(item: pystac.Item) -> str:
+    return f"reservoirs/{item.id}"
+
+
+def do_aggregates(
+    ds: xr.Dataset,
+    item: pystac.Item,
+    aggregates_container_client_options: dict[str, Any],
+    overwrite: bool = False,
+) -> pystac.Item:
+    """
+    Write monthly, annual and climatology means of an availability dataset
+    and add them as assets.
+    """
+    from stactools.deltares.availability import aggregates
+
+    account_url = aggregates_container_client_options["account_url"]
+    container_name = aggregates_container_client_options["container_name"]
+    prefix = get_aggregates_blob_prefix(item)
+    names = {key: f"{prefix}/{key}.zarr" for key in aggregates.AGGREGATES}
+    stores = {
+        key: fsspec.get_mapper(
+            f"az://{container_name}/{name}",
+            account_name=urllib.parse.urlparse(account_url).netloc.split(".")[0],
+            credential=aggregates_container_client_options["credential"],
+        )
+        for key, name in names.items()
+    }
+    exists = all(".zgroup" in s or "zarr.json" in s for s in stores.values())
+    if overwrite or not exists:
+        aggregates.write_aggregates(aggregates.compute_aggregates(ds), stores)
+
+    return aggregates.add_aggregate_assets(
+        item,
+        {key: f"{account_url}/{container_name}/{name}" for key, name in names.items()},
+    )
+
+
 def do_one(
     asset_href: str,
     references_container_client_options: dict[str, Any],
@@ -75,7 +261,30 @@ def do_one(
     transform_href: Callable[[str], str] | None = None,
     overwrite_references: bool = False,
     overwrite_item: bool = True,
+    item_kwargs: dict[str, Any] | None = None,
+    cog_container_client_options: dict[str, Any] | None = None,
+    overwrite_cog: bool = False,
+    zarr_container_client_options: dict[str, Any] | None = None,
+    overwrite_zarr: bool = False,
+    aggregates_container_client_options: dict[str, Any] | None = None,
+    overwrite_aggregates: bool = False,
+    recorder: telemetry.Recorder | None = None,
+    container_client_class: Callable[..., Any] = azure.storage.blob.ContainerClient,
+    max_memory_size: int = DEFAULT_MAX_MEMORY_SIZE,
 ) -> pystac.Item:
+    """
+    Create the item, references and other assets for one NetCDF file, and
+    upload them.
+
+    Files of up to ``max_memory_size`` bytes are downloaded into one buffer
+    in memory, which h5netcdf and kerchunk both read from, rather than
+    written to a temporary file and read back.
+
+    Each stage is timed by ``recorder``, if given, with the bytes downloaded
+    and uploaded. The containers are accessed through clients created by
+    ``container_client_class`` from the container client options, which
+    can be replaced by a stand-in for testing.
+    """
     if kind == "floods":
         from stactools.deltares import stac
     else:
@@ -87,59 +296,359 @@ def do_one(
             return x
 
     assert callable(transform_href)
-
-    refs_cc = azure.storage.blob.ContainerClient(**references_container_client_options)
-    stac_cc = azure.storage.blob.ContainerClient(**stac_container_client_options)
-
-    with tempfile.NamedTemporaryFile() as tf:
-        filename = tf.name
-        urllib.request.urlretrieve(transform_href(asset_href), filename=filename)
-        ds = xr.open_dataset(filename, engine="h5netcdf")
-        item = stac.create_item_from_dataset(ds, asset_href=asset_href)
+    if recorder is None:
+        recorder = telemetry.Recorder(asset_href)
+
+    refs_cc = container_client_class(**references_container_client_options)
+    stac_cc = container_client_class(**stac_container_client_options)
+
+    # The dataset is closed explicitly: closing it when it's garbage collected,
+    # possibly on another thread, can deadlock in HDF5.
+    with contextlib.ExitStack() as stack:
+        with recorder.span("download") as span:
+            info = download.download(
+                transform_href(asset_href), max_memory_size=max_memory_size
+            )
+            span.bytes_read = info.size
+            span.extra["in_memory"] = info.buffer is not None
+        if info.filename is not None:
+            stack.callback(os.remove, info.filename)
+        with recorder.span("open"):
+            ds = stack.enter_context(
+                xr.open_dataset(
+                    info.filename or stack.enter_context(info.open()),
+                    engine="h5netcdf",
+                )
+            )
+        with recorder.span("create_item"):
+            item = stac.create_item_from_dataset(
+                ds, asset_href=asset_href, **(item_kwargs or {})
+            )
+            download.add_file_info(item.assets["data"], info)
+        if cog_container_client_options is not None:
+            with recorder.span("cog"):
+                item = do_cog(
+                    ds,
+                    item,
+                    cog_container_client_options,
+                    overwrite=overwrite_cog,
+                    container_client_class=container_client_class,
+                )
+        if zarr_container_client_options is not None:
+            with recorder.span("zarr"):
+                item = do_zarr(
+                    ds, item, zarr_container_client_options, overwrite=overwrite_zarr
+                )
+        if aggregates_container_client_options is not None:
+            with recorder.span("aggregates"):
+                item = do_aggregates(
+                    ds,
+                    item,
+                    aggregates_container_client_options,
+                    overwrite=overwrite_aggregates,
+                )
 
         refs_name = stac_name = get_references_blob_name(item)
 
         with refs_cc.get_blob_client(refs_name) as bc:
             should_make_refs = overwrite_references or not bc.exists()
-            item, refs = do_one_sansio(
-                item,
-                refs_cc.primary_endpoint.split("?")[0],
-                filename=filename,
-                should_make_refs=should_make_refs,
-            )
+            with recorder.span("make_refs", skipped=not should_make_refs):
+                item, refs = do_one_sansio(
+                    item,
+                    refs_cc.primary_endpoint.split("?")[0],
+                    filename=info.filename,
+                    should_make_refs=should_make_refs,
+                    copy=False,
+                    buffer=info.buffer,
+                )
             if should_make_refs:
                 assert refs is not None
-            if should_make_refs:
+            with recorder.span("upload_refs", skipped=not should_make_refs) as span:
+                if should_make_refs:
+                    data = to_json_bytes(refs)
+                    bc.upload_blob(
+                        data,
+                        overwrite=True,
+                        content_settings=azure.storage.blob.ContentSettings(
+                            content_type=str(pystac.MediaType.JSON)
+                        ),
+                    )
+                    span.bytes_written = len(data)
+
+        assert bc.exists()
+
+    with stac_cc.get_blob_client(stac_name) as bc:
+        should_upload_item = overwrite_item or not bc.exists()
+        with recorder.span("upload_item", skipped=not should_upload_item) as span:
+            if should_upload_item:
+                data = item_to_json_bytes(item)
                 bc.upload_blob(
-                    json.dumps(refs).encode(),
+                    data,
                     overwrite=True,
                     content_settings=azure.storage.blob.ContentSettings(
-                        content_type=str(pystac.MediaType.JSON)
+                        content_type=str(pystac.MediaType.GEOJSON)
                     ),
                 )
+                span.bytes_written = len(data)
+    return item
 
-        assert bc.exists()
 
-    with stac_cc.get_blob_client(stac_name) as bc:
-        if overwrite_item or not bc.exists():
-            bc.upload_blob(
-                json.dumps(item.to_dict()).encode(),
-                overwrite=True,
-                content_settings=azure.storage.blob.ContentSettings(
-                    content_type=str(pystac.MediaType.GEOJSON)
-                ),
+def do_one_recorded(
+    asset_href: str, profile_interval: float | None = None, **kwargs: Any
+) -> tuple[pystac.Item, list[telemetry.Span], dict[str, int]]:
+    """
+    Run :func:`do_one`, returning the item, the spans of its stages and, with
+    a ``profile_interval``, the stacks sampled by a
+    :class:`~stactools.deltares.profiling.SamplingProfiler`.
+
+    Errors are raised as a :class:`~stactools.deltares.telemetry.RecordedError`
+    with the spans recorded up to them.
+    """
+    recorder = telemetry.Recorder(asset_href)
+    try:
+        if profile_interval is None:
+            item = do_one(asset_href, recorder=recorder, **kwargs)
+            return item, recorder.spans, {}
+        item, stacks = profiling.profile(
+            do_one, asset_href, recorder=recorder, interval=profile_interval, **kwargs
+        )
+    except Exception as e:
+        raise telemetry.RecordedError(f"{type(e).__name__}: {e}", recorder.spans) from e
+    return item, recorder.spans, stacks
+
+
+def get_references_blob_name_for_href(href: str) -> str:
+    """The name :func:`get_references_blob_name` gives the item for a NetCDF file."""
+    if "deltaresfloodssa" in href:
+        from stactools.deltares import stac
+
+        return f"floods/{stac.PathParts.from_url(href).item_id}.json"
+    else:
+        from stactools.deltares.availability import stac as availability_stac
+
+        item_id = availability_stac.PathParts.from_url(href).item_id
+        return f"reservoirs/{item_id}.json"
+
+
+def list_blob_names(
+    container_client_options: dict[str, Any], prefix: str | None = None
+) -> set[str]:
+    """The names of the blobs in a container, listed in one pass."""
+    cc = azure.storage.blob.ContainerClient(**container_client_options)
+    return {b.name for b in cc.list_blobs(name_starts_with=prefix)}
+
+
+def list_shards(
+    cc: azure.storage.blob.ContainerClient, prefix: str, depth: int
+) -> tuple[list[str], list[Any]]:
+    """
+    Split a prefix into the prefixes ``depth`` levels of "directories" below it.
+
+    Returns
+    -------
+    prefixes, blobs
+        The prefixes, and any blobs found directly in the levels above them.
+    """
+    prefixes, blobs = [prefix], []
+    for _ in range(depth):
+        subprefixes = []
+        for name in prefixes:
+            for entry in cc.walk_blobs(name_starts_with=name, delimiter="/"):
+                if isinstance(entry, azure.storage.blob.BlobPrefix):
+                    subprefixes.append(entry.name)
+                else:
+                    blobs.append(entry)
+        prefixes = subprefixes
+    return prefixes, blobs
+
+
+def iter_blobs(
+    cc: azure.storage.blob.ContainerClient,
+    prefixes: Iterable[str],
+    max_workers: int = DEFAULT_LISTING_WORKERS,
+) -> Iterator[Any]:
+    """
+    List the blobs under many prefixes concurrently.
+
+    Each prefix is listed by a thread, and the blobs are yielded a page at a
+    time as the pages arrive, in no particular order, so the caller can start
+    on them before the listing is done.
+    """
+    pages: queue.Queue[list[Any] | Exception | None] = queue.Queue()
+
+    def list_prefix(prefix: str) -> None:
+        try:
+            for page in cc.list_blobs(name_starts_with=prefix).by_page():
+                pages.put(list(page))
+        except Exception as e:
+            pages.put(e)
+        pages.put(None)
+
+    prefixes = list(prefixes)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        for prefix in prefixes:
+            pool.submit(list_prefix, prefix)
+        remaining = len(prefixes)
+        while remaining:
+            page = pages.get()
+            if page is None:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+
+
+#: The stages skipped for files whose references already exist.
+REFERENCES_STAGES = {"make_refs", "upload_refs"}
+
+
+def estimate_rates(spans: Iterable[telemetry.Span]) -> dict[str, float]:
+    """
+    Estimate the seconds per byte of the source file for each stage, from
+    the spans of a previous run.
+
+    Skipped stages and failed files are left out.
+    """
+    spans = list(spans)
+    sizes = {
+        span.key: span.bytes_read
+        for span in spans
+        if span.stage == "download" and span.error is None and span.bytes_read
+    }
+    seconds: dict[str, float] = collections.defaultdict(float)
+    nbytes: dict[str, int] = collections.defaultdict(int)
+    for span in spans:
+        if span.key in sizes and not span.skipped and span.error is None:
+            seconds[span.stage] += span.seconds
+            nbytes[span.stage] += sizes[span.key]
+    return {stage: seconds[stage] / nbytes[stage] for stage in seconds}
+
+
+@dataclass
+class Plan:
+    """The work an ETL run would do, and an estimate of how long it'd take."""
+
+    urls: list[str]
+    sizes: list[int]
+    existing_references: int
+    existing_items: int
+    task_seconds: list[float]
+    workers: int | None = None
+    wall_seconds: float | None = None
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.sizes)
+
+    def format(self) -> str:
+        lines = [
+            f"files: {len(self.urls)}",
+            f"existing references: {self.existing_references}",
+            f"existing items: {self.existing_items}",
+            f"total size: {self.total_bytes / 2**30:.2f} GiB",
+        ]
+        if self.sizes:
+            quantiles = np.percentile(self.sizes, [0, 50, 90, 99, 100])
+            lines.append(
+                "file size (MiB) min/p50/p90/p99/max: "
+                + " / ".join(f"{q / 2**20:.1f}" for q in quantiles)
             )
-    return item
+        if self.task_seconds and self.wall_seconds is not None:
+            lines.append(
+                f"estimated task time: {sum(self.task_seconds) / 3600:.2f} hours, "
+                f"longest task {max(self.task_seconds) / 60:.1f} minutes"
+            )
+            lines.append(
+                f"estimated wall time: {self.wall_seconds / 60:.1f} minutes "
+                f"with {self.workers} workers"
+            )
+        return "\n".join(lines)
+
+
+def make_plan(
+    sources: Iterable[tuple[str, int]],
+    existing_references: set[str],
+    existing_items: set[str],
+    rates: dict[str, float] | None = None,
+    overwrite_references: bool = False,
+    target_seconds: float = 3600,
+    max_workers: int = 40,
+    min_workers: int = 2,
+) -> Plan:
+    """
+    Plan an ETL run without running it.
+
+    Parameters
+    ----------
+    sources : iterable of (str, int)
+        The URL and size in bytes of each NetCDF file.
+    existing_references, existing_items : set of str
+        The names of the blobs already in the references and STAC containers.
+    rates : dict, optional
+        Seconds per byte for each stage, from :func:`estimate_rates`.
+        Without them, the time isn't estimated.
+    overwrite_references : bool
+        Whether existing references would be remade.
+    target_seconds : float
+        The wall time to size the cluster for. The number of workers is the
+        smallest that finishes in about this time, between ``min_workers``
+        and ``max_workers``.
+    """
+    urls, sizes, task_seconds = [], [], []
+    n_references = n_items = 0
+    for url, size in sources:
+        name = get_references_blob_name_for_href(url)
+        has_references = name in existing_references
+        n_references += has_references
+        n_items += name in existing_items
+        urls.append(url)
+        sizes.append(size)
+        if rates:
+            task_seconds.append(
+                sum(
+                    rate * size
+                    for stage, rate in rates.items()
+                    if overwrite_references
+                    or not has_references
+                    or stage not in REFERENCES_STAGES
+                )
+            )
+    plan = Plan(urls, sizes, n_references, n_items, task_seconds)
+    if task_seconds:
+        total, longest = sum(task_seconds), max(task_seconds)
+        workers = math.ceil(total / max(target_seconds, longest))
+        plan.workers = min(max(workers, min_workers), max_workers)
+        # Tasks are spread over the workers, but can't be split.
+        plan.wall_seconds = max(total / plan.workers, longest)
+    return plan
 
 
-def main(kind: str) -> None:
+def main(
+    kind: str,
+    ndjson_path: str | None = None,
+    geoparquet_path: str | None = None,
+    telemetry_path: str | None = None,
+    profile_path: str | None = None,
+    profile_interval: float = profiling.DEFAULT_INTERVAL,
+    dry_run: bool = False,
+    estimate_from: str | None = None,
+    max_memory_size: int = DEFAULT_MAX_MEMORY_SIZE,
+    footprint: bool = False,
+    statistics: bool = False,
+) -> None:
     assert kind in {"floods", "availability"}
+    cog_container_client_options: dict[str, Any] | None = None
+    zarr_container_client_options: dict[str, Any] | None = None
+    aggregates_container_client_options: dict[str, Any] | None = None
 
     if kind == "floods":
         cc = azure.storage.blob.ContainerClient(
             "https://deltaresfloodssa.blob.core.windows.net", "floods"
         )
         name_starts_with = "v2021.06/global/"
+        # The maps are listed concurrently for each DEM and resolution.
+        shard_depth = 2
         account_url = "https://deltaresfloodssa.blob.core.windows.net"
         references_container_client_options = dict(
             account_url=account_url,
@@ -151,7 +660,17 @@ def main(kind: str) -> None:
             container_name="floods-stac",
             credential=os.environ["ETL_FLOODS_STAC_CREDENTIAL"],
         )
+        if "ETL_FLOODS_COG_CREDENTIAL" in os.environ:
+            cog_container_client_options = dict(
+                account_url=account_url,
+                container_name="floods-cog",
+                credential=os.environ["ETL_FLOODS_COG_CREDENTIAL"],
+            )
         transform_href = None
+        item_kwargs: dict[str, Any] = {
+            "footprint": footprint,
+            "statistics": statistics,
+        }
 
     else:
         account_url = "https://deltaresreservoirssa.blob.core.windows.net"
@@ -163,6 +682,7 @@ def main(kind: str) -> None:
             ).token,
         )
         name_starts_with = "v2021.12/"
+        shard_depth = 0
         references_container_client_options = dict(
             account_url=account_url,
             container_name="references",
@@ -174,14 +694,43 @@ def main(kind: str) -> None:
             credential=os.environ["ETL_RESERVOIRS_STAC_CREDENTIAL"],
         )
         transform_href = planetary_computer.sign
+        if "ETL_RESERVOIRS_ZARR_CREDENTIAL" in os.environ:
+            zarr_container_client_options = dict(
+                account_url=account_url,
+                container_name="reservoirs-zarr",
+                credential=os.environ["ETL_RESERVOIRS_ZARR_CREDENTIAL"],
+            )
+        if "ETL_RESERVOIRS_AGGREGATES_CREDENTIAL" in os.environ:
+            aggregates_container_client_options = dict(
+                account_url=account_url,
+                container_name="reservoirs-aggregates",
+                credential=os.environ["ETL_RESERVOIRS_AGGREGATES_CREDENTIAL"],
+            )
+        item_kwargs = {"statistics": statistics}
 
-    blobs = list(cc.list_blobs(name_starts_with=name_starts_with))
-    urls = [
-        f"{cc.primary_endpoint.split('?')[0]}/{b.name}"
-        for b in blobs
+    endpoint = cc.primary_endpoint.split("?")[0]
+    prefixes, blobs = list_shards(cc, name_starts_with, shard_depth)
+    sources = (
+        (f"{endpoint}/{b.name}", b.size)
+        for b in itertools.chain(blobs, iter_blobs(cc, prefixes))
         if b.name.endswith(".nc")
-    ]
-    print(f"{len(urls)=}")
+    )
+
+    if dry_run:
+        prefix = "floods/" if kind == "floods" else "reservoirs/"
+        rates = None
+        if estimate_from is not None:
+            rates = estimate_rates(telemetry.read_spans(estimate_from))
+        plan = make_plan(
+            sources,
+            existing_references=list_blob_names(
+                references_container_client_options, prefix
+            ),
+            existing_items=list_blob_names(stac_container_client_options, prefix),
+            rates=rates,
+        )
+        print(plan.format())
+        return
 
     cluster = dask_gateway.GatewayCluster()
     client = cluster.get_client()
@@ -194,36 +743,153 @@ def main(kind: str) -> None:
 
     cluster.adapt(minimum=2, maximum=40)
 
-    futures_to_urls = {
-        client.submit(
-            do_one,
+    # Tasks are submitted as the listing pages arrive, so the cluster starts
+    # before the listing is done.
+    futures_to_urls = {}
+    completed = dask.distributed.as_completed()
+    for url, _ in sources:
+        future = client.submit(
+            do_one_recorded,
             url,
             references_container_client_options=references_container_client_options,
             stac_container_client_options=stac_container_client_options,
             kind=kind,
             transform_href=transform_href,
-        ): url
-        for url in urls
-    }
-    dask.distributed.fire_and_forget(list(futures_to_urls))
+            item_kwargs=item_kwargs,
+            cog_container_client_options=cog_container_client_options,
+            zarr_container_client_options=zarr_container_client_options,
+            aggregates_container_client_options=aggregates_container_client_options,
+            profile_interval=profile_interval if profile_path else None,
+            max_memory_size=max_memory_size,
+        )
+        dask.distributed.fire_and_forget(future)
+        futures_to_urls[future] = url
+        completed.add(future)  # type: ignore[no-untyped-call]
+    print(f"{len(futures_to_urls)} files")
 
     success = []
     failure = []
+    spans: list[telemetry.Span] = []
+    stacks: collections.Counter[str] = collections.Counter()
+
+    # Items are written out as they complete, rather than collected first.
+    with contextlib.ExitStack() as stack:
+        writers: list[bulk.NDJSONWriter | bulk.GeoParquetWriter] = []
+        if ndjson_path is not None:
+            writers.append(stack.enter_context(bulk.NDJSONWriter(ndjson_path)))
+        if geoparquet_path is not None:
+            writers.append(stack.enter_context(bulk.GeoParquetWriter(geoparquet_path)))
+        telemetry_file = None
+        if telemetry_path is not None:
+            telemetry_file = stack.enter_context(fsspec.open(telemetry_path, "wt"))
+
+        for future in completed:
+            url = futures_to_urls[future]
+            try:
+                item, item_spans, item_stacks = future.result()
+            except Exception as e:
+                logger.exception("Error in %s", url)
+                failure.append(url)
+                item_spans = []
+                if isinstance(e, telemetry.RecordedError):
+                    item_spans.extend(e.spans)
+                    error = str(e)
+                else:
+                    error = f"{type(e).__name__}: {e}"
+                item_spans.append(
+                    telemetry.Span("do_one", key=url, start=time.time(), error=error)
+                )
+            else:
+                success.append(url)
+                stacks.update(item_stacks)
+                for writer in writers:
+                    writer.write(item)
+            spans.extend(item_spans)
+            if telemetry_file is not None:
+                for span in item_spans:
+                    telemetry_file.write(span.to_json() + "\n")
 
-    for future in dask.distributed.as_completed(futures_to_urls):
-        url = futures_to_urls[future]
-        try:
-            future.result()
-        except Exception:
-            logger.exception("Error in %s", url)
-            failure.append(url)
-        else:
-            success.append(url)
     print("\n".join(failure))
+    print(telemetry.format_report(spans))
+    if profile_path is not None:
+        profiling.write_folded(stacks, profile_path)
 
 
-if __name__ == "__main__":
-    import sys
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("kind", choices=["floods", "availability"])
+    parser.add_argument(
+        "--ndjson", default=None, help="Also write the items to this NDJSON file."
+    )
+    parser.add_argument(
+        "--geoparquet",
+        default=None,
+        help="Also write the items to this stac-geoparquet directory.",
+    )
+    parser.add_argument(
+        "--telemetry",
+        default=None,
+        help="Write the timing and I/O of each stage of each file to this "
+        "JSON lines file.",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Profile each task with a sampling profiler and write the merged "
+        "stacks to this file, in the folded format used by flamegraph.pl.",
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        default=profiling.DEFAULT_INTERVAL,
+        help="Seconds between profiler samples.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List the files and existing outputs and report the work to do, "
+        "without starting a cluster.",
+    )
+    parser.add_argument(
+        "--estimate-from",
+        default=None,
+        help="With --dry-run, estimate the time and workers needed from the "
+        "--telemetry output of a previous run.",
+    )
+    parser.add_argument(
+        "--max-memory-size",
+        type=int,
+        default=DEFAULT_MAX_MEMORY_SIZE,
+        help="Read files of up to this many bytes into memory rather than "
+        "saving them to a temporary file. 0 saves every file.",
+    )
+    parser.add_argument(
+        "--footprint",
+        action="store_true",
+        help="Compute the geometry of flood items from the inundated area. "
+        "This reads each flood map in full.",
+    )
+    parser.add_argument(
+        "--statistics",
+        action="store_true",
+        help="Compute summary statistics of each item's data. "
+        "This reads each file in full.",
+    )
+    return parser.parse_args(args)
 
-    kind = sys.argv[1]
-    main(kind)
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(
+        args.kind,
+        ndjson_path=args.ndjson,
+        geoparquet_path=args.geoparquet,
+        telemetry_path=args.telemetry,
+        profile_path=args.profile,
+        profile_interval=args.profile_interval,
+        dry_run=args.dry_run,
+        estimate_from=args.estimate_from,
+        max_memory_size=args.max_memory_size,
+        footprint=args.footprint,
+        statistics=args.statistics,
+    )
@@ -1,6 +1,17 @@
+import argparse
+import datetime
+import json
+import pathlib
+from typing import Any, Iterator
+
 import etl
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
 
-from stactools.deltares import stac
+import azure.storage.blob
+from stactools.deltares import stac, telemetry
 
 URL = "https://deltaresfloodssa.blob.core.windows.net/floods/v2021.06/global/LIDAR/5km/GFM_global_LIDAR5km_2018slr_rp0000.nc"  # noqa: E501
 
@@ -16,3 +27,146 @@ def test_etl_single() -> None:
     )
     assert item2.assets["index"].roles == ["index"]
     assert isinstance(refs, dict)
+
+
+def test_do_one_sansio_no_copy() -> None:
+    item = pystac.Item(
+        "LIDAR-5km-2018-0000",
+        {"type": "Point", "coordinates": [0.0, 0.0]},
+        [0.0, 0.0, 0.0, 0.0],
+        datetime.datetime(2018, 1, 1),
+        {"cube:dimensions": {"lat": {"type": "spatial", "extent": [-90, 90]}}},
+    )
+    item.add_asset("data", pystac.Asset(URL))
+    endpoint = "https://deltaresfloodssa.blob.core.windows.net/references"
+
+    expected, _ = etl.do_one_sansio(item, endpoint, should_make_refs=False)
+    assert "index" not in item.assets
+    result, refs = etl.do_one_sansio(item, endpoint, should_make_refs=False, copy=False)
+    assert result is item
+    assert refs is None
+    assert json.loads(etl.item_to_json_bytes(result)) == expected.to_dict()
+
+
+def test_to_json_bytes_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    obj = {"a": [1.5, 1e-05, "é"], "b": None}
+    assert json.loads(etl.to_json_bytes(obj)) == obj
+    big = {"a": 2**64}
+    assert etl.to_json_bytes(big) == json.dumps(big).encode()
+
+    monkeypatch.setattr(etl, "orjson", None)
+    assert etl.to_json_bytes(obj) == json.dumps(obj).encode()
+
+
+def test_do_one_recorded_error(tmp_path: pathlib.Path) -> None:
+    url = (tmp_path / "missing.nc").as_uri()
+    with pytest.raises(telemetry.RecordedError) as excinfo:
+        etl.do_one_recorded(
+            url,
+            references_container_client_options={},
+            stac_container_client_options={},
+            kind="floods",
+            container_client_class=lambda **kwargs: None,
+        )
+    (span,) = excinfo.value.spans
+    assert (span.stage, span.key) == ("download", url)
+    assert span.error is not None and span.start > 0
+
+
+def test_make_refs_from_memory(tmp_path: pathlib.Path) -> None:
+    ds = xr.Dataset({"inun": (("lat", "lon"), np.arange(12.0).reshape(3, 4))})
+    ds.to_netcdf(tmp_path / "data.nc", engine="h5netcdf")
+    item = pystac.Item("item", None, None, datetime.datetime(2010, 1, 1), {})
+    item.add_asset("data", pystac.Asset(URL))
+
+    buffer = bytearray((tmp_path / "data.nc").read_bytes())
+    expected = etl.make_refs(item, filename=str(tmp_path / "data.nc"))
+    assert etl.make_refs(item, buffer=buffer) == expected
+
+
+def test_make_plan() -> None:
+    spans = [
+        telemetry.Span("download", key="a", seconds=1.0, bytes_read=100),
+        telemetry.Span("make_refs", key="a", seconds=2.0),
+        telemetry.Span("download", key="b", seconds=3.0, bytes_read=300),
+        telemetry.Span("make_refs", key="b", skipped=True),
+        telemetry.Span("download", key="c", error="Error"),
+    ]
+    rates = etl.estimate_rates(spans)
+    assert rates == {"download": 0.01, "make_refs": 0.02}
+
+    other = URL.replace("rp0000", "rp0100")
+    plan = etl.make_plan(
+        [(URL, 1000), (other, 3000)],
+        existing_references={"floods/LIDAR-5km-2018-0000.json"},
+        existing_items=set(),
+        rates=rates,
+        target_seconds=50,
+    )
+    assert plan.total_bytes == 4000
+    assert (plan.existing_references, plan.existing_items) == (1, 0)
+    # The first file's references exist, so they aren't remade.
+    assert plan.task_seconds == [10.0, 90.0]
+    assert plan.workers == 2
+    assert plan.wall_seconds == 90.0
+    assert "estimated wall time: 1.5 minutes with 2 workers" in plan.format()
+
+    plan = etl.make_plan([(URL, 1000)], set(), set())
+    assert plan.workers is None
+    assert "estimated" not in plan.format()
+
+
+class ListingContainerClient:
+    def __init__(self, names: list[str], page_size: int = 2) -> None:
+        self.names = names
+        self.page_size = page_size
+        self.listed: list[str] = []
+
+    def walk_blobs(self, name_starts_with: str, delimiter: str) -> Iterator[Any]:
+        seen = set()
+        for name in self.names:
+            if not name.startswith(name_starts_with):
+                continue
+            rest = name[len(name_starts_with) :]
+            if delimiter in rest:
+                prefix = name_starts_with + rest.split(delimiter)[0] + delimiter
+                if prefix not in seen:
+                    seen.add(prefix)
+                    yield azure.storage.blob.BlobPrefix(prefix=prefix)
+            else:
+                yield argparse.Namespace(name=name, size=1)
+
+    def list_blobs(self, name_starts_with: str) -> Any:
+        self.listed.append(name_starts_with)
+        names = [name for name in self.names if name.startswith(name_starts_with)]
+        pages = [
+            [
+                argparse.Namespace(name=name, size=1)
+                for name in names[i : i + self.page_size]
+            ]
+            for i in range(0, len(names), self.page_size)
+        ]
+        return argparse.Namespace(by_page=lambda: iter(pages))
+
+
+def test_iter_blobs_sharded() -> None:
+    names = [
+        f"v2021.06/global/{dem}/{resolution}/{i}.nc"
+        for dem in ["LIDAR", "NASADEM"]
+        for resolution in ["1km", "5km"]
+        for i in range(3)
+    ] + ["v2021.06/global/README.txt"]
+    cc = ListingContainerClient(names)
+
+    prefixes, blobs = etl.list_shards(cc, "v2021.06/global/", depth=2)
+    assert prefixes == [
+        "v2021.06/global/LIDAR/1km/",
+        "v2021.06/global/LIDAR/5km/",
+        "v2021.06/global/NASADEM/1km/",
+        "v2021.06/global/NASADEM/5km/",
+    ]
+    assert [b.name for b in blobs] == ["v2021.06/global/README.txt"]
+
+    result = etl.iter_blobs(cc, prefixes, max_workers=2)
+    assert sorted(b.name for b in result) == sorted(names[:-1])
+    assert sorted(cc.listed) == prefixes
@@ -1,13 +1,25 @@
+from typing import TYPE_CHECKING, Any
+
 import stactools.core
 from stactools.cli.registry import Registry
 
-from stactools.deltares.stac import create_collection, create_item
+if TYPE_CHECKING:
+    from stactools.deltares.stac import create_collection, create_item
 
 __all__ = ["create_collection", "create_item"]
 
 stactools.core.use_fsspec()
 
 
+def __getattr__(name: str) -> Any:
+    # Deferred, so that registering the plugin doesn't import xarray.
+    if name in __all__:
+        from stactools.deltares import stac
+
+        return getattr(stac, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def register_plugin(registry: Registry) -> None:
     from stactools.deltares import commands
 
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import copy
+import logging
+from datetime import datetime
+from typing import Any, Iterable
+
+import pystac
+from pystac.utils import str_to_datetime
+
+from stactools.deltares.bulk import item_to_dict
+
+logger = logging.getLogger(__name__)
+
+
+def _sort_key(value: Any) -> tuple[str, Any]:
+    # Sort mixed types (e.g. numbers and None) without raising.
+    return (type(value).__name__, value)
+
+
+class CollectionAggregator:
+    """
+    Compute collection-level metadata from a stream of items.
+
+    Items are folded in one at a time with :meth:`add`, keeping only the
+    distinct values of each summarized property, the union of the bounding
+    boxes, the temporal bounds and the union of the ``cube:dimensions``. Memory
+    use is proportional to the number of distinct values, not the number of
+    items.
+
+    Parameters
+    ----------
+    summary_properties : iterable of str
+        The item properties to summarize, e.g. ``deltares:dem_name``.
+    """
+
+    def __init__(self, summary_properties: Iterable[str]) -> None:
+        self.count = 0
+        self.values: dict[str, set[Any]] = {key: set() for key in summary_properties}
+        self.bbox: list[float] | None = None
+        self.start: datetime | None = None
+        self.end: datetime | None = None
+        self.dimensions: dict[str, dict[str, Any]] = {}
+        self._dimension_values: dict[str, set[Any]] = {}
+
+    def add(self, item: pystac.Item | dict[str, Any]) -> None:
+        d = item_to_dict(item)
+        properties = d.get("properties", {})
+        self.count += 1
+
+        for key, values in self.values.items():
+            if key in properties:
+                values.add(properties[key])
+
+        bbox = d.get("bbox")
+        if bbox:
+            n = len(bbox) // 2
+            xmin, ymin, xmax, ymax = bbox[0], bbox[1], bbox[n], bbox[n + 1]
+            if self.bbox is None:
+                self.bbox = [xmin, ymin, xmax, ymax]
+            else:
+                self.bbox = [
+                    min(self.bbox[0], xmin),
+                    min(self.bbox[1], ymin),
+                    max(self.bbox[2], xmax),
+                    max(self.bbox[3], ymax),
+                ]
+
+        for key in ["start_datetime", "datetime", "end_datetime"]:
+            if properties.get(key):
+                value = str_to_datetime(properties[key])
+                self.start = value if self.start is None else min(self.start, value)
+                self.end = value if self.end is None else max(self.end, value)
+
+        for name, dimension in properties.get("cube:dimensions", {}).items():
+            self._add_dimension(name, dimension)
+
+    def _add_dimension(self, name: str, dimension: dict[str, Any]) -> None:
+        if name not in self.dimensions:
+            self.dimensions[name] = {
+                k: copy.deepcopy(v) for k, v in dimension.items() if k != "values"
+            }
+        merged = self.dimensions[name]
+
+        extent = dimension.get("extent")
+        if extent is not None:
+            lower, upper = merged.get("extent", [None, None])
+            if extent[0] is not None:
+                lower = extent[0] if lower is None else min(lower, extent[0])
+            if extent[1] is not None:
+                upper = extent[1] if upper is None else max(upper, extent[1])
+            merged["extent"] = [lower, upper]
+
+        if "values" in dimension:
+            self._dimension_values.setdefault(name, set()).update(dimension["values"])
+
+    def add_items(self, items: Iterable[pystac.Item | dict[str, Any]]) -> int:
+        """Add items, returning the number added."""
+        count = 0
+        for item in items:
+            self.add(item)
+            count += 1
+        return count
+
+    def summaries(self) -> dict[str, list[Any]]:
+        return {
+            key: sorted(values, key=_sort_key)
+            for key, values in self.values.items()
+            if values
+        }
+
+    def extent(self) -> pystac.Extent:
+        bbox = self.bbox or [-180.0, -90.0, 180.0, 90.0]
+        return pystac.Extent(
+            pystac.SpatialExtent([bbox]),
+            pystac.TemporalExtent([[self.start, self.end]]),
+        )
+
+    def cube_dimensions(self) -> dict[str, dict[str, Any]]:
+        result = copy.deepcopy(self.dimensions)
+        for name, values in self._dimension_values.items():
+            result[name]["values"] = sorted(values, key=_sort_key)
+        return result
+
+    def apply(self, collection: pystac.Collection) -> pystac.Collection:
+        """
+        Set the summaries, extent and ``cube:dimensions`` of a collection.
+
+        Summaries of properties that weren't found on any item, and the
+        collection's existing ``cube:dimensions`` that weren't found on any
+        item, are left as-is.
+        """
+        if not self.count:
+            logger.warning("No items were aggregated, leaving %s as-is", collection.id)
+            return collection
+
+        for key, values in self.summaries().items():
+            collection.summaries.add(key, values)
+        collection.extent = self.extent()
+        collection.extra_fields["cube:dimensions"] = {
+            **collection.extra_fields.get("cube:dimensions", {}),
+            **self.cube_dimensions(),
+        }
+        return collection
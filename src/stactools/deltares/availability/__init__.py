@@ -1,3 +1,14 @@
-from stactools.deltares.availability import stac
+import importlib
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["stac"]
+if TYPE_CHECKING:
+    from stactools.deltares.availability import aggregates, locations, rechunk, stac
+
+__all__ = ["aggregates", "locations", "rechunk", "stac"]
+
+
+def __getattr__(name: str) -> Any:
+    # The submodules import xarray, so they're only imported when used.
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
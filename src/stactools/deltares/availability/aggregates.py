@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Hashable, Mapping, MutableMapping
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from pystac import Asset, Item
+
+from stactools.deltares import constants
+from stactools.deltares.utils import DEFAULT_MAX_BLOCK_CELLS, block_size, iter_blocks
+
+logger = logging.getLogger(__name__)
+
+#: The aggregates computed by :func:`compute_aggregates`.
+AGGREGATES = ["monthly", "annual", "climatology"]
+
+
+def _accumulate(
+    da: xr.DataArray, months: np.ndarray, n_months: int, max_block_cells: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sum the non-NaN values, and count them, per month, reading ``da`` in
+    blocks along ``time``.
+    """
+    shape = (n_months,) + da.shape[1:]
+    sums = np.zeros(shape, dtype="float64")
+    counts = np.zeros(shape, dtype="int64")
+    sorted_months = bool(np.all(np.diff(months) >= 0))
+    size = block_size(da, "time", max_block_cells)
+
+    for key, values in iter_blocks(da, {"time": size}):
+        block_months = months[key["time"]]
+        valid = ~np.isnan(values)
+        values = np.where(valid, values, 0)
+        if sorted_months:
+            unique, starts = np.unique(block_months, return_index=True)
+            sums[unique] += np.add.reduceat(values, starts, axis=0)
+            counts[unique] += np.add.reduceat(valid, starts, axis=0)
+        else:
+            np.add.at(sums, block_months, values)
+            np.add.at(counts, block_months, valid)
+    return sums, counts
+
+
+def _mean(sums: np.ndarray, counts: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result: np.ndarray = (sums / counts).astype(dtype)
+    return result
+
+
+def compute_aggregates(
+    ds: xr.Dataset, max_block_cells: int = DEFAULT_MAX_BLOCK_CELLS
+) -> dict[str, xr.Dataset]:
+    """
+    Compute monthly and annual means, and a monthly climatology, of an
+    availability dataset.
+
+    Each variable with a ``time`` dimension is read once, in blocks along
+    ``time`` of at most ``max_block_cells`` cells, and its values are summed
+    per calendar month. The annual means and the climatology are derived from
+    those monthly sums, so memory use is bounded by the size of the monthly
+    result rather than the daily record. NaNs are skipped.
+
+    Returns
+    -------
+    dict
+        Datasets keyed by ``monthly``, ``annual`` and ``climatology``. The
+        ``time`` dimension is labelled by the first day of each month, or
+        year, and the climatology has a ``month`` dimension instead.
+    """
+    time = pd.DatetimeIndex(ds.indexes["time"])
+    year0, month0 = time[0].year, time[0].month
+    months = np.asarray((time.year - year0) * 12 + time.month - month0)
+    n_months = int(months.max()) + 1
+    month_starts = pd.date_range(
+        f"{year0}-{month0:02d}-01", periods=n_months, freq="MS"
+    )
+    # Months and years without any time steps are dropped below.
+    month_index = np.asarray(month_starts.month - 1)
+    year_index = np.asarray(month_starts.year - month_starts.year[0])
+    years = pd.date_range(
+        f"{month_starts.year[0]}-01-01", periods=int(year_index[-1]) + 1, freq="YS"
+    )
+
+    has_months = np.bincount(months, minlength=n_months) > 0
+
+    monthly: dict[Hashable, Any] = {}
+    annual: dict[Hashable, Any] = {}
+    climatology: dict[Hashable, Any] = {}
+    for name, da in ds.data_vars.items():
+        if "time" not in da.dims:
+            continue
+        logger.debug("Aggregating %s", name)
+        da = da.transpose("time", ...)
+        dims = da.dims[1:]
+        dtype = np.result_type(da.dtype, np.float32)
+        sums, counts = _accumulate(da, months, n_months, max_block_cells)
+
+        year_sums = np.zeros((len(years),) + sums.shape[1:])
+        year_counts = np.zeros((len(years),) + sums.shape[1:], dtype="int64")
+        np.add.at(year_sums, year_index, sums)
+        np.add.at(year_counts, year_index, counts)
+        month_sums = np.zeros((12,) + sums.shape[1:])
+        month_counts = np.zeros((12,) + sums.shape[1:], dtype="int64")
+        np.add.at(month_sums, month_index, sums)
+        np.add.at(month_counts, month_index, counts)
+
+        attrs = da.attrs
+        monthly[name] = (("time",) + dims, _mean(sums, counts, dtype), attrs)
+        annual[name] = (("time",) + dims, _mean(year_sums, year_counts, dtype), attrs)
+        climatology[name] = (
+            ("month",) + dims,
+            _mean(month_sums, month_counts, dtype),
+            attrs,
+        )
+
+    coords = {
+        name: coord for name, coord in ds.coords.items() if "time" not in coord.dims
+    }
+    static = {name: var for name, var in ds.data_vars.items() if "time" not in var.dims}
+    result = {
+        "monthly": xr.Dataset(monthly, coords={**coords, "time": month_starts}),
+        "annual": xr.Dataset(annual, coords={**coords, "time": years}),
+        "climatology": xr.Dataset(
+            climatology, coords={**coords, "month": np.arange(1, 13)}
+        ),
+    }
+    result["monthly"] = result["monthly"].isel(time=has_months)
+    has_years = np.zeros(len(years), dtype=bool)
+    has_years[np.unique(year_index[has_months])] = True
+    result["annual"] = result["annual"].isel(time=has_years)
+
+    for key, aggregate in result.items():
+        result[key] = aggregate.assign_coords(static)
+        result[key].attrs = {**ds.attrs, "aggregate": key}
+    return result
+
+
+def write_aggregates(
+    aggregates: Mapping[str, xr.Dataset],
+    stores: Mapping[str, str | MutableMapping[str, bytes]],
+    storage_options: dict[str, Any] | None = None,
+) -> None:
+    """
+    Write the aggregates from :func:`compute_aggregates` to Zarr.
+
+    Parameters
+    ----------
+    aggregates : mapping
+        The aggregates, keyed by name.
+    stores : mapping
+        The Zarr store to write each aggregate to, keyed by name. Any existing
+        data is overwritten.
+    storage_options : dict, optional
+        Passed to :meth:`xarray.Dataset.to_zarr` for stores that are URLs.
+    """
+    for key, store in stores.items():
+        logger.info("Writing %s aggregates", key)
+        aggregates[key].to_zarr(
+            store,
+            mode="w",
+            consolidated=True,
+            storage_options=storage_options if isinstance(store, str) else None,
+        )
+
+
+def add_aggregate_assets(item: Item, hrefs: dict[str, str]) -> Item:
+    """
+    Add the Zarr stores written by :func:`write_aggregates` as assets, keyed
+    by the name of the aggregate.
+    """
+    for key, href in hrefs.items():
+        item.add_asset(
+            key,
+            Asset(
+                href,
+                title=constants.AGGREGATE_ASSET_TITLES[key],
+                description=constants.AGGREGATE_ASSET_DESCRIPTIONS[key],
+                media_type=constants.ZARR_MEDIA_TYPE,
+                roles=constants.AGGREGATE_ASSET_ROLES,
+                extra_fields={"xarray:open_kwargs": {"consolidated": True}},
+            ),
+        )
+    return item
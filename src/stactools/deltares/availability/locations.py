@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import functools
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+import fsspec
+import numpy as np
+import shapely
+import shapely.geometry
+import xarray as xr
+
+from stactools.deltares.availability.stac import NUMBER_OF_BASINS, PathParts
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReservoirLocations:
+    """
+    Reservoir locations as a columnar table with a spatial index.
+
+    Each source in :data:`stactools.deltares.availability.stac.NUMBER_OF_BASINS`
+    covers a set of reservoirs identified by their ``GrandID``. This table holds
+    one row per (reservoir, GrandID) pair, so the same ``GrandID`` may appear
+    more than once. It's small enough to publish as a collection-level asset,
+    and the packed STRtree built over the points on first use answers
+    region-to-reservoir lookups without touching the availability NetCDF files.
+    """
+
+    grand_id: np.ndarray
+    longitude: np.ndarray
+    latitude: np.ndarray
+    reservoir: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.grand_id)
+
+    @functools.cached_property
+    def tree(self) -> shapely.STRtree:
+        return shapely.STRtree(shapely.points(self.longitude, self.latitude))
+
+    def take(self, indices: np.ndarray) -> "ReservoirLocations":
+        return type(self)(
+            grand_id=self.grand_id[indices],
+            longitude=self.longitude[indices],
+            latitude=self.latitude[indices],
+            reservoir=self.reservoir[indices],
+        )
+
+    def query(
+        self,
+        geometry: Any,
+        reservoir: str | None = None,
+        predicate: str = "intersects",
+    ) -> "ReservoirLocations":
+        """
+        Find the reservoirs within a geometry.
+
+        Parameters
+        ----------
+        geometry : shapely.Geometry or GeoJSON-like dict
+            The region of interest.
+        reservoir : str, optional
+            Only return reservoirs from this source (e.g. ``"ERA5"``).
+        predicate : str
+            The spatial predicate passed to :meth:`shapely.STRtree.query`.
+
+        Returns
+        -------
+        ReservoirLocations
+            The matching rows, in table order.
+        """
+        if not isinstance(geometry, shapely.Geometry):
+            geometry = shapely.geometry.shape(geometry)
+        indices = np.sort(self.tree.query(geometry, predicate=predicate))
+        if reservoir is not None:
+            indices = indices[self.reservoir[indices] == reservoir]
+        return self.take(indices)
+
+    def query_bbox(
+        self, bbox: Iterable[float], reservoir: str | None = None
+    ) -> "ReservoirLocations":
+        """Find the reservoirs within ``[xmin, ymin, xmax, ymax]``."""
+        return self.query(shapely.box(*bbox), reservoir=reservoir)
+
+    def nearest(
+        self, longitude: float, latitude: float, reservoir: str | None = None
+    ) -> "ReservoirLocations":
+        """Find the reservoir closest to a point."""
+        point = shapely.Point(longitude, latitude)
+        if reservoir is None:
+            return self.take(np.atleast_1d(self.tree.nearest(point)))
+        subset = self.take(np.flatnonzero(self.reservoir == reservoir))
+        return subset.take(np.atleast_1d(subset.tree.nearest(point)))
+
+    def to_dataset(self) -> xr.Dataset:
+        return xr.Dataset(
+            {
+                "GrandID": ("index", self.grand_id),
+                "longitude": ("index", self.longitude, {"units": "degrees_east"}),
+                "latitude": ("index", self.latitude, {"units": "degrees_north"}),
+                "reservoir": ("index", self.reservoir.astype(str)),
+            },
+            attrs={"title": "Deltares Global Water Availability reservoir locations"},
+        )
+
+    @classmethod
+    def from_dataset(cls, ds: xr.Dataset) -> "ReservoirLocations":
+        return cls(
+            grand_id=ds["GrandID"].values.astype("int64"),
+            longitude=ds["longitude"].values.astype("float64"),
+            latitude=ds["latitude"].values.astype("float64"),
+            reservoir=ds["reservoir"].values.astype(str).astype(object),
+        )
+
+    def to_netcdf(self, path: str) -> None:
+        """Write the table to a small NetCDF file."""
+        self.to_dataset().to_netcdf(path, engine="h5netcdf")
+
+
+def concat(locations: Iterable[ReservoirLocations]) -> ReservoirLocations:
+    locations = list(locations)
+    return ReservoirLocations(
+        grand_id=np.concatenate([x.grand_id for x in locations]),
+        longitude=np.concatenate([x.longitude for x in locations]),
+        latitude=np.concatenate([x.latitude for x in locations]),
+        reservoir=np.concatenate([x.reservoir for x in locations]),
+    )
+
+
+def locations_from_dataset(ds: xr.Dataset, reservoir: str) -> ReservoirLocations:
+    """
+    Extract the reservoir locations from an availability dataset.
+
+    Only the ``GrandID``, ``longitude`` and ``latitude`` variables are read,
+    so this is cheap for lazily-opened datasets.
+    """
+    grand_id = ds["GrandID"].values.astype("int64")
+    return ReservoirLocations(
+        grand_id=grand_id,
+        longitude=ds["longitude"].values.astype("float64"),
+        latitude=ds["latitude"].values.astype("float64"),
+        reservoir=np.full(len(grand_id), reservoir, dtype=object),
+    )
+
+
+def build_locations(
+    reservoirs: Iterable[str] = tuple(NUMBER_OF_BASINS),
+    transform_href: Callable[[str], str] | None = None,
+) -> ReservoirLocations:
+    """
+    Build the reservoir locations table from the availability NetCDF files.
+
+    The files are opened lazily over HTTP, so only the coordinate variables
+    are downloaded rather than the full files.
+
+    Parameters
+    ----------
+    reservoirs : iterable of str
+        The sources to include. Defaults to all of them.
+    transform_href : callable, optional
+        Applied to each asset HREF before opening it, e.g.
+        :func:`planetary_computer.sign`.
+    """
+    if transform_href is None:
+
+        def transform_href(x: str) -> str:
+            return x
+
+    assert callable(transform_href)
+
+    locations = []
+    for reservoir in reservoirs:
+        href = PathParts(reservoir).href
+        logger.info("Reading reservoir locations from %s", href)
+        with fsspec.open(transform_href(href)) as f:
+            with xr.open_dataset(f, engine="h5netcdf") as ds:
+                locations.append(locations_from_dataset(ds, reservoir))
+
+    return concat(locations)
+
+
+@functools.lru_cache(maxsize=8)
+def read_locations(href: str) -> ReservoirLocations:
+    """
+    Read a reservoir locations table written by :func:`build_locations`.
+
+    Results are cached per HREF, so repeated lookups only pay for building
+    the spatial index once.
+    """
+    with fsspec.open(href) as f:
+        with xr.open_dataset(f, engine="h5netcdf") as ds:
+            return ReservoirLocations.from_dataset(ds.load())
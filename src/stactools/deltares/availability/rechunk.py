@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import MutableMapping
+from typing import Any
+
+import xarray as xr
+from pystac import Asset, Item
+
+from stactools.deltares import constants
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRAND_IDS_PER_CHUNK = constants.DEFAULT_GRAND_IDS_PER_CHUNK
+#: Upper bound on the number of cells (summed over variables) read at once.
+DEFAULT_MAX_BLOCK_CELLS = 2**26
+
+
+def timeseries_encoding(
+    ds: xr.Dataset, grand_ids_per_chunk: int = DEFAULT_GRAND_IDS_PER_CHUNK
+) -> dict[str, dict[str, Any]]:
+    """
+    Zarr encoding chunking every variable along ``GrandID`` only.
+
+    Each chunk holds the full ``time`` (and ``ksathorfrac``) extent for
+    ``grand_ids_per_chunk`` reservoirs, so a single reservoir's time series
+    is a single chunk.
+    """
+    return {
+        str(name): {
+            "chunks": tuple(
+                grand_ids_per_chunk if dim == "GrandID" else size
+                for dim, size in zip(var.dims, var.shape)
+            )
+        }
+        for name, var in ds.variables.items()
+        if "GrandID" in var.dims
+    }
+
+
+def write_timeseries_zarr(
+    ds: xr.Dataset,
+    store: str | MutableMapping[str, bytes],
+    grand_ids_per_chunk: int = DEFAULT_GRAND_IDS_PER_CHUNK,
+    max_block_cells: int = DEFAULT_MAX_BLOCK_CELLS,
+    storage_options: dict[str, Any] | None = None,
+) -> None:
+    """
+    Write a copy of an availability dataset to Zarr, chunked for time series.
+
+    The dataset is streamed in blocks of whole chunks along ``GrandID``; each
+    block is read from ``ds``, written, and then discarded, so memory use is
+    bounded by ``max_block_cells`` (plus one chunk) rather than by the size
+    of the dataset. Larger blocks mean fewer passes over the source file.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        The dataset, opened lazily from the NetCDF file.
+    store : str or MutableMapping
+        The Zarr store to write to. Any existing data is overwritten.
+    grand_ids_per_chunk : int
+        Number of reservoirs per chunk.
+    max_block_cells : int
+        Upper bound on the number of cells, summed over all the variables,
+        read from ``ds`` at once.
+    storage_options : dict, optional
+        Passed to :meth:`xarray.Dataset.to_zarr` when ``store`` is a URL.
+    """
+    n = ds.sizes["GrandID"]
+    cells_per_grand_id = sum(
+        var.size // max(n, 1) for var in ds.variables.values() if "GrandID" in var.dims
+    )
+    chunks_per_block = max(
+        1, max_block_cells // max(cells_per_grand_id * grand_ids_per_chunk, 1)
+    )
+    step = chunks_per_block * grand_ids_per_chunk
+    encoding = timeseries_encoding(ds, grand_ids_per_chunk)
+
+    for start in range(0, n, step):
+        logger.debug("Writing GrandID block %d-%d of %d", start, start + step, n)
+        block = ds.isel(GrandID=slice(start, start + step)).load()
+        for var in block.variables.values():
+            var.encoding = {}
+        if start == 0:
+            block.to_zarr(
+                store,
+                mode="w",
+                encoding=encoding,
+                consolidated=True,
+                storage_options=storage_options,
+            )
+        else:
+            block.to_zarr(
+                store,
+                append_dim="GrandID",
+                consolidated=True,
+                storage_options=storage_options,
+            )
+
+
+def add_zarr_asset(item: Item, href: str) -> Item:
+    """Add the time-series Zarr store, written by :func:`write_timeseries_zarr`."""
+    item.add_asset(
+        "zarr",
+        Asset(
+            href,
+            title=constants.ZARR_ASSET_TITLE,
+            description=constants.ZARR_ASSET_DESCRIPTION,
+            media_type=constants.ZARR_MEDIA_TYPE,
+            roles=constants.ZARR_ASSET_ROLES,
+            extra_fields={"xarray:open_kwargs": {"consolidated": True}},
+        ),
+    )
+    return item
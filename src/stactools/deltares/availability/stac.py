@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 import logging
+import os
 import re
-import urllib.request
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 
 import shapely.geometry
 import xarray as xr
@@ -26,22 +26,20 @@ from pystac import (
 )
 from pystac.extensions.item_assets import ItemAssetsExtension
 
-from stactools.deltares import constants
+from stactools.deltares import aggregate, constants, download, stats
+from stactools.deltares.availability import aggregates, rechunk
 
 logger = logging.getLogger(__name__)
 
 
-NUMBER_OF_BASINS = {
-    "ERA5": 3236,
-    "CHIRPS": 2951,
-    "EOBS": 682,
-    "NLDAS": 1090,
-    "BOM": 116,
-}
+NUMBER_OF_BASINS = constants.NUMBER_OF_BASINS
 
 
 def create_collection(
-    description: str | None = None, extra_fields: dict[str, Any] | None = None
+    description: str | None = None,
+    extra_fields: dict[str, Any] | None = None,
+    locations_href: str | None = None,
+    items: Iterable[Item | dict[str, Any]] | None = None,
 ) -> Collection:
     """Create a STAC Collection
 
@@ -51,6 +49,14 @@ def create_collection(
 
     See `Collection<https://pystac.readthedocs.io/en/latest/api.html#collection>`_.
 
+    Args:
+        locations_href (str, optional): HREF of the reservoir locations table
+            (see :mod:`stactools.deltares.availability.locations`). Added as
+            the ``reservoir-locations`` asset when provided.
+        items (iterable, optional): Items to compute the summaries, extent and
+            ``cube:dimensions`` from, in a single streaming pass. By default,
+            these are hardcoded.
+
     Returns:
         Collection: STAC Collection object
     """
@@ -145,10 +151,26 @@ def create_collection(
             roles=["thumbnail"],
         ),
     )
+    if locations_href is not None:
+        collection.add_asset(
+            "reservoir-locations",
+            Asset(
+                locations_href,
+                title=constants.LOCATIONS_ASSET_TITLE,
+                description=constants.LOCATIONS_ASSET_DESCRIPTION,
+                media_type=constants.NETCDF_MEDIA_TYPE,
+                roles=constants.LOCATIONS_ASSET_ROLES,
+            ),
+        )
 
     if extra_fields:
         collection.extra_fields.update(extra_fields)
 
+    if items is not None:
+        aggregator = aggregate.CollectionAggregator(SUMMARIES)
+        aggregator.add_items(items)
+        aggregator.apply(collection)
+
     return collection
 
 
@@ -173,12 +195,44 @@ class PathParts:
     def item_id(self) -> str:
         return self.reservoir
 
+    @property
+    def href(self) -> str:
+        return (
+            "https://deltaresreservoirssa.blob.core.windows.net/reservoirs/v2021.12/"
+            f"reservoirs_{self.reservoir}.nc"
+        )
+
 
 def create_item_from_dataset(
     ds: xr.Dataset,
     asset_href: str,
+    statistics: bool = False,
+    zarr_href: str | None = None,
+    aggregate_hrefs: dict[str, str] | None = None,
 ) -> Item:
-    """"""
+    """
+    Create a STAC item from a water availability dataset.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        The dataset opened from ``asset_href``.
+    asset_href : str
+        URL to the NetCDF file.
+    statistics : bool
+        Whether to compute summary statistics of each time-varying variable,
+        recorded in ``deltares:statistics``. This reads each variable once, in
+        bounded-memory blocks along ``time``.
+    zarr_href : str, optional
+        HREF of a time-series Zarr copy of the dataset (see
+        :func:`stactools.deltares.availability.rechunk.write_timeseries_zarr`),
+        added as the ``zarr`` asset.
+    aggregate_hrefs : dict, optional
+        HREFs of Zarr stores of temporal aggregates of the dataset (see
+        :func:`stactools.deltares.availability.aggregates.write_aggregates`),
+        keyed by ``monthly``, ``annual`` and ``climatology``, added as
+        assets with those keys.
+    """
     parts = PathParts.from_url(asset_href)
 
     template = Item(
@@ -234,6 +288,19 @@ def create_item_from_dataset(
             roles=constants.DATA_ASSET_ROLES,
         ),
     )
+
+    if zarr_href is not None:
+        rechunk.add_zarr_asset(item, zarr_href)
+
+    if aggregate_hrefs:
+        aggregates.add_aggregate_assets(item, aggregate_hrefs)
+
+    if statistics:
+        item.properties["deltares:statistics"] = {
+            name: variable_statistics.to_dict()
+            for name, variable_statistics in stats.dataset_statistics(ds).items()
+        }
+
     return item
 
 
@@ -241,6 +308,7 @@ def create_item(
     asset_href: str,
     transform_href: Callable[[str], str] | None = None,
     filename: str | None = None,
+    statistics: bool = False,
 ) -> Item:
     """
     Create a STAC item from a URL to a Kerchunk index file.
@@ -249,6 +317,12 @@ def create_item(
     ----------
     asset_href : str
         URL to the NetCDF file.
+    statistics : bool
+        Whether to compute summary statistics of each variable. See
+        :func:`create_item_from_dataset`.
+
+    The size and checksum of the file, computed while it's downloaded, are
+    recorded on the ``data`` asset with the file extension.
     """
     if transform_href is None:
 
@@ -257,9 +331,13 @@ def create_item(
 
     assert callable(transform_href)
 
-    filename, _ = urllib.request.urlretrieve(
-        transform_href(asset_href), filename=filename
-    )
-
-    ds = xr.open_dataset(filename, engine="h5netcdf")
-    return create_item_from_dataset(ds, asset_href)
+    info = download.download(transform_href(asset_href), filename=filename)
+    assert info.filename is not None
+    try:
+        with xr.open_dataset(info.filename, engine="h5netcdf") as ds:
+            item = create_item_from_dataset(ds, asset_href, statistics=statistics)
+    finally:
+        if filename is None:
+            os.remove(info.filename)
+    download.add_file_info(item.assets["data"], info)
+    return item
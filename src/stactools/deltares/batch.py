@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import json
+import logging
+import os
+import pathlib
+import time
+import traceback
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterable, Iterator, Mapping
+
+import fsspec
+import pystac
+
+from stactools.deltares.bulk import expand_paths
+from stactools.deltares.relocate import replace_prefix
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchResult:
+    """The outcome of creating one item in a batch."""
+
+    source: str
+    destination: str | None = None
+    error: str | None = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+
+def list_sources(
+    sources: Iterable[str] = (),
+    list_file: str | None = None,
+    container_url: str | None = None,
+    prefix: str | None = None,
+    suffix: str = ".nc",
+) -> Iterator[str]:
+    """
+    List the source files to create items for.
+
+    Parameters
+    ----------
+    sources : list of str
+        Paths, URLs or local glob patterns.
+    list_file : str, optional
+        A file with one path or URL per line.
+    container_url : str, optional
+        An Azure Blob Storage container URL. The URLs of the blobs under
+        ``prefix`` ending with ``suffix`` are listed.
+    """
+    yield from expand_paths(sources)
+    if list_file is not None:
+        with fsspec.open(list_file, "rt") as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+    if container_url is not None:
+        import azure.storage.blob
+
+        container_client = azure.storage.blob.ContainerClient.from_container_url(
+            container_url
+        )
+        endpoint = container_client.primary_endpoint.split("?")[0]
+        for blob in container_client.list_blobs(name_starts_with=prefix):
+            if blob.name.endswith(suffix):
+                yield f"{endpoint}/{blob.name}"
+
+
+def create_local_item(
+    create_item: Callable[..., pystac.Item],
+    prefixes: Mapping[str, str],
+    source: str,
+) -> pystac.Item:
+    """
+    Create an item for a source that may be a local copy of a remote file.
+
+    The item is created for the file's URL, which replaces the longest of
+    ``prefixes``, local path prefixes mapped to URL prefixes, that ``source``
+    starts with. The file itself is read from ``source``, through
+    ``create_item``'s ``transform_href``. Sources that are URLs are passed to
+    ``create_item`` as they are.
+    """
+    if "://" in source:
+        return create_item(source)
+    url = replace_prefix(source, prefixes)
+    if url == source:
+        raise ValueError(
+            f"Can't create an item for {source}: items are created for the URLs "
+            "of files, and no prefix maps this path to one"
+        )
+    uri = pathlib.Path(source).resolve().as_uri()
+
+    def transform_href(href: Any) -> str:
+        return uri
+
+    return create_item(url, transform_href=transform_href)
+
+
+def create_one(
+    create_item: Callable[[str], pystac.Item], source: str, destination: str
+) -> BatchResult:
+    """
+    Create an item and save it to ``destination/<item id>.json``, capturing
+    any error in the result rather than raising it.
+    """
+    start = time.perf_counter()
+    try:
+        item = create_item(source)
+        href = os.path.join(destination, f"{item.id}.json")
+        item.save_object(include_self_link=False, dest_href=href)
+    except Exception:
+        logger.debug("Error creating an item for %s", source, exc_info=True)
+        return BatchResult(
+            source, error=traceback.format_exc(), seconds=time.perf_counter() - start
+        )
+    return BatchResult(source, href, seconds=time.perf_counter() - start)
+
+
+def create_items(
+    create_item: Callable[[str], pystac.Item],
+    sources: Iterable[str],
+    destination: str,
+    max_workers: int | None = None,
+    use_threads: bool = False,
+) -> Iterator[BatchResult]:
+    """
+    Create items for many sources concurrently, yielding results as they
+    complete.
+
+    Items are created on a pool of ``max_workers`` processes (or threads),
+    with at most ``2 * max_workers`` sources in flight at once. Errors are
+    captured per item, so one bad file doesn't stop the batch.
+
+    Parameters
+    ----------
+    create_item : callable
+        Creates an item from a source, e.g. :func:`stactools.deltares.stac.create_item`.
+        It must be picklable when using processes.
+    sources : iterable of str
+        The sources, e.g. from :func:`list_sources`.
+    destination : str
+        The directory to save the items in.
+    max_workers : int, optional
+        The size of the pool. Defaults to the number of CPUs.
+    use_threads : bool
+        Whether to use a thread pool instead of a process pool. Threads avoid
+        the cost of starting processes, but creating items is partly
+        CPU-bound.
+    """
+    os.makedirs(destination, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+    pool_class = (
+        concurrent.futures.ThreadPoolExecutor
+        if use_threads
+        else concurrent.futures.ProcessPoolExecutor
+    )
+    with pool_class(max_workers) as pool:
+        pending: collections.deque[concurrent.futures.Future[BatchResult]]
+        pending = collections.deque()
+        for source in sources:
+            pending.append(pool.submit(create_one, create_item, source, destination))
+            while len(pending) >= 2 * max_workers:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
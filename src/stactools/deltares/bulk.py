@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import concurrent.futures
+import glob
+import itertools
+import json
+import logging
+import os
+import posixpath
+import tempfile
+import urllib.parse
+from types import TracebackType
+from typing import Any, Iterable, Iterator, TextIO
+
+import fsspec
+import pystac
+
+logger = logging.getLogger(__name__)
+
+#: Maximum number of items per parquet file.
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def item_to_dict(item: pystac.Item | dict[str, Any]) -> dict[str, Any]:
+    """The dictionary representation of an item, passing dictionaries through."""
+    if isinstance(item, pystac.Item):
+        return item.to_dict(include_self_link=False, transform_hrefs=False)
+    return item
+
+
+def expand_paths(paths: Iterable[str]) -> Iterator[str]:
+    """Expand local glob patterns, leaving other paths and URLs as-is."""
+    for path in paths:
+        if "://" not in path and glob.has_magic(path):
+            yield from sorted(glob.glob(path, recursive=True))
+        else:
+            yield path
+
+
+def read_item_dicts(paths: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """
+    Read STAC items from JSON or NDJSON files.
+
+    Files ending with ``.ndjson`` are read line by line; other files should
+    contain a single item. Local glob patterns are expanded.
+    """
+    for path in expand_paths(paths):
+        with fsspec.open(path, "rt") as f:
+            if path.endswith(".ndjson"):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield json.load(f)
+
+
+def read_container_item_dicts(
+    container_client: Any,
+    name_starts_with: str | None = None,
+    max_workers: int = 16,
+) -> Iterator[dict[str, Any]]:
+    """
+    Read the STAC items stored as JSON blobs in an Azure Blob Storage container.
+
+    Blobs are downloaded concurrently, at most ``2 * max_workers`` at a time,
+    and yielded in listing order.
+
+    Parameters
+    ----------
+    container_client : azure.storage.blob.ContainerClient
+        The client for the container, e.g. ``floods-stac``.
+    name_starts_with : str, optional
+        Only read blobs with this prefix.
+    """
+    names = (
+        blob.name
+        for blob in container_client.list_blobs(name_starts_with=name_starts_with)
+        if blob.name.endswith(".json")
+    )
+
+    def download(name: str) -> dict[str, Any]:
+        with container_client.get_blob_client(name) as bc:
+            result: dict[str, Any] = json.loads(bc.download_blob().readall())
+            return result
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        while True:
+            batch = list(itertools.islice(names, 2 * max_workers))
+            if not batch:
+                break
+            yield from pool.map(download, batch)
+
+
+class NDJSONWriter:
+    """
+    Write STAC items as newline-delimited JSON, e.g. for bulk loading into pgstac.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.count = 0
+        self._file = fsspec.open(path, "wt").open()
+
+    def write(self, item: pystac.Item | dict[str, Any]) -> None:
+        self._file.write(json.dumps(item_to_dict(item), separators=(",", ":")))
+        self._file.write("\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class GeoParquetWriter:
+    """
+    Write STAC items to a directory of stac-geoparquet files.
+
+    Items are spooled to a temporary NDJSON file per partition, and each
+    partition is converted once, when the writer is closed, with
+    :func:`stac_geoparquet.arrow.parse_stac_ndjson_to_arrow`. That reads the
+    spool twice: once to infer a schema covering all of the partition's items,
+    including properties only some of them have, and once to write them out
+    ``chunk_size`` items at a time. So memory use is bounded by ``chunk_size``,
+    and the files of a partition share a schema and can be read as one
+    dataset. Partitions use Hive-style directory names, e.g.
+    ``deltares:dem_name=LIDAR/part-00000.parquet``, with the values URL-quoted.
+
+    GeoParquet needs a geometry, so items with a null geometry are skipped,
+    with a warning, and counted in :attr:`skipped`.
+
+    Requires the optional ``stac-geoparquet`` and ``pyarrow`` libraries, e.g.
+    with the ``geoparquet`` extra.
+
+    Parameters
+    ----------
+    path : str
+        The output directory. This can be any fsspec URL, e.g.
+        ``az://container/items``.
+    partition_by : str, optional
+        An item property to partition by, e.g. ``deltares:dem_name``.
+    chunk_size : int
+        The maximum number of items per file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        partition_by: str | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        import stac_geoparquet.arrow  # noqa: F401
+
+        self.path = path
+        self.partition_by = partition_by
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.skipped = 0
+        self.paths: list[str] = []
+        self._spool = tempfile.TemporaryDirectory()
+        self._files: dict[str | None, tuple[str, TextIO]] = {}
+
+    def write(self, item: pystac.Item | dict[str, Any]) -> None:
+        d = item_to_dict(item)
+        if d.get("geometry") is None:
+            logger.warning("Skipping item %s without a geometry", d.get("id"))
+            self.skipped += 1
+            return
+        key = None
+        if self.partition_by is not None:
+            key = str(d["properties"].get(self.partition_by))
+        if key not in self._files:
+            spool = os.path.join(self._spool.name, f"{len(self._files):05d}.ndjson")
+            self._files[key] = (spool, open(spool, "w"))
+        _, f = self._files[key]
+        f.write(json.dumps(d, separators=(",", ":")))
+        f.write("\n")
+        self.count += 1
+
+    def _convert(self, key: str | None, spool: str) -> None:
+        import pyarrow as pa
+        import pyarrow.fs
+        import stac_geoparquet.arrow
+
+        fs, root = fsspec.core.url_to_fs(self.path)
+        directory = self.path
+        if key is not None:
+            name = f"{self.partition_by}={urllib.parse.quote(key, safe='')}"
+            root = posixpath.join(root, name)
+            directory = posixpath.join(self.path, name)
+        fs.makedirs(root, exist_ok=True)
+        filesystem = pyarrow.fs.PyFileSystem(pyarrow.fs.FSSpecHandler(fs))
+
+        reader = stac_geoparquet.arrow.parse_stac_ndjson_to_arrow(
+            spool, chunk_size=self.chunk_size
+        )
+        for part, batch in enumerate(reader):
+            name = f"part-{part:05d}.parquet"
+            logger.debug("Writing %d items to %s", batch.num_rows, name)
+            stac_geoparquet.arrow.to_parquet(
+                pa.Table.from_batches([batch]),
+                posixpath.join(root, name),
+                filesystem=filesystem,
+            )
+            self.paths.append(posixpath.join(directory, name))
+
+    def close(self) -> None:
+        try:
+            while self._files:
+                key = next(iter(self._files))
+                spool, f = self._files.pop(key)
+                f.close()
+                self._convert(key, spool)
+        finally:
+            for _, f in self._files.values():
+                f.close()
+            self._files.clear()
+            self._spool.cleanup()
+
+    def __enter__(self) -> "GeoParquetWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def export_items(
+    items: Iterable[pystac.Item | dict[str, Any]],
+    ndjson_path: str | None = None,
+    geoparquet_path: str | None = None,
+    partition_by: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """
+    Export items to NDJSON and / or stac-geoparquet in a single pass.
+
+    Returns
+    -------
+    int
+        The number of items exported.
+    """
+    writers: list[NDJSONWriter | GeoParquetWriter] = []
+    if ndjson_path is not None:
+        writers.append(NDJSONWriter(ndjson_path))
+    if geoparquet_path is not None:
+        writers.append(
+            GeoParquetWriter(
+                geoparquet_path, partition_by=partition_by, chunk_size=chunk_size
+            )
+        )
+
+    count = 0
+    try:
+        for item in items:
+            d = item_to_dict(item)
+            for writer in writers:
+                writer.write(d)
+            count += 1
+    finally:
+        for writer in writers:
+            writer.close()
+    return count
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import logging
+import os
+import tempfile
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
+import xarray as xr
+from pystac import Asset, Item, MediaType
+
+from stactools.deltares import constants
+
+if TYPE_CHECKING:
+    from rasterio.windows import Window
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCKSIZE = 512
+#: Number of blocks along each side of the windows read from the source.
+DEFAULT_WINDOW_BLOCKS = 8
+
+
+def _windows(height: int, width: int, size: int) -> Iterator[Window]:
+    from rasterio.windows import Window
+
+    for row in range(0, height, size):
+        for col in range(0, width, size):
+            yield Window(col, row, min(size, width - col), min(size, height - row))
+
+
+def write_cog(
+    da: xr.DataArray,
+    destination: str,
+    x_dim: str = "lon",
+    y_dim: str = "lat",
+    blocksize: int = DEFAULT_BLOCKSIZE,
+    window_blocks: int = DEFAULT_WINDOW_BLOCKS,
+    compress: str = "deflate",
+    overview_resampling: str = "average",
+    overview_count: int | None = None,
+    max_workers: int | None = None,
+) -> None:
+    """
+    Write a 2D array on a regular lat/lon grid to a Cloud Optimized GeoTIFF.
+
+    The array is read in windows of ``blocksize * window_blocks`` pixels a
+    side, by a pool of ``max_workers`` threads, and written to a tiled
+    GeoTIFF. At most ``2 * max_workers`` windows are held in memory at once.
+    That file is then converted to a COG with internal overviews by GDAL's
+    COG driver. This requires rasterio, installed with the ``cog`` extra.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        The array, e.g. the ``inun`` variable of a flood dataset. Dimensions
+        other than ``x_dim`` and ``y_dim`` must have length one.
+    destination : str
+        Path to write the COG to.
+    compress : str
+        The compression used for the tiles.
+    overview_resampling : str
+        The resampling method used to build the overviews.
+    overview_count : int, optional
+        The number of overview levels. By default, GDAL adds levels until the
+        overview fits in a single tile.
+    """
+    import rasterio
+    import rasterio.shutil
+    import rasterio.transform
+
+    da = da.squeeze(drop=True)
+    if set(da.dims) != {x_dim, y_dim}:
+        raise ValueError(f"Expected a 2D array with dimensions {x_dim}, {y_dim}")
+    da = da.transpose(y_dim, x_dim)
+
+    x = da[x_dim].values
+    y = da[y_dim].values
+    x_res = float(x[1] - x[0])
+    y_res = abs(float(y[1] - y[0]))
+    flip = y[0] < y[-1]
+    transform = rasterio.transform.from_origin(
+        float(x[0]) - x_res / 2, float(y.max()) + y_res / 2, x_res, y_res
+    )
+    height, width = da.shape
+    nodata = np.nan if np.issubdtype(da.dtype, np.floating) else None
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+
+    def read(window: Window) -> np.ndarray:
+        rows = slice(window.row_off, window.row_off + window.height)
+        if flip:
+            rows = slice(height - rows.stop, height - rows.start)
+        values = da.isel({y_dim: rows, x_dim: window.toslices()[1]}).values
+        return values[::-1] if flip else values
+
+    profile = dict(
+        driver="GTiff",
+        height=height,
+        width=width,
+        count=1,
+        dtype=da.dtype,
+        crs="EPSG:4326",
+        transform=transform,
+        nodata=nodata,
+        tiled=True,
+        blockxsize=blocksize,
+        blockysize=blocksize,
+        compress=compress,
+        BIGTIFF="IF_SAFER",
+        NUM_THREADS="ALL_CPUS",
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = os.path.join(tmpdir, "tiled.tif")
+        with rasterio.open(tmp, "w", **profile) as dst:
+            with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+                pending: collections.deque[
+                    tuple[Window, concurrent.futures.Future[np.ndarray]]
+                ] = collections.deque()
+                windows = _windows(height, width, blocksize * window_blocks)
+                for window in windows:
+                    pending.append((window, pool.submit(read, window)))
+                    if len(pending) >= 2 * max_workers:
+                        done, future = pending.popleft()
+                        dst.write(future.result(), 1, window=done)
+                while pending:
+                    done, future = pending.popleft()
+                    dst.write(future.result(), 1, window=done)
+
+        options = dict(
+            driver="COG",
+            compress=compress,
+            blocksize=blocksize,
+            overview_resampling=overview_resampling,
+            BIGTIFF="IF_SAFER",
+            NUM_THREADS="ALL_CPUS",
+        )
+        if overview_count is not None:
+            options["overview_count"] = overview_count
+        logger.info("Writing COG to %s", destination)
+        rasterio.shutil.copy(tmp, destination, **options)
+
+
+def add_cog_asset(item: Item, href: str) -> Item:
+    """Add a COG of the flood map, written by :func:`write_cog`, to an item."""
+    item.add_asset(
+        "cog",
+        Asset(
+            href,
+            title=constants.COG_ASSET_TITLE,
+            description=constants.COG_ASSET_DESCRIPTION,
+            media_type=MediaType.COG,
+            roles=constants.COG_ASSET_ROLES,
+        ),
+    )
+    return item
@@ -1,18 +1,145 @@
 from __future__ import annotations
 
+import functools
 import json
 import logging
 import pathlib
+from typing import Any, Callable
 
 import click
+import fsspec
 import pystac
 from click import Command, Group
 
-from stactools.deltares import availability, stac
+# Only lightweight modules are imported here, so that registering the commands
+# is fast. xarray and the modules that use it are imported by the commands.
+from stactools.deltares import availability, batch, bulk, constants, database
 
 logger = logging.getLogger(__name__)
 
 
+def batch_options(f: Callable[..., Any]) -> Callable[..., Any]:
+    """The options shared by the ``create-items`` commands."""
+    options = [
+        click.argument("destination"),
+        click.argument("sources", nargs=-1),
+        click.option(
+            "--list-file", default=None, help="File with one source HREF per line"
+        ),
+        click.option(
+            "--container-url",
+            default=None,
+            help="Create items for the NetCDF files in this Azure Blob Storage "
+            "container",
+        ),
+        click.option(
+            "--prefix", default=None, help="Blob name prefix, with --container-url"
+        ),
+        click.option(
+            "--href-prefix",
+            "href_prefixes",
+            multiple=True,
+            help="LOCAL=URL, a path prefix of local sources and the URL prefix of "
+            "the files they're copies of, which items are created for. Can be "
+            "repeated",
+        ),
+        click.option(
+            "--workers", type=int, default=None, help="Defaults to the number of CPUs"
+        ),
+        click.option(
+            "--threads/--processes",
+            default=False,
+            help="Use a thread pool instead of a process pool",
+        ),
+        click.option(
+            "--errors",
+            default=None,
+            help="Path for an NDJSON file recording the sources that failed",
+        ),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
+def parse_prefixes(values: tuple[str, ...], param_hint: str) -> dict[str, str]:
+    """Parse ``OLD=NEW`` option values into a mapping of prefixes."""
+    mapping = {}
+    for value in values:
+        old, sep, new = value.partition("=")
+        if not sep or not old:
+            raise click.BadParameter(
+                f"Expected OLD=NEW, got {value!r}", param_hint=param_hint
+            )
+        mapping[old] = new
+    return mapping
+
+
+def run_batch(
+    create_item: Callable[..., pystac.Item],
+    destination: str,
+    sources: tuple[str, ...],
+    list_file: str | None,
+    container_url: str | None,
+    prefix: str | None,
+    href_prefixes: tuple[str, ...],
+    workers: int | None,
+    threads: bool,
+    errors: str | None,
+) -> None:
+    # Local sources are mapped to the URLs that items are created for.
+    create_item = functools.partial(
+        batch.create_local_item,
+        create_item,
+        parse_prefixes(href_prefixes, "--href-prefix"),
+    )
+    hrefs = list(
+        batch.list_sources(
+            sources, list_file=list_file, container_url=container_url, prefix=prefix
+        )
+    )
+    failures = []
+    results = batch.create_items(
+        create_item, hrefs, destination, max_workers=workers, use_threads=threads
+    )
+    with click.progressbar(results, length=len(hrefs), label="Creating items") as bar:
+        for result in bar:
+            if not result.ok:
+                logger.warning("Failed to create an item for %s", result.source)
+                failures.append(result)
+
+    if errors is not None:
+        with open(errors, "w") as f:
+            for result in failures:
+                f.write(result.to_json() + "\n")
+    click.echo(f"Created {len(hrefs) - len(failures)} items, {len(failures)} failed")
+    if failures:
+        raise click.ClickException(f"Failed to create {len(failures)} items")
+
+
+profile_option = click.option(
+    "--profile",
+    "profile_path",
+    default=None,
+    help="Profile the command with a sampling profiler and write the stacks to "
+    "this file, in the folded format used by flamegraph.pl",
+)
+
+
+def call_profiled(
+    profile_path: str | None, func: Callable[..., Any], *args: Any, **kwargs: Any
+) -> Any:
+    """Call ``func``, writing a profile of it to ``profile_path`` if given."""
+    if profile_path is None:
+        return func(*args, **kwargs)
+
+    from stactools.deltares import profiling
+
+    result, stacks = profiling.profile(func, *args, **kwargs)
+    profiling.write_folded(stacks, profile_path)
+    return result
+
+
 def create_deltares_command(cli: Group) -> Command:
     """Creates the stactools-deltares command line utility."""
 
@@ -35,20 +162,35 @@ def create_deltares_command(cli: Group) -> Command:
         help="Key-value pairs to include in extra-fields",
         multiple=True,
     )
+    @click.option(
+        "--items",
+        "item_sources",
+        default=None,
+        multiple=True,
+        help="Item files or glob patterns to compute summaries and extents from",
+    )
     def create_collection_command(
-        destination: str, description: str | None = None, extra_field: str | None = None
+        destination: str,
+        description: str | None = None,
+        extra_field: str | None = None,
+        item_sources: tuple[str, ...] = (),
     ) -> None:
         """Creates a STAC Collection
 
         Args:
             destination (str): An HREF for the Collection JSON
         """
+        from stactools.deltares import stac, validation
+
         extra_fields_d = dict(k.split("=") for k in extra_field)  # type: ignore
 
         collection = stac.create_collection(
-            description=description, extra_fields=extra_fields_d
+            description=description,
+            extra_fields=extra_fields_d,
+            items=bulk.read_item_dicts(item_sources) if item_sources else None,
         )
         collection.set_self_href(destination)
+        validation.use_cached_schemas()
         collection.validate()
         collection.remove_links(pystac.RelType.SELF)
         collection.remove_links(pystac.RelType.ROOT)
@@ -58,19 +200,368 @@ def create_deltares_command(cli: Group) -> Command:
     @deltares.command("create-item", short_help="Create a STAC item")
     @click.argument("source")
     @click.argument("destination")
-    def create_item_command(source: str, destination: str) -> None:
+    @click.option(
+        "--footprint/--no-footprint",
+        default=False,
+        help="Compute the item geometry from the inundated area",
+    )
+    @click.option(
+        "--statistics/--no-statistics",
+        default=False,
+        help="Compute summary statistics of the inundation depth",
+    )
+    @profile_option
+    def create_item_command(
+        source: str,
+        destination: str,
+        footprint: bool = False,
+        statistics: bool = False,
+        profile_path: str | None = None,
+    ) -> None:
         """Creates a STAC Item
 
         Args:
             source (str): HREF of the Asset associated with the Item
             destination (str): An HREF for the STAC Collection
         """
-        item = stac.create_item(source)
+        from stactools.deltares import stac
+
+        item = call_profiled(
+            profile_path,
+            stac.create_item,
+            source,
+            footprint=footprint,
+            statistics=statistics,
+        )
 
         item.save_object(dest_href=destination)
 
         return None
 
+    @deltares.command(
+        "create-items", short_help="Create STAC items for many files concurrently"
+    )
+    @batch_options
+    @click.option(
+        "--footprint/--no-footprint",
+        default=False,
+        help="Compute the item geometry from the inundated area",
+    )
+    @click.option(
+        "--statistics/--no-statistics",
+        default=False,
+        help="Compute summary statistics of the inundation depth",
+    )
+    def create_items_command(
+        footprint: bool = False, statistics: bool = False, **kwargs: Any
+    ) -> None:
+        """Creates STAC Items for many NetCDF files, on a pool of workers
+
+        Args:
+            destination (str): Directory for the items
+            sources (str): HREFs of the NetCDF files, or local paths or glob
+                patterns with --href-prefix
+        """
+        from stactools.deltares import stac
+
+        create_item = functools.partial(
+            stac.create_item, footprint=footprint, statistics=statistics
+        )
+        run_batch(create_item, **kwargs)
+
+        return None
+
+    @deltares.command(
+        "create-cog", short_help="Convert a flood map to a Cloud Optimized GeoTIFF"
+    )
+    @click.argument("source")
+    @click.argument("destination")
+    @click.option(
+        "--overview-count",
+        type=int,
+        default=None,
+        help="Number of overview levels. Defaults to GDAL's choice.",
+    )
+    def create_cog_command(
+        source: str, destination: str, overview_count: int | None = None
+    ) -> None:
+        """Converts a flood map NetCDF file to a COG
+
+        Args:
+            source (str): Path or HREF of the NetCDF file
+            destination (str): Path for the COG
+        """
+        import xarray as xr
+
+        from stactools.deltares import cog
+
+        with fsspec.open(source) as f:
+            with xr.open_dataset(f, engine="h5netcdf") as ds:
+                cog.write_cog(ds.inun, destination, overview_count=overview_count)
+
+        return None
+
+    @deltares.command(
+        "export-items",
+        short_help="Export STAC items to NDJSON and / or stac-geoparquet",
+    )
+    @click.argument("sources", nargs=-1)
+    @click.option("--ndjson", default=None, help="Path for the NDJSON output")
+    @click.option(
+        "--geoparquet", default=None, help="Directory for the stac-geoparquet output"
+    )
+    @click.option(
+        "--partition-by",
+        default=None,
+        help="Item property to partition the geoparquet output by",
+    )
+    @click.option(
+        "--chunk-size",
+        type=int,
+        default=bulk.DEFAULT_CHUNK_SIZE,
+        show_default=True,
+        help="Maximum number of items per geoparquet file",
+    )
+    @click.option(
+        "--container-url",
+        default=None,
+        help="Read items from this Azure Blob Storage container instead",
+    )
+    @click.option(
+        "--prefix", default=None, help="Blob name prefix, with --container-url"
+    )
+    def export_items_command(
+        sources: tuple[str, ...],
+        ndjson: str | None,
+        geoparquet: str | None,
+        partition_by: str | None,
+        chunk_size: int,
+        container_url: str | None,
+        prefix: str | None,
+    ) -> None:
+        """Exports STAC items in bulk
+
+        Args:
+            sources (str): Item JSON or NDJSON files, or glob patterns
+        """
+        if container_url is not None:
+            import azure.storage.blob
+
+            container_client = azure.storage.blob.ContainerClient.from_container_url(
+                container_url
+            )
+            items = bulk.read_container_item_dicts(container_client, prefix)
+        else:
+            items = bulk.read_item_dicts(sources)
+
+        count = bulk.export_items(
+            items,
+            ndjson_path=ndjson,
+            geoparquet_path=geoparquet,
+            partition_by=partition_by,
+            chunk_size=chunk_size,
+        )
+        click.echo(f"Exported {count} items")
+
+        return None
+
+    @deltares.command(
+        "create-database",
+        short_help="Create a local database of STAC items for fast searches",
+    )
+    @click.argument("destination")
+    @click.argument("sources", nargs=-1)
+    def create_database_command(destination: str, sources: tuple[str, ...]) -> None:
+        """Creates (or adds to) a SQLite database of STAC items
+
+        Args:
+            destination (str): Path of the SQLite database
+            sources (str): Item JSON or NDJSON files, or glob patterns
+        """
+        with database.ItemDatabase(destination) as db:
+            count = db.add_items(bulk.read_item_dicts(sources))
+        click.echo(f"Added {count} items")
+
+        return None
+
+    @deltares.command(
+        "fetch-schemas",
+        short_help="Download the STAC schemas used for validation into the cache",
+    )
+    @click.argument("uris", nargs=-1)
+    @click.option(
+        "--cache-dir",
+        default=None,
+        help="Schema cache directory. Defaults to $STACTOOLS_DELTARES_SCHEMA_CACHE "
+        "or ~/.cache/stactools-deltares/schemas",
+    )
+    def fetch_schemas_command(uris: tuple[str, ...], cache_dir: str | None) -> None:
+        """Downloads STAC schemas, and the schemas they reference, for offline
+        validation
+
+        Args:
+            uris (str): Schema URIs. Defaults to the core and extension schemas
+                used by this package.
+        """
+        from stactools.deltares import validation
+
+        fetched = validation.fetch_schemas(uris or None, cache_dir=cache_dir)
+        click.echo(f"Cached {len(fetched)} schemas")
+
+        return None
+
+    @deltares.command("validate", short_help="Validate STAC items in bulk")
+    @click.argument("sources", nargs=-1)
+    @click.option("--cache-dir", default=None, help="Schema cache directory")
+    @click.option(
+        "--offline/--online",
+        default=False,
+        help="Fail, rather than fetch, when a schema isn't cached",
+    )
+    @click.option(
+        "--workers", type=int, default=None, help="Defaults to the number of CPUs"
+    )
+    def validate_command(
+        sources: tuple[str, ...],
+        cache_dir: str | None,
+        offline: bool,
+        workers: int | None,
+    ) -> None:
+        """Validates STAC items or collections against cached schemas
+
+        Args:
+            sources (str): JSON or NDJSON files, or glob patterns
+        """
+        from stactools.deltares import validation
+
+        count = invalid = 0
+        for id, errors in validation.validate_dicts(
+            bulk.read_item_dicts(sources),
+            cache_dir=cache_dir,
+            fetch=not offline,
+            max_workers=workers,
+        ):
+            count += 1
+            if errors:
+                invalid += 1
+                click.echo(f"{id}:", err=True)
+                for error in errors:
+                    click.echo(f"  {error}", err=True)
+        click.echo(f"Validated {count} objects, {invalid} invalid")
+        if invalid:
+            raise click.ClickException(f"{invalid} objects are invalid")
+
+        return None
+
+    @deltares.command(
+        "telemetry-report",
+        short_help="Summarize the per-stage timings written by the ETL",
+    )
+    @click.argument("sources", nargs=-1, required=True)
+    @click.option("--json", "as_json", is_flag=True, help="Print the summary as JSON")
+    def telemetry_report_command(sources: tuple[str, ...], as_json: bool) -> None:
+        """Prints per-stage percentiles and throughput of ETL runs
+
+        Args:
+            sources (str): JSON lines files written by the ETL's --telemetry
+                option, or glob patterns
+        """
+        from stactools.deltares import telemetry
+
+        spans = [
+            span
+            for path in bulk.expand_paths(sources)
+            for span in telemetry.read_spans(path)
+        ]
+        if as_json:
+            click.echo(json.dumps(telemetry.summarize(spans), indent=2))
+        else:
+            click.echo(telemetry.format_report(spans))
+
+        return None
+
+    @deltares.command(
+        "relocate",
+        short_help="Rewrite the URL prefixes in reference files or items",
+    )
+    @click.argument("sources", nargs=-1)
+    @click.option(
+        "--prefix",
+        "prefixes",
+        multiple=True,
+        required=True,
+        help="OLD=NEW, a URL prefix and its replacement. Can be repeated",
+    )
+    @click.option(
+        "--kind",
+        type=click.Choice(["references", "items"]),
+        default="references",
+        show_default=True,
+        help="Whether the sources are Kerchunk reference files or STAC items",
+    )
+    @click.option(
+        "--asset",
+        "assets",
+        multiple=True,
+        default=["data", "index"],
+        show_default=True,
+        help="Item assets whose hrefs are rewritten, with --kind items",
+    )
+    @click.option(
+        "--list-file", default=None, help="File with one source path per line"
+    )
+    @click.option(
+        "--output-dir",
+        default=None,
+        help="Write the rewritten files here instead of in place",
+    )
+    @click.option(
+        "--workers",
+        type=int,
+        default=16,
+        show_default=True,
+        help="Files rewritten at once",
+    )
+    def relocate_command(
+        sources: tuple[str, ...],
+        prefixes: tuple[str, ...],
+        kind: str,
+        assets: tuple[str, ...],
+        list_file: str | None,
+        output_dir: str | None,
+        workers: int,
+    ) -> None:
+        """Rewrites the URL prefixes of the files referenced by Kerchunk
+        references, or of item assets, after the data has moved
+
+        Args:
+            sources (str): JSON (or, for items, NDJSON) files, or glob patterns
+        """
+        from stactools.deltares import relocate
+
+        mapping = parse_prefixes(prefixes, "--prefix")
+
+        files = count = failed = 0
+        for result in relocate.relocate_files(
+            batch.list_sources(sources, list_file=list_file),
+            mapping,
+            kind=kind,
+            output_dir=output_dir,
+            assets=assets,
+            max_workers=workers,
+        ):
+            files += 1
+            if result.error is not None:
+                failed += 1
+                click.echo(f"{result.source}: {result.error}", err=True)
+            else:
+                count += result.count
+        click.echo(f"Rewrote {count} hrefs in {files - failed} files, {failed} failed")
+        if failed:
+            raise click.ClickException(f"Failed to relocate {failed} files")
+
+        return None
+
     return deltares
 
 
@@ -96,20 +587,42 @@ def create_availability_command(cli: Group) -> Command:
         help="Key-value pairs to include in extra-fields",
         multiple=True,
     )
+    @click.option(
+        "--items",
+        "item_sources",
+        default=None,
+        multiple=True,
+        help="Item files or glob patterns to compute summaries and extents from",
+    )
+    @click.option(
+        "--locations-href",
+        default=None,
+        help="HREF of the reservoir locations table, added as a collection asset",
+    )
     def create_collection_command(
-        destination: str, description: str | None = None, extra_field: str | None = None
+        destination: str,
+        description: str | None = None,
+        extra_field: str | None = None,
+        locations_href: str | None = None,
+        item_sources: tuple[str, ...] = (),
     ) -> None:
         """Creates a STAC Collection
 
         Args:
             destination (str): An HREF for the Collection JSON
         """
+        from stactools.deltares import validation
+
         extra_fields_d = dict(k.split("=") for k in extra_field)  # type: ignore
 
         collection = availability.stac.create_collection(
-            description=description, extra_fields=extra_fields_d
+            description=description,
+            extra_fields=extra_fields_d,
+            locations_href=locations_href,
+            items=bulk.read_item_dicts(item_sources) if item_sources else None,
         )
         collection.set_self_href(destination)
+        validation.use_cached_schemas()
         collection.validate()
         collection.remove_links(pystac.RelType.SELF)
         collection.remove_links(pystac.RelType.ROOT)
@@ -119,17 +632,156 @@ def create_availability_command(cli: Group) -> Command:
     @deltares.command("create-item", short_help="Create a STAC item")
     @click.argument("source")
     @click.argument("destination")
-    def create_item_command(source: str, destination: str) -> None:
+    @click.option(
+        "--statistics/--no-statistics",
+        default=False,
+        help="Compute summary statistics of each variable",
+    )
+    @profile_option
+    def create_item_command(
+        source: str,
+        destination: str,
+        statistics: bool = False,
+        profile_path: str | None = None,
+    ) -> None:
         """Creates a STAC Item
 
         Args:
             source (str): HREF of the Asset associated with the Item
             destination (str): An HREF for the STAC Collection
         """
-        item = stac.create_item(source)
+        import planetary_computer
+
+        item = call_profiled(
+            profile_path,
+            availability.stac.create_item,
+            source,
+            transform_href=planetary_computer.sign,
+            statistics=statistics,
+        )
 
         item.save_object(dest_href=destination)
 
         return None
 
+    @deltares.command(
+        "create-items", short_help="Create STAC items for many files concurrently"
+    )
+    @batch_options
+    @click.option(
+        "--statistics/--no-statistics",
+        default=False,
+        help="Compute summary statistics of each variable",
+    )
+    def create_items_command(statistics: bool = False, **kwargs: Any) -> None:
+        """Creates STAC Items for many NetCDF files, on a pool of workers
+
+        Args:
+            destination (str): Directory for the items
+            sources (str): HREFs of the NetCDF files, or local paths or glob
+                patterns with --href-prefix
+        """
+        import planetary_computer
+
+        create_item = functools.partial(
+            availability.stac.create_item,
+            transform_href=planetary_computer.sign,
+            statistics=statistics,
+        )
+        run_batch(create_item, **kwargs)
+
+        return None
+
+    @deltares.command(
+        "create-locations",
+        short_help="Create the reservoir locations table",
+    )
+    @click.argument("destination")
+    @click.option(
+        "--reservoir",
+        "reservoirs",
+        multiple=True,
+        type=click.Choice(list(constants.NUMBER_OF_BASINS)),
+        help="Sources to include. Defaults to all of them.",
+    )
+    def create_locations_command(destination: str, reservoirs: tuple[str, ...]) -> None:
+        """Creates the reservoir locations table
+
+        Args:
+            destination (str): Path for the NetCDF table
+        """
+        import planetary_computer
+
+        locations = availability.locations.build_locations(
+            reservoirs or tuple(constants.NUMBER_OF_BASINS),
+            transform_href=planetary_computer.sign,
+        )
+        locations.to_netcdf(destination)
+
+        return None
+
+    @deltares.command(
+        "create-zarr",
+        short_help="Create a time-series Zarr copy of a water availability file",
+    )
+    @click.argument("source")
+    @click.argument("destination")
+    @click.option(
+        "--grand-ids-per-chunk",
+        type=int,
+        default=constants.DEFAULT_GRAND_IDS_PER_CHUNK,
+        show_default=True,
+        help="Number of reservoirs per chunk",
+    )
+    def create_zarr_command(
+        source: str, destination: str, grand_ids_per_chunk: int
+    ) -> None:
+        """Creates a Zarr store chunked for reading reservoir time series
+
+        Args:
+            source (str): HREF of the NetCDF file
+            destination (str): Path or URL of the Zarr store
+        """
+        import planetary_computer
+        import xarray as xr
+
+        with fsspec.open(planetary_computer.sign(source)) as f:
+            with xr.open_dataset(f, engine="h5netcdf") as ds:
+                availability.rechunk.write_timeseries_zarr(
+                    ds, destination, grand_ids_per_chunk=grand_ids_per_chunk
+                )
+
+        return None
+
+    @deltares.command(
+        "create-aggregates",
+        short_help="Create monthly, annual and climatology means of a water "
+        "availability file",
+    )
+    @click.argument("source")
+    @click.argument("destination")
+    def create_aggregates_command(source: str, destination: str) -> None:
+        """Creates Zarr stores of temporal aggregates, named monthly.zarr,
+        annual.zarr and climatology.zarr
+
+        Args:
+            source (str): HREF of the NetCDF file
+            destination (str): Directory or URL prefix for the Zarr stores
+        """
+        import planetary_computer
+        import xarray as xr
+
+        with fsspec.open(planetary_computer.sign(source)) as f:
+            with xr.open_dataset(f, engine="h5netcdf") as ds:
+                result = availability.aggregates.compute_aggregates(ds)
+        availability.aggregates.write_aggregates(
+            result,
+            {
+                key: f"{destination.rstrip('/')}/{key}.zarr"
+                for key in availability.aggregates.AGGREGATES
+            },
+        )
+
+        return None
+
     return deltares
@@ -1,6 +1,7 @@
 from pystac import Link, RelType
 
 NETCDF_MEDIA_TYPE = "application/x-netcdf"
+ZARR_MEDIA_TYPE = "application/vnd+zarr"
 
 LICENSE = Link(
     RelType.LICENSE,
@@ -20,6 +21,53 @@ INDEX_ASSET_TITLE = "Index file"
 INDEX_ASSET_DESCRIPTION = "Kerchunk index file."
 INDEX_ASSET_ROLES = ["index"]
 
+COG_ASSET_TITLE = "Flood Map (COG)"
+COG_ASSET_DESCRIPTION = (
+    "Cloud Optimized GeoTIFF of the inundation depth, with internal overviews."
+)
+COG_ASSET_ROLES = ["data", "visual"]
+
+ZARR_ASSET_TITLE = "Time series Zarr store"
+ZARR_ASSET_DESCRIPTION = (
+    "Copy of the reservoir data in Zarr, chunked along GrandID so that each "
+    "reservoir's full time series is in a single chunk."
+)
+ZARR_ASSET_ROLES = ["data", "zarr"]
+
+#: Number of reservoirs per chunk of the time-series Zarr store.
+DEFAULT_GRAND_IDS_PER_CHUNK = 4
+
+#: The sources of the water availability data, with their number of reservoirs.
+NUMBER_OF_BASINS = {
+    "ERA5": 3236,
+    "CHIRPS": 2951,
+    "EOBS": 682,
+    "NLDAS": 1090,
+    "BOM": 116,
+}
+
+AGGREGATE_ASSET_TITLES = {
+    "monthly": "Monthly means",
+    "annual": "Annual means",
+    "climatology": "Monthly climatology",
+}
+AGGREGATE_ASSET_DESCRIPTIONS = {
+    "monthly": "Zarr store with the mean of each variable per calendar month.",
+    "annual": "Zarr store with the mean of each variable per calendar year.",
+    "climatology": (
+        "Zarr store with the mean of each variable per month of the year, "
+        "over the full record."
+    ),
+}
+AGGREGATE_ASSET_ROLES = ["data", "zarr"]
+
+LOCATIONS_ASSET_TITLE = "Reservoir locations"
+LOCATIONS_ASSET_DESCRIPTION = (
+    "Table of reservoir GrandIDs, locations and sources, for building a "
+    "spatial index over the reservoirs."
+)
+LOCATIONS_ASSET_ROLES = ["metadata"]
+
 FLOOD_CUBE_DIMENSIONS = {
     "time": {
         "extent": ["2010-01-01T00:00:00Z", "2010-01-01T00:00:00Z"],
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import sqlite3
+from types import TracebackType
+from typing import Any, Iterable, Iterator
+
+import pystac
+
+from stactools.deltares.bulk import item_to_dict
+
+logger = logging.getLogger(__name__)
+
+#: Item properties with an indexed column, mapped to the column name.
+INDEXED_PROPERTIES = {
+    "deltares:dem_name": "dem_name",
+    "deltares:resolution": "resolution",
+    "deltares:sea_level_year": "sea_level_year",
+    "deltares:return_period": "return_period",
+    "deltares:reservoir": "reservoir",
+}
+
+#: Comparison operators of the STAC API query extension.
+OPERATORS = {
+    "eq": "=",
+    "neq": "!=",
+    "lt": "<",
+    "lte": "<=",
+    "gt": ">",
+    "gte": ">=",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    collection TEXT,
+    datetime TEXT,
+    dem_name TEXT,
+    resolution TEXT,
+    sea_level_year INTEGER,
+    return_period INTEGER,
+    reservoir TEXT,
+    item TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_dem_name ON items (dem_name);
+CREATE INDEX IF NOT EXISTS items_resolution ON items (resolution);
+CREATE INDEX IF NOT EXISTS items_sea_level_year ON items (sea_level_year);
+CREATE INDEX IF NOT EXISTS items_return_period ON items (return_period);
+CREATE INDEX IF NOT EXISTS items_reservoir ON items (reservoir);
+CREATE INDEX IF NOT EXISTS items_floods ON items (
+    dem_name, resolution, sea_level_year, return_period
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_bbox USING rtree (
+    id, xmin, xmax, ymin, ymax
+);
+"""
+
+
+class ItemDatabase:
+    """
+    A local SQLite database of STAC items, indexed by their ``deltares:``
+    properties and bounding box.
+
+    The items are stored as JSON alongside indexed columns for each of
+    :data:`INDEXED_PROPERTIES`, and their bounding boxes are stored in an
+    R*Tree, so lookups don't need to parse every item.
+
+    Examples
+    --------
+    >>> with ItemDatabase("items.db") as db:
+    ...     db.add_items(bulk.read_item_dicts(["items/*.json"]))
+    ...     items = db.search(
+    ...         dem_name="LIDAR",
+    ...         resolution="90m",
+    ...         sea_level_year=2050,
+    ...         query={"deltares:return_period": {"gte": 100}},
+    ...     )
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def add_items(
+        self, items: Iterable[pystac.Item | dict[str, Any]], batch_size: int = 1000
+    ) -> int:
+        """
+        Add items to the database, replacing any existing items with the same ID.
+
+        Returns
+        -------
+        int
+            The number of items added.
+        """
+        count = 0
+        iterator = iter(items)
+        while True:
+            batch = [item_to_dict(x) for x in itertools.islice(iterator, batch_size)]
+            if not batch:
+                break
+            with self.connection:
+                self._add_batch(batch)
+            count += len(batch)
+        logger.debug("Added %d items to %s", count, self.path)
+        return count
+
+    def _add_batch(self, batch: list[dict[str, Any]]) -> None:
+        ids = [(d["id"],) for d in batch]
+        self.connection.executemany(
+            "DELETE FROM items_bbox WHERE id IN (SELECT rowid FROM items WHERE id = ?)",
+            ids,
+        )
+        self.connection.executemany("DELETE FROM items WHERE id = ?", ids)
+        for d in batch:
+            properties = d.get("properties", {})
+            cursor = self.connection.execute(
+                "INSERT INTO items "
+                "(id, collection, datetime, dem_name, resolution, sea_level_year, "
+                "return_period, reservoir, item) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    d["id"],
+                    d.get("collection"),
+                    properties.get("datetime"),
+                    *(properties.get(key) for key in INDEXED_PROPERTIES),
+                    json.dumps(d, separators=(",", ":")),
+                ),
+            )
+            bbox = d.get("bbox")
+            if bbox:
+                n = len(bbox) // 2
+                xmin, ymin, xmax, ymax = bbox[0], bbox[1], bbox[n], bbox[n + 1]
+                self.connection.execute(
+                    "INSERT INTO items_bbox VALUES (?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, xmin, xmax, ymin, ymax),
+                )
+
+    def _where(
+        self,
+        bbox: Iterable[float] | None,
+        ids: Iterable[str] | None,
+        query: dict[str, dict[str, Any]] | None,
+        filters: dict[str, Any],
+    ) -> tuple[str, list[Any]]:
+        clauses = []
+        params: list[Any] = []
+
+        query = {key: dict(value) for key, value in (query or {}).items()}
+        for name, value in filters.items():
+            query.setdefault(f"deltares:{name}", {})["eq"] = value
+
+        for key, conditions in query.items():
+            if key not in INDEXED_PROPERTIES:
+                raise ValueError(
+                    f"Can't query on {key!r}. Indexed properties are "
+                    f"{', '.join(INDEXED_PROPERTIES)}."
+                )
+            column = INDEXED_PROPERTIES[key]
+            for op, value in conditions.items():
+                if op == "in":
+                    values = list(value)
+                    placeholders = ", ".join("?" * len(values))
+                    clauses.append(f"{column} IN ({placeholders})")
+                    params.extend(values)
+                elif op in OPERATORS:
+                    clauses.append(f"{column} {OPERATORS[op]} ?")
+                    params.append(value)
+                else:
+                    raise ValueError(f"Unknown operator {op!r}")
+
+        if ids is not None:
+            ids = list(ids)
+            clauses.append(f"id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+
+        if bbox is not None:
+            xmin, ymin, xmax, ymax = bbox
+            clauses.append(
+                "rowid IN (SELECT id FROM items_bbox "
+                "WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?)"
+            )
+            params.extend([xmax, xmin, ymax, ymin])
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def search(
+        self,
+        bbox: Iterable[float] | None = None,
+        ids: Iterable[str] | None = None,
+        query: dict[str, dict[str, Any]] | None = None,
+        limit: int | None = None,
+        **filters: Any,
+    ) -> Iterator[pystac.Item]:
+        """
+        Search for items, yielding them lazily.
+
+        Parameters
+        ----------
+        bbox : list of float, optional
+            Only match items whose bounding box intersects
+            ``[xmin, ymin, xmax, ymax]``.
+        ids : list of str, optional
+            Only match items with these IDs.
+        query : dict, optional
+            Conditions on the indexed properties, in the style of the STAC API
+            query extension, e.g. ``{"deltares:return_period": {"gte": 100}}``.
+            Supported operators are ``eq``, ``neq``, ``lt``, ``lte``, ``gt``,
+            ``gte`` and ``in``.
+        limit : int, optional
+            The maximum number of items to return.
+        **filters
+            Equality conditions on the indexed properties, without the
+            ``deltares:`` prefix, e.g. ``dem_name="LIDAR"``.
+        """
+        where, params = self._where(bbox, ids, query, filters)
+        sql = f"SELECT item FROM items{where} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for (item,) in self.connection.execute(sql, params):
+            yield pystac.Item.from_dict(json.loads(item), preserve_dict=False)
+
+    def count(
+        self,
+        bbox: Iterable[float] | None = None,
+        ids: Iterable[str] | None = None,
+        query: dict[str, dict[str, Any]] | None = None,
+        **filters: Any,
+    ) -> int:
+        """The number of items matching a search. See :meth:`search`."""
+        where, params = self._where(bbox, ids, query, filters)
+        (result,) = self.connection.execute(
+            f"SELECT COUNT(*) FROM items{where}", params
+        ).fetchone()
+        return int(result)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "ItemDatabase":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
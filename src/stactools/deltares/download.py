@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import urllib.request
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from pystac import Asset
+from pystac.extensions.file import FileExtension
+
+logger = logging.getLogger(__name__)
+
+#: Bytes read from the network at a time.
+DEFAULT_BLOCK_SIZE = 2**20
+#: The multihash code of SHA2-256.
+SHA2_256 = 0x12
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def multihash(digest: bytes, code: int = SHA2_256) -> str:
+    """The hex-encoded `multihash <https://multiformats.io/multihash/>`_ of a digest."""
+    return (_varint(code) + _varint(len(digest)) + digest).hex()
+
+
+class BufferFile(io.RawIOBase):
+    """
+    A read-only file over a buffer in memory.
+
+    Reads copy straight from the buffer into the reader's buffer, so several
+    readers, e.g. h5netcdf and kerchunk, can each have their own position in
+    the same buffer without copying it.
+    """
+
+    def __init__(self, buffer: bytes | bytearray | memoryview) -> None:
+        self._buffer = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b: bytearray | memoryview) -> int:  # type: ignore[override]
+        n = max(min(len(b), len(self._buffer) - self._position), 0)
+        memoryview(b).cast("B")[:n] = self._buffer[self._position : self._position + n]
+        self._position += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._buffer)
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+
+@dataclass
+class Download:
+    """
+    A downloaded file, with its size in bytes and SHA2-256 multihash.
+
+    The file is either saved to ``filename`` or, if it was small enough, kept
+    in memory in ``buffer``.
+    """
+
+    filename: str | None
+    size: int
+    checksum: str
+    buffer: bytearray | None = None
+
+    def open(self) -> BinaryIO:
+        """Open the file for reading, from memory if it's kept there."""
+        if self.buffer is not None:
+            return io.BufferedReader(BufferFile(self.buffer))
+        assert self.filename is not None
+        return open(self.filename, "rb")
+
+
+def download(
+    href: str,
+    filename: str | None = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_memory_size: int = 0,
+) -> Download:
+    """
+    Download a file, computing its size and checksum as it's written.
+
+    The checksum is computed from the blocks as they arrive, so it doesn't
+    take another pass over the file.
+
+    Parameters
+    ----------
+    href : str
+        The URL to download, e.g. a signed URL of a NetCDF file.
+    filename : str, optional
+        Where to save the file. Defaults to a new temporary file, which the
+        caller should remove. It's removed here if the download fails.
+    block_size : int
+        Bytes read at a time.
+    max_memory_size : int
+        Files of up to this many bytes are read into a buffer in memory
+        instead of saved, when the server reports their size. The result's
+        ``filename`` is None then. Zero, the default, always saves the file,
+        as do empty files.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    with urllib.request.urlopen(href) as response:
+        length = response.headers.get("Content-Length")
+        if length is not None and 0 < int(length) <= max_memory_size:
+            # Blocks are read straight into the buffer, which is used as is.
+            buffer = bytearray(int(length))
+            view = memoryview(buffer)
+            while size < len(buffer) and (
+                n := response.readinto(view[size : size + block_size])
+            ):
+                sha256.update(view[size : size + n])
+                size += n
+            if size != len(buffer):
+                raise OSError(f"Expected {len(buffer)} bytes from {href}, got {size}")
+            logger.debug("Downloaded %d bytes to memory", size)
+            return Download(None, size, multihash(sha256.digest()), buffer)
+
+        temporary = filename is None
+        if filename is None:
+            suffix = os.path.splitext(href.split("?")[0])[1]
+            fd, filename = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+        try:
+            with open(filename, "wb") as f:
+                while block := response.read(block_size):
+                    sha256.update(block)
+                    f.write(block)
+                    size += len(block)
+        except BaseException:
+            if temporary:
+                os.remove(filename)
+            raise
+    logger.debug("Downloaded %d bytes to %s", size, filename)
+    return Download(filename, size, multihash(sha256.digest()))
+
+
+def add_file_info(asset: Asset, info: Download) -> Asset:
+    """Record the size and checksum of a download on an asset."""
+    ext = FileExtension.ext(asset, add_if_missing=True)
+    ext.size = info.size
+    ext.checksum = info.checksum
+    return asset
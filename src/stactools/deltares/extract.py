@@ -0,0 +1,412 @@
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+import pystac
+import shapely
+import xarray as xr
+
+from stactools.deltares import reader
+from stactools.deltares.utils import DEFAULT_MAX_BLOCK_CELLS
+
+logger = logging.getLogger(__name__)
+
+#: Chunk size, along each spatial dimension, used when the storage chunks
+#: of an array aren't known.
+DEFAULT_CHUNK_SIZE = 1024
+#: Properties of flood items added as coordinates by :func:`extract_items`.
+ITEM_COORDINATES = [
+    "deltares:dem_name",
+    "deltares:resolution",
+    "deltares:sea_level_year",
+    "deltares:return_period",
+]
+
+
+def nearest_index(coord: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    The index of the nearest cell of a regular coordinate for each value.
+
+    Values more than half a cell outside the coordinate get an index of -1.
+    The coordinate may be ascending or descending.
+    """
+    coord = np.asarray(coord, dtype="float64")
+    values = np.asarray(values, dtype="float64")
+    n = len(coord)
+    step = float(coord[1] - coord[0]) if n > 1 else 1.0
+    index = np.rint((values - coord[0]) / step)
+    index[~np.isfinite(index) | (index < 0) | (index >= n)] = -1
+    result: np.ndarray = index.astype("int64")
+    return result
+
+
+def chunk_sizes(da: xr.DataArray, dims: Sequence[str]) -> tuple[int, ...]:
+    """
+    The storage chunk sizes of an array along some dimensions.
+
+    These come from the dask chunks, if ``da`` is backed by dask, or the
+    encoding of an array opened from NetCDF or Zarr. Otherwise
+    :data:`DEFAULT_CHUNK_SIZE` is used.
+    """
+    axes = [da.dims.index(dim) for dim in dims]
+    if da.chunks is not None:
+        return tuple(int(da.chunks[axis][0]) for axis in axes)
+    chunks = da.encoding.get("chunks") or da.encoding.get("chunksizes")
+    if chunks is not None:
+        return tuple(int(chunks[axis]) for axis in axes)
+    preferred = da.encoding.get("preferred_chunks", {})
+    return tuple(int(preferred.get(dim, DEFAULT_CHUNK_SIZE)) for dim in dims)
+
+
+def gather(
+    da: xr.DataArray,
+    y_index: np.ndarray,
+    x_index: np.ndarray,
+    x_dim: str = "lon",
+    y_dim: str = "lat",
+    max_workers: int | None = None,
+) -> np.ndarray:
+    """
+    Gather the values of an array at pairs of indices.
+
+    The indices are grouped by the storage chunk they fall in, and each
+    chunk that's needed is read once, by a pool of ``max_workers`` threads.
+    The values are then picked out of each chunk with vectorised indexing.
+    The cost is bounded by the number of distinct chunks, not the number of
+    indices.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        The array, e.g. the ``inun`` variable of a flood dataset, opened
+        lazily.
+    y_index, x_index : numpy.ndarray
+        Integer positions along ``y_dim`` and ``x_dim``. Positions of -1 are
+        treated as missing.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array with the shape of the other dimensions of ``da``, followed
+        by the number of indices. Missing positions are NaN.
+    """
+    da = da.transpose(..., y_dim, x_dim)
+    y_index = np.asarray(y_index, dtype="int64")
+    x_index = np.asarray(x_index, dtype="int64")
+    dtype = np.result_type(da.dtype, np.float32)
+    out = np.full(da.shape[:-2] + y_index.shape, np.nan, dtype=dtype)
+
+    valid = np.flatnonzero((y_index >= 0) & (x_index >= 0))
+    if not len(valid):
+        return out
+    y_chunk, x_chunk = chunk_sizes(da, [y_dim, x_dim])
+    n_x_chunks = -(-da.sizes[x_dim] // x_chunk)
+    keys = y_index[valid] // y_chunk * n_x_chunks + x_index[valid] // x_chunk
+    order = np.argsort(keys, kind="stable")
+    keys, starts = np.unique(keys[order], return_index=True)
+    groups = np.split(valid[order], starts[1:])
+    logger.debug("Gathering %d values from %d chunks", len(valid), len(keys))
+
+    def read(key: int, positions: np.ndarray) -> None:
+        y0 = key // n_x_chunks * y_chunk
+        x0 = key % n_x_chunks * x_chunk
+        block = da.isel(
+            {y_dim: slice(y0, y0 + y_chunk), x_dim: slice(x0, x0 + x_chunk)}
+        ).values
+        out[..., positions] = block[
+            ..., y_index[positions] - y0, x_index[positions] - x0
+        ]
+
+    max_workers = max_workers or min(16, (os.cpu_count() or 1) * 2)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        futures = [pool.submit(read, key, group) for key, group in zip(keys, groups)]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+    return out
+
+
+def extract_points(
+    da: xr.DataArray,
+    lon: Iterable[float],
+    lat: Iterable[float],
+    x_dim: str = "lon",
+    y_dim: str = "lat",
+    max_workers: int | None = None,
+) -> xr.DataArray:
+    """
+    Sample an array at the nearest cell to each of many points.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        The array, e.g. the ``inun`` variable of a flood dataset, opened
+        lazily.
+    lon, lat : array-like
+        The coordinates of the points.
+
+    Returns
+    -------
+    xarray.DataArray
+        The values, with a ``point`` dimension replacing ``x_dim`` and
+        ``y_dim``. Points outside the array are NaN.
+
+    Examples
+    --------
+    >>> ds = reader.open_item(item)
+    >>> depth = extract_points(ds.inun, lon=[4.9, 5.1], lat=[52.4, 52.3])
+    """
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    if lon.shape != lat.shape or lon.ndim != 1:
+        raise ValueError("lon and lat must be one-dimensional and the same length")
+    da = da.transpose(..., y_dim, x_dim)
+    values = gather(
+        da,
+        nearest_index(da[y_dim].values, lat),
+        nearest_index(da[x_dim].values, lon),
+        x_dim=x_dim,
+        y_dim=y_dim,
+        max_workers=max_workers,
+    )
+    other = {dim: da[dim] for dim in da.dims[:-2] if dim in da.coords}
+    return xr.DataArray(
+        values,
+        dims=da.dims[:-2] + ("point",),
+        coords={**other, "lon": ("point", lon), "lat": ("point", lat)},
+        name=da.name,
+        attrs=da.attrs,
+    )
+
+
+def region_indices(
+    geometries: Iterable[Any],
+    x: np.ndarray,
+    y: np.ndarray,
+    max_block_cells: int = DEFAULT_MAX_BLOCK_CELLS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The cells whose centers fall within each of some geometries.
+
+    The cells within the bounds of each geometry are tested in blocks of
+    rows of at most ``max_block_cells`` cells, so a large geometry on a fine
+    grid doesn't need a grid of coordinates covering its whole bounds.
+
+    Returns
+    -------
+    region, y_index, x_index : numpy.ndarray
+        The position of the geometry, and the indices of the cell, for each
+        cell within a geometry.
+    """
+    regions, ys, xs = [], [], []
+    for i, geometry in enumerate(geometries):
+        xmin, ymin, xmax, ymax = shapely.bounds(geometry)
+        cols = np.flatnonzero((x >= xmin) & (x <= xmax))
+        rows = np.flatnonzero((y >= ymin) & (y <= ymax))
+        if not len(cols) or not len(rows):
+            continue
+        step = max(1, max_block_cells // len(cols))
+        for start in range(0, len(rows), step):
+            yy, xx = np.meshgrid(rows[start : start + step], cols, indexing="ij")
+            inside = shapely.contains_xy(geometry, x[xx], y[yy])
+            ys.append(yy[inside])
+            xs.append(xx[inside])
+            regions.append(np.full(inside.sum(), i))
+    if not regions:
+        empty = np.array([], dtype="int64")
+        return empty, empty, empty
+    return np.concatenate(regions), np.concatenate(ys), np.concatenate(xs)
+
+
+def _region_chunks(
+    geometries: Sequence[Any],
+    x: np.ndarray,
+    y: np.ndarray,
+    x_chunk: int,
+    y_chunk: int,
+) -> dict[tuple[int, int], list[int]]:
+    """The geometries whose bounds overlap each chunk, by chunk position."""
+    chunks: dict[tuple[int, int], list[int]] = {}
+    for i, geometry in enumerate(geometries):
+        xmin, ymin, xmax, ymax = shapely.bounds(geometry)
+        cols = np.flatnonzero((x >= xmin) & (x <= xmax))
+        rows = np.flatnonzero((y >= ymin) & (y <= ymax))
+        if not len(cols) or not len(rows):
+            continue
+        for row in range(rows[0] // y_chunk, rows[-1] // y_chunk + 1):
+            for col in range(cols[0] // x_chunk, cols[-1] // x_chunk + 1):
+                chunks.setdefault((row, col), []).append(i)
+    return chunks
+
+
+def extract_regions(
+    da: xr.DataArray,
+    geometries: Sequence[Any],
+    x_dim: str = "lon",
+    y_dim: str = "lat",
+    max_workers: int | None = None,
+) -> xr.Dataset:
+    """
+    Summarize an array within each of many polygons.
+
+    The array is read one storage chunk at a time, by a pool of
+    ``max_workers`` threads, and only chunks overlapping the bounds of a
+    polygon are read, once each no matter how many polygons overlap them.
+    The cells of a chunk whose centers fall within each polygon are found
+    with :func:`region_indices` and reduced as soon as the chunk is read, so
+    memory use is bounded by the chunk size rather than by the number of
+    cells within the polygons.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        The array, e.g. the ``inun`` variable of a flood dataset, opened
+        lazily.
+    geometries : sequence of shapely geometries
+        The polygons, in the coordinates of ``da``.
+
+    Returns
+    -------
+    xarray.Dataset
+        The ``count`` of (non-NaN) cells in each polygon, the number of
+        ``flooded`` cells (greater than zero), and the ``mean`` and ``max``
+        value, along a ``region`` dimension.
+    """
+    da = da.transpose(..., y_dim, x_dim)
+    x = da[x_dim].values
+    y = da[y_dim].values
+    y_chunk, x_chunk = chunk_sizes(da, [y_dim, x_dim])
+    chunks = _region_chunks(geometries, x, y, x_chunk, y_chunk)
+    # The other dimensions are flattened.
+    m = int(np.prod(da.shape[:-2]))
+    n = len(geometries)
+    logger.debug("Summarizing %d regions from %d chunks", n, len(chunks))
+
+    count = np.zeros((m, n), dtype="int64")
+    flooded = np.zeros((m, n), dtype="int64")
+    total = np.zeros((m, n))
+    maximum = np.full((m, n), -np.inf)
+    lock = threading.Lock()
+
+    def reduce(row: int, col: int, candidates: list[int]) -> None:
+        rows = slice(row * y_chunk, (row + 1) * y_chunk)
+        cols = slice(col * x_chunk, (col + 1) * x_chunk)
+        region, y_index, x_index = region_indices(
+            [geometries[i] for i in candidates], x[cols], y[rows]
+        )
+        if not len(region):
+            return
+        block = da.isel({y_dim: rows, x_dim: cols}).values
+        values = block.reshape(m, *block.shape[-2:])[:, y_index, x_index]
+
+        k = len(candidates)
+        partial_count = np.zeros((m, k), dtype="int64")
+        partial_flooded = np.zeros((m, k), dtype="int64")
+        partial_total = np.zeros((m, k))
+        partial_maximum = np.full((m, k), -np.inf)
+        for i, values_row in enumerate(values):
+            ok = ~np.isnan(values_row)
+            partial_count[i] = np.bincount(region[ok], minlength=k)
+            partial_flooded[i] = np.bincount(region[ok & (values_row > 0)], minlength=k)
+            partial_total[i] = np.bincount(
+                region[ok], weights=values_row[ok], minlength=k
+            )
+            np.maximum.at(partial_maximum[i], region[ok], values_row[ok])
+
+        with lock:
+            count[:, candidates] += partial_count
+            flooded[:, candidates] += partial_flooded
+            total[:, candidates] += partial_total
+            maximum[:, candidates] = np.maximum(maximum[:, candidates], partial_maximum)
+
+    max_workers = max_workers or min(16, (os.cpu_count() or 1) * 2)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        futures = [
+            pool.submit(reduce, row, col, candidates)
+            for (row, col), candidates in chunks.items()
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    maximum[count == 0] = np.nan
+
+    shape = da.shape[:-2] + (n,)
+    dims = da.dims[:-2] + ("region",)
+    other = {dim: da[dim] for dim in da.dims[:-2] if dim in da.coords}
+    return xr.Dataset(
+        {
+            "count": (dims, count.reshape(shape)),
+            "flooded": (dims, flooded.reshape(shape)),
+            "mean": (dims, mean.reshape(shape)),
+            "max": (dims, maximum.reshape(shape)),
+        },
+        coords=other,
+    )
+
+
+def extract_items(
+    items: Sequence[pystac.Item],
+    lon: Iterable[float],
+    lat: Iterable[float],
+    variable: str = "inun",
+    open_item: Callable[[pystac.Item], xr.Dataset] = reader.open_item,
+    max_workers: int | None = None,
+) -> xr.DataArray:
+    """
+    Sample many flood items, e.g. several return periods and sea level years,
+    at many points.
+
+    The items must share a grid, so the points are mapped to cells and
+    grouped by chunk once.
+
+    Parameters
+    ----------
+    items : sequence of pystac.Item
+        The flood items.
+    lon, lat : array-like
+        The coordinates of the points.
+    open_item : callable
+        Opens an item's data lazily. By default :func:`reader.open_item`.
+
+    Returns
+    -------
+    xarray.DataArray
+        The values, with dimensions ``item`` and ``point``. The items'
+        ``deltares:`` properties are coordinates along ``item``.
+    """
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    results = []
+    y_index = x_index = None
+    for item in items:
+        da = open_item(item)[variable].squeeze(drop=True).transpose(..., "lat", "lon")
+        if da.ndim != 2:
+            raise ValueError(f"Expected a 2D array for item {item.id}, got {da.dims}")
+        if y_index is None or x_index is None:
+            y_index = nearest_index(da["lat"].values, lat)
+            x_index = nearest_index(da["lon"].values, lon)
+        results.append(gather(da, y_index, x_index, max_workers=max_workers))
+
+    coords: dict[str, Any] = {
+        "item": [item.id for item in items],
+        "lon": ("point", lon),
+        "lat": ("point", lat),
+    }
+    for key in ITEM_COORDINATES:
+        if all(key in item.properties for item in items):
+            coords[key.split(":")[1]] = (
+                "item",
+                [item.properties[key] for item in items],
+            )
+    return xr.DataArray(
+        np.stack(results) if results else np.empty((0, len(lon))),
+        dims=("item", "point"),
+        coords=coords,
+        name=variable,
+    )
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import logging
+import math
+from typing import Any
+
+import numpy as np
+import shapely
+import shapely.geometry
+import xarray as xr
+
+from stactools.deltares.utils import DEFAULT_MAX_BLOCK_CELLS, iter_blocks
+
+logger = logging.getLogger(__name__)
+
+#: Resolution, in degrees, of the mask the footprint is computed from.
+DEFAULT_RESOLUTION = 0.1
+#: The geometry of items without a footprint.
+GLOBE = shapely.box(-180, -90, 180, 90)
+
+
+def _cell_edges(coord: np.ndarray, factor: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The lower and upper edges of each coarse cell along a coordinate.
+
+    Neighbouring cells share an edge exactly, so that the boxes built from
+    them union into a single polygon.
+    """
+    n = len(coord)
+    step = float(coord[1] - coord[0]) if n > 1 else 0.0
+    inner = np.arange(factor, n, factor)
+    edges = np.concatenate(
+        [
+            [coord[0] - step / 2],
+            (coord[inner - 1] + coord[inner]) / 2,
+            [coord[-1] + step / 2],
+        ]
+    )
+    return np.minimum(edges[:-1], edges[1:]), np.maximum(edges[:-1], edges[1:])
+
+
+class CoarseMask:
+    """
+    A coarse mask of where an array is greater than zero, built block by block.
+
+    Each ``factor x factor`` group of cells becomes a single cell in
+    :attr:`mask`, which is true if any of the cells (across any other
+    dimensions, like ``time``) is greater than zero.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The full-resolution ``(ny, nx)`` shape of the array.
+    factor : int
+        The number of cells along each dimension reduced to one.
+    """
+
+    def __init__(self, shape: tuple[int, int], factor: int) -> None:
+        ny, nx = shape
+        self.factor = factor
+        self.mask = np.zeros(
+            (math.ceil(ny / factor), math.ceil(nx / factor)), dtype=bool
+        )
+
+    def update(self, values: np.ndarray, row: int, col: int) -> None:
+        """
+        Fold in a block of the array, with ``y`` and ``x`` as its last two
+        dimensions, starting at ``row`` and ``col``, which must be multiples of
+        :attr:`factor`.
+        """
+        factor = self.factor
+        block = (values > 0).reshape(-1, *values.shape[-2:]).any(axis=0)
+        rows, cols = block.shape
+        pad = ((0, -rows % factor), (0, -cols % factor))
+        block = np.pad(block, pad).reshape(
+            (rows + pad[0][1]) // factor, factor, (cols + pad[1][1]) // factor, factor
+        )
+        i = row // factor
+        j = col // factor
+        reduced = block.any(axis=(1, 3))
+        self.mask[i : i + reduced.shape[0], j : j + reduced.shape[1]] |= reduced
+
+
+def coarse_mask(
+    da: xr.DataArray,
+    factor: int,
+    x_dim: str = "lon",
+    y_dim: str = "lat",
+    max_block_cells: int = DEFAULT_MAX_BLOCK_CELLS,
+) -> np.ndarray:
+    """
+    Reduce an array to a coarse mask of where it's greater than zero.
+
+    See :class:`CoarseMask`. The array is read block by block, so memory use
+    is bounded by ``max_block_cells`` rather than the size of ``da``.
+
+    Returns
+    -------
+    numpy.ndarray
+        A boolean array with shape ``(ceil(ny / factor), ceil(nx / factor))``.
+    """
+    ny, nx = da.sizes[y_dim], da.sizes[x_dim]
+    da = da.transpose(..., y_dim, x_dim)
+    tile = max(factor, int(math.sqrt(max_block_cells)) // factor * factor)
+    mask = CoarseMask((ny, nx), factor)
+    for key, values in iter_blocks(da, {y_dim: tile, x_dim: tile}):
+        mask.update(values, key[y_dim].start, key[x_dim].start)
+    return mask.mask
+
+
+def footprint_factor(x: np.ndarray, resolution: float = DEFAULT_RESOLUTION) -> int:
+    """The :class:`CoarseMask` factor giving about ``resolution`` along ``x``."""
+    cell_size = abs(float(x[1] - x[0])) if len(x) > 1 else resolution
+    return max(1, round(resolution / cell_size))
+
+
+def mask_to_geometry(
+    mask: np.ndarray, x: np.ndarray, y: np.ndarray, factor: int
+) -> shapely.Geometry | None:
+    """
+    Vectorize a coarse mask into a (multi)polygon.
+
+    ``x`` and ``y`` are the full-resolution coordinates the mask was reduced
+    from. Contiguous runs of cells along each row become boxes, which are
+    then unioned together. Returns None if the mask is empty.
+    """
+    xmin, xmax = _cell_edges(np.asarray(x, dtype="float64"), factor)
+    ymin, ymax = _cell_edges(np.asarray(y, dtype="float64"), factor)
+
+    padded = np.pad(mask, ((0, 0), (1, 1))).astype("int8")
+    row, start = np.nonzero(np.diff(padded, axis=1) == 1)
+    _, stop = np.nonzero(np.diff(padded, axis=1) == -1)
+    if not len(row):
+        return None
+
+    boxes = shapely.box(xmin[start], ymin[row], xmax[stop - 1], ymax[row])
+    return shapely.union_all(boxes)
+
+
+def compute_footprint(
+    da: xr.DataArray,
+    resolution: float = DEFAULT_RESOLUTION,
+    x_dim: str = "lon",
+    y_dim: str = "lat",
+    simplify_tolerance: float | None = None,
+    max_block_cells: int = DEFAULT_MAX_BLOCK_CELLS,
+) -> shapely.Geometry | None:
+    """
+    Compute the footprint of the non-zero cells of an array.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        The array, for example the ``inun`` variable of a flood dataset. It's
+        read in blocks of at most ``max_block_cells`` cells.
+    resolution : float
+        The approximate resolution, in the units of the coordinates, of the
+        mask that's vectorized. Coarser resolutions give smaller geometries.
+    simplify_tolerance : float, optional
+        Tolerance for simplifying the geometry. Defaults to half the size of
+        the cells of the coarse mask, which is about half of ``resolution``.
+
+    Returns
+    -------
+    shapely.Geometry or None
+        The (multi)polygon covering the non-zero cells, or None if all the
+        cells are zero or missing.
+    """
+    x = da[x_dim].values
+    factor = footprint_factor(x, resolution)
+    mask = coarse_mask(
+        da, factor, x_dim=x_dim, y_dim=y_dim, max_block_cells=max_block_cells
+    )
+    if simplify_tolerance is None and len(x) < 2:
+        simplify_tolerance = resolution / 2
+    return mask_footprint(mask, x, da[y_dim].values, factor, simplify_tolerance)
+
+
+def mask_footprint(
+    mask: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    factor: int,
+    simplify_tolerance: float | None = None,
+) -> shapely.Geometry | None:
+    """
+    The simplified footprint of a coarse mask, as computed by
+    :func:`compute_footprint`.
+    """
+    geometry = mask_to_geometry(mask, x, y, factor)
+    if geometry is None:
+        return None
+
+    if simplify_tolerance is None:
+        cell_size = abs(float(x[1] - x[0])) if len(x) > 1 else 1.0
+        simplify_tolerance = factor * cell_size / 2
+    return shapely.simplify(geometry, simplify_tolerance)
+
+
+def footprint_to_stac(
+    geometry: shapely.Geometry | None,
+) -> tuple[dict[str, Any], list[float]]:
+    """
+    The STAC geometry and bbox for a footprint.
+
+    Maps without any inundation have no footprint. They get the whole globe,
+    like items created without footprints, rather than a null geometry.
+    """
+    if geometry is None:
+        geometry = GLOBE
+    return shapely.geometry.mapping(geometry), list(geometry.bounds)
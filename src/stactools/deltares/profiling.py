@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import collections
+import logging
+import sys
+import threading
+import types
+from typing import Any, Callable, Iterable, TypeVar
+
+import fsspec
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+#: Default time between samples, in seconds.
+DEFAULT_INTERVAL = 0.01
+
+
+def frame_label(frame: types.FrameType) -> str:
+    """A label for a frame: its module and function name."""
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or code.co_filename
+    # ";" separates frames, and " " the stack from the count, when folded.
+    return f"{module}:{code.co_name}".replace(";", ":").replace(" ", "_")
+
+
+def fold(frame: types.FrameType | None) -> str:
+    """A stack, outermost frame first, with the frames separated by ``;``."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    A statistical profiler sampling the stack of one thread.
+
+    A background thread records the stack of the profiled thread every
+    ``interval`` seconds. Unlike :mod:`cProfile`, this doesn't hook every
+    function call, so the overhead is low and doesn't depend on the code
+    being profiled; it can be left on for whole runs. Only the profiled
+    thread is sampled, so concurrent tasks on other threads (e.g. on a
+    dask worker) don't appear in its profile.
+
+    The samples are counted by stack in :attr:`stacks`, in the "folded"
+    format read by ``flamegraph.pl``, speedscope and similar tools.
+
+    Parameters
+    ----------
+    interval : float
+        The time between samples, in seconds.
+    thread_id : int, optional
+        The thread to profile. Defaults to the thread that starts the
+        profiler.
+
+    Examples
+    --------
+    >>> with SamplingProfiler() as profiler:
+    ...     create_item(href)
+    >>> write_folded(profiler.stacks, "profile.folded")
+    """
+
+    def __init__(
+        self, interval: float = DEFAULT_INTERVAL, thread_id: int | None = None
+    ) -> None:
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # type: ignore
+            if frame is not None:
+                self.stacks[fold(frame)] += 1
+
+    def start(self) -> None:
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        logger.debug("Recorded %d samples", sum(self.stacks.values()))
+
+    def __enter__(self) -> SamplingProfiler:
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+
+def profile(
+    func: Callable[..., T],
+    *args: Any,
+    interval: float = DEFAULT_INTERVAL,
+    **kwargs: Any,
+) -> tuple[T, dict[str, int]]:
+    """
+    Call a function under a :class:`SamplingProfiler`.
+
+    Returns
+    -------
+    result, stacks
+        The function's result and the sample counts by folded stack. The
+        stacks are a plain dictionary, so they can be sent back from a worker
+        process.
+    """
+    with SamplingProfiler(interval) as profiler:
+        result = func(*args, **kwargs)
+    return result, dict(profiler.stacks)
+
+
+def merge(profiles: Iterable[dict[str, int]]) -> collections.Counter[str]:
+    """Add up the sample counts of many profiles, e.g. one per task."""
+    result: collections.Counter[str] = collections.Counter()
+    for stacks in profiles:
+        result.update(stacks)
+    return result
+
+
+def write_folded(stacks: dict[str, int], path: str) -> None:
+    """
+    Write sample counts in the folded format, one ``frame;frame;... count``
+    line per stack, to render with e.g. ``flamegraph.pl`` or speedscope.
+    """
+    with fsspec.open(path, "wt") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def read_folded(path: str) -> collections.Counter[str]:
+    """Read sample counts written by :func:`write_folded`."""
+    result: collections.Counter[str] = collections.Counter()
+    with fsspec.open(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                stack, count = line.rstrip("\n").rsplit(" ", 1)
+                result[stack] += int(count)
+    return result
@@ -0,0 +1,562 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Iterable
+
+import fsspec
+import pystac
+import xarray as xr
+from fsspec.core import split_protocol
+from fsspec.implementations.asyn_wrapper import AsyncFileSystemWrapper
+from fsspec.implementations.reference import ReferenceFileSystem, ReferenceNotReachable
+from fsspec.utils import merge_offset_ranges
+
+logger = logging.getLogger(__name__)
+
+#: Default upper bound on the size of an on-disk chunk cache, in bytes.
+DEFAULT_MAX_CACHE_SIZE = 2**30
+#: Number of parsed reference files kept in memory by :func:`load_references`.
+REFERENCES_CACHE_SIZE = 64
+#: Default largest gap, in bytes, between two chunks of a file that are read
+#: with one request by :class:`CoalescingReferenceFileSystem`.
+DEFAULT_MAX_GAP = 2**20
+#: Default largest request, in bytes, made by :class:`CoalescingReferenceFileSystem`.
+DEFAULT_MAX_BLOCK = 2**28
+#: Default time, in seconds, that :class:`CoalescingReferenceFileSystem` waits
+#: for other chunks to be requested before reading a batch.
+DEFAULT_BATCH_DELAY = 0.005
+
+
+@functools.lru_cache(maxsize=REFERENCES_CACHE_SIZE)
+def load_references(
+    href: str, transform_href: Callable[[str], str] | None = None
+) -> dict[str, Any]:
+    """
+    Read and parse a Kerchunk reference file.
+
+    The parsed references are cached in memory, so repeatedly opening the same
+    item only reads and parses its references once per process. The returned
+    dictionary is shared between callers and shouldn't be modified.
+
+    ``transform_href``, e.g. :func:`planetary_computer.sign`, is applied to
+    ``href`` when the file is read. The cache is keyed on ``href`` itself, so
+    it's hit even when the transformed href changes, as signed URLs do.
+    """
+    logger.debug("Loading references from %s", href)
+    if transform_href is not None:
+        href = transform_href(href)
+    with fsspec.open(href, "rb") as f:
+        result: dict[str, Any] = json.load(f)
+    return result
+
+
+class ChunkCache:
+    """
+    A size-bounded cache of chunks on local disk.
+
+    Each chunk is stored in its own file, named by a hash of the byte range
+    it was read from, so the cache can be shared by items, processes and
+    sessions. When the total size of the cache exceeds ``max_size``, the
+    least recently used chunks are removed.
+
+    Parameters
+    ----------
+    path : str
+        The cache directory. It's created if it doesn't exist.
+    max_size : int
+        The maximum total size of the cached chunks, in bytes.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_CACHE_SIZE) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+        if self._size > max_size:
+            self._evict()
+
+    @staticmethod
+    def key(url: str, start: int | None, end: int | None) -> str:
+        return hashlib.sha256(f"{url}:{start}:{end}".encode()).hexdigest()
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get(self, key: str) -> bytes | None:
+        path = os.path.join(self.path, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # The modification time records the last use, for eviction.
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        path = os.path.join(self.path, key)
+        with self._lock:
+            # Replacing a chunk that's already cached doesn't grow the cache.
+            try:
+                self._size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp, path)
+            self._size += len(data)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        size = sum(entry[2] for entry in entries)
+        for _, path, nbytes in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= nbytes
+        logger.debug("Evicted chunks from %s, %d bytes remaining", self.path, size)
+        self._size = size
+
+    @property
+    def size(self) -> int:
+        """The total size of the cached chunks, in bytes."""
+        return self._size
+
+    def clear(self) -> None:
+        for _, path, _ in self._entries():
+            os.remove(path)
+        self._size = 0
+
+
+class CachingReferenceFileSystem(ReferenceFileSystem):  # type: ignore[misc]
+    """
+    A reference filesystem that keeps the chunks it reads in a :class:`ChunkCache`.
+
+    Only references to byte ranges of remote files are cached; inline data
+    (e.g. the ``.zarray`` metadata and small coordinate arrays) is already
+    in memory.
+    """
+
+    def __init__(self, *args: Any, chunk_cache: ChunkCache, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.chunk_cache = chunk_cache
+
+    def _cache_key(self, path: str, start: Any, end: Any) -> str | None:
+        url, start, end = self._cat_common(path, start=start, end=end)
+        if isinstance(url, bytes):
+            return None
+        return self.chunk_cache.key(url, start, end)
+
+    async def _cat_file(
+        self, path: str, start: Any = None, end: Any = None, **kwargs: Any
+    ) -> bytes:
+        key = self._cache_key(path, start, end)
+        if key is not None and (cached := self.chunk_cache.get(key)) is not None:
+            return cached
+        data: bytes = await super()._cat_file(path, start=start, end=end, **kwargs)
+        if key is not None:
+            self.chunk_cache.put(key, data)
+        return data
+
+    def cat_file(
+        self, path: str, start: Any = None, end: Any = None, **kwargs: Any
+    ) -> bytes:
+        key = self._cache_key(path, start, end)
+        if key is not None and (cached := self.chunk_cache.get(key)) is not None:
+            return cached
+        data: bytes = super().cat_file(path, start=start, end=end, **kwargs)
+        if key is not None:
+            self.chunk_cache.put(key, data)
+        return data
+
+    def cat(self, path: Any, recursive: bool = False, **kwargs: Any) -> Any:
+        paths = [path] if isinstance(path, str) else list(path)
+        out: dict[str, Any] = {}
+        keys: dict[str, str] = {}
+        missing = []
+        for p in paths:
+            try:
+                key = self._cache_key(p, None, None)
+            except FileNotFoundError:
+                key = None
+            if key is not None:
+                keys[p] = key
+                if (data := self.chunk_cache.get(key)) is not None:
+                    out[p] = data
+                    continue
+            missing.append(p)
+
+        if missing:
+            fetched = super().cat(missing, recursive=recursive, **kwargs)
+            for p, data in fetched.items():
+                if isinstance(data, bytes) and p in keys:
+                    self.chunk_cache.put(keys[p], data)
+            out.update(fetched)
+
+        if isinstance(path, str):
+            return out[path]
+        return out
+
+
+class CoalescingReferenceFileSystem(ReferenceFileSystem):  # type: ignore[misc]
+    """
+    A reference filesystem that reads nearby chunks of a file with one request.
+
+    Reading a window of a flood map through its references otherwise makes
+    one range request per chunk, although the chunks of a window are mostly
+    next to each other in the NetCDF file. When opened with
+    :func:`open_references`, the chunks zarr requests at about the same time
+    are collected for ``batch_delay`` seconds and read together by
+    :meth:`cat_chunks`: the byte ranges are sorted, ranges in the same file
+    less than ``max_gap`` bytes apart are merged, up to ``max_block`` bytes
+    per request, and the merged ranges are read concurrently.
+
+    zarr reads at most ``async.concurrency`` chunks at once (10 by default),
+    so raising it, e.g. with ``zarr.config.set({"async.concurrency": 64})``,
+    makes the batches larger. :attr:`chunks` and :attr:`requests` count the
+    chunks read and the requests made for them.
+
+    Parameters
+    ----------
+    max_gap : int
+        The largest gap, in bytes, between ranges read with one request. The
+        bytes in the gap are read and discarded.
+    max_block : int
+        The largest request, in bytes.
+    batch_delay : float
+        Seconds to wait for more chunks before reading a batch.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        max_gap: int = DEFAULT_MAX_GAP,
+        max_block: int = DEFAULT_MAX_BLOCK,
+        batch_delay: float = DEFAULT_BATCH_DELAY,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, max_gap=max_gap, max_block=max_block, **kwargs)
+        self.batch_delay = batch_delay
+        self.chunks = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def coalesces(self, path: str) -> bool:
+        """Whether a path is a chunk in a byte range of a file, as opposed to
+        inline data or a whole file."""
+        url, start, _ = self._cat_common(path)
+        return not isinstance(url, bytes) and start is not None
+
+    def cat_chunks(self, paths: Iterable[str]) -> dict[str, bytes | Exception]:
+        """
+        Read many chunks, merging nearby byte ranges of the same file.
+
+        Returns
+        -------
+        dict
+            The data of each path, or the exception raised reading it.
+        """
+        ranges = {path: self._cat_common(path) for path in set(paths)}
+        by_protocol: dict[str | None, list[tuple[str, int, int]]] = {}
+        for url, start, end in ranges.values():
+            protocol, _ = split_protocol(url)
+            by_protocol.setdefault(protocol, []).append((url, start, end))
+
+        # The merged blocks of each file, sorted by their start.
+        blocks: dict[str, list[tuple[int, int, bytes | Exception]]] = {}
+        for protocol, parts in by_protocol.items():
+            urls, starts, ends = merge_offset_ranges(
+                *map(list, zip(*parts)),
+                max_gap=self.max_gap,
+                max_block=self.max_block,
+                sort=True,
+            )
+            try:
+                data = self.fss[protocol].cat_ranges(
+                    urls, starts, ends, on_error="return"
+                )
+            except Exception as e:
+                data = [e] * len(urls)
+            for block_url, block_start, block_end, block in zip(
+                urls, starts, ends, data
+            ):
+                blocks.setdefault(block_url, []).append((block_start, block_end, block))
+            with self._lock:
+                self.chunks += len(parts)
+                self.requests += len(urls)
+        logger.debug(
+            "Read %d chunks with %d requests",
+            len(ranges),
+            sum(len(file_blocks) for file_blocks in blocks.values()),
+        )
+        block_starts = {
+            url: [block[0] for block in file_blocks]
+            for url, file_blocks in blocks.items()
+        }
+
+        results: dict[str, bytes | Exception] = {}
+        for path, (url, start, end) in ranges.items():
+            if url not in blocks:
+                continue
+            # The last block starting at or before the chunk.
+            i = bisect.bisect_right(block_starts[url], start) - 1
+            if i < 0:
+                continue
+            block_start, block_end, block = blocks[url][i]
+            if end > block_end:
+                continue
+            if isinstance(block, Exception):
+                error = ReferenceNotReachable(path, url)
+                error.__cause__ = block
+                results[path] = error
+            else:
+                results[path] = block[start - block_start : end - block_start]
+        return results
+
+
+class CachingCoalescingReferenceFileSystem(
+    CachingReferenceFileSystem, CoalescingReferenceFileSystem
+):
+    """
+    A :class:`CoalescingReferenceFileSystem` that keeps the chunks it reads in
+    a :class:`ChunkCache`, so only the chunks missing from the cache are read.
+    """
+
+    def cat_chunks(self, paths: Iterable[str]) -> dict[str, bytes | Exception]:
+        results: dict[str, bytes | Exception] = {}
+        keys: dict[str, str] = {}
+        for path in set(paths):
+            url, start, end = self._cat_common(path)
+            keys[path] = key = self.chunk_cache.key(url, start, end)
+            if (cached := self.chunk_cache.get(key)) is not None:
+                results[path] = cached
+        missing = [path for path in keys if path not in results]
+        if missing:
+            fetched = super().cat_chunks(missing)
+            for path, data in fetched.items():
+                if isinstance(data, bytes):
+                    self.chunk_cache.put(keys[path], data)
+            results.update(fetched)
+        return results
+
+
+def open_references(
+    references: dict[str, Any],
+    chunk_cache: ChunkCache | str | None = None,
+    remote_options: dict[str, Any] | None = None,
+    coalesce: bool = False,
+    max_gap: int = DEFAULT_MAX_GAP,
+    **kwargs: Any,
+) -> xr.Dataset:
+    """
+    Lazily open a dataset from parsed Kerchunk references.
+
+    Parameters
+    ----------
+    references : dict
+        The references, e.g. from :func:`load_references`.
+    chunk_cache : ChunkCache or str, optional
+        A cache, or the path to a cache directory, for the chunks read.
+    remote_options : dict, optional
+        Options for the filesystem of the referenced files.
+    coalesce : bool
+        Read chunks requested together, and less than ``max_gap`` bytes apart
+        in the file, with one request. See
+        :class:`CoalescingReferenceFileSystem`. The dataset isn't opened with
+        dask by default then, so each selection is read in one batch.
+    max_gap : int
+        The largest gap, in bytes, between chunks read with one request.
+    **kwargs
+        Passed to :func:`xarray.open_dataset`.
+    """
+    fs: ReferenceFileSystem
+    options: dict[str, Any] = {"remote_options": remote_options}
+    if isinstance(chunk_cache, str):
+        chunk_cache = ChunkCache(chunk_cache)
+    if coalesce:
+        options["max_gap"] = max_gap
+    if chunk_cache is None:
+        cls = CoalescingReferenceFileSystem if coalesce else ReferenceFileSystem
+        fs = cls(references, **options)
+    else:
+        cls = (
+            CachingCoalescingReferenceFileSystem
+            if coalesce
+            else CachingReferenceFileSystem
+        )
+        fs = cls(references, chunk_cache=chunk_cache, **options)
+    # Without dask, a window is read with one call, so its chunks are batched.
+    kwargs = {"chunks": None if coalesce else {}, **kwargs}
+    return xr.open_dataset(_store(fs), engine="zarr", consolidated=False, **kwargs)
+
+
+class _ChunkBatcher:
+    """
+    Collects the chunks requested through the async wrapper of a
+    :class:`CoalescingReferenceFileSystem` and reads each batch with
+    :meth:`~CoalescingReferenceFileSystem.cat_chunks`.
+    """
+
+    def __init__(self, fs: CoalescingReferenceFileSystem, cat_file: Any) -> None:
+        self.fs = fs
+        self.cat_file = cat_file
+        self.pending: dict[str, asyncio.Future[Any]] | None = None
+        self.tasks: set[asyncio.Task[None]] = set()
+
+    async def __call__(
+        self, path: str, start: Any = None, end: Any = None, **kwargs: Any
+    ) -> bytes:
+        if start is not None or end is not None or not self.fs.coalesces(path):
+            data: bytes = await self.cat_file(path, start=start, end=end, **kwargs)
+            return data
+        loop = asyncio.get_running_loop()
+        if self.pending is None:
+            self.pending = {}
+            loop.call_later(self.fs.batch_delay, self._flush)
+        if path not in self.pending:
+            self.pending[path] = loop.create_future()
+        # Another request for the same chunk may be waiting on the future.
+        result = await asyncio.shield(self.pending[path])
+        if isinstance(result, Exception):
+            raise result
+        return bytes(result)
+
+    def _flush(self) -> None:
+        pending, self.pending = self.pending or {}, None
+        task = asyncio.ensure_future(self._read(pending))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _read(self, pending: dict[str, asyncio.Future[Any]]) -> None:
+        results: dict[str, Any] = {}
+        error: Exception | None = None
+        try:
+            results = await asyncio.to_thread(self.fs.cat_chunks, list(pending))
+        except Exception as e:
+            error = e
+        for path, future in pending.items():
+            if not future.done():
+                future.set_result(results.get(path, error))
+
+
+class _BatchingFileSystemWrapper(AsyncFileSystemWrapper):  # type: ignore[misc]
+    """
+    The async wrapper of a :class:`CoalescingReferenceFileSystem`, which
+    batches the chunks requested with :class:`_ChunkBatcher`.
+    """
+
+    def __init__(self, fs: CoalescingReferenceFileSystem, **kwargs: Any) -> None:
+        super().__init__(fs, **kwargs)
+        # The wrapper sets the wrapped methods on the instance, which would
+        # hide the _cat_file below.
+        self._batcher = _ChunkBatcher(fs, self.__dict__.pop("_cat_file"))
+
+    async def _cat_file(
+        self, path: str, start: Any = None, end: Any = None, **kwargs: Any
+    ) -> bytes:
+        return await self._batcher(path, start=start, end=end, **kwargs)
+
+
+def _store(fs: ReferenceFileSystem) -> Any:
+    import zarr
+
+    if int(zarr.__version__.split(".")[0]) < 3:
+        return fs.get_mapper("")
+
+    # zarr 3 would otherwise re-create the filesystem from its JSON
+    # representation, re-parsing the references and dropping the chunk cache.
+    from zarr.storage import FsspecStore
+
+    if isinstance(fs, CoalescingReferenceFileSystem):
+        wrapper = _BatchingFileSystemWrapper(fs, asynchronous=True)
+    else:
+        wrapper = AsyncFileSystemWrapper(fs, asynchronous=True)
+    return FsspecStore(wrapper, read_only=True, path="")
+
+
+def open_item(
+    item: pystac.Item,
+    chunk_cache: ChunkCache | str | None = None,
+    transform_href: Callable[[str], str] | None = None,
+    remote_options: dict[str, Any] | None = None,
+    coalesce: bool = False,
+    max_gap: int = DEFAULT_MAX_GAP,
+    **kwargs: Any,
+) -> xr.Dataset:
+    """
+    Lazily open the data of an item through its ``index`` asset.
+
+    Only the Kerchunk references are read up front, and they're cached by
+    :func:`load_references`. The data is read chunk by chunk as it's
+    accessed, directly from the NetCDF file, through ``chunk_cache`` if one
+    is given.
+
+    Parameters
+    ----------
+    item : pystac.Item
+        A flood or water availability item with an ``index`` asset.
+    chunk_cache : ChunkCache or str, optional
+        A cache, or the path to a cache directory, for the chunks read.
+    transform_href : callable, optional
+        Applied to the ``index`` asset's href before reading it, e.g.
+        :func:`planetary_computer.sign`.
+    remote_options : dict, optional
+        Options for the filesystem of the referenced NetCDF file.
+    coalesce : bool
+        Read nearby chunks requested together with one request, e.g. when
+        reading a window of a flood map. See
+        :class:`CoalescingReferenceFileSystem`.
+    max_gap : int
+        The largest gap, in bytes, between chunks read with one request.
+    **kwargs
+        Passed to :func:`xarray.open_dataset`.
+
+    Examples
+    --------
+    >>> ds = open_item(item, chunk_cache="~/.cache/deltares")
+    >>> ds.inun.sel(lat=slice(10, 0), lon=slice(30, 40)).load()
+
+    >>> ds = open_item(item, coalesce=True)
+    >>> ds.inun.sel(lat=slice(10, 0), lon=slice(30, 40)).load()
+    """
+    if "index" not in item.assets:
+        raise ValueError(f"Item {item.id} doesn't have an 'index' asset")
+    if isinstance(chunk_cache, str):
+        chunk_cache = ChunkCache(os.path.expanduser(chunk_cache))
+    return open_references(
+        load_references(item.assets["index"].href, transform_href),
+        chunk_cache=chunk_cache,
+        remote_options=remote_options,
+        coalesce=coalesce,
+        max_gap=max_gap,
+        **kwargs,
+    )
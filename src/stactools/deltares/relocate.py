@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Mapping
+
+import fsspec
+
+from stactools.deltares import bulk
+
+logger = logging.getLogger(__name__)
+
+#: The assets whose hrefs :func:`relocate_item` rewrites by default.
+DEFAULT_ASSETS = ("data", "index")
+#: Default number of files rewritten at once by :func:`relocate_files`.
+DEFAULT_MAX_WORKERS = 16
+
+
+def replace_prefix(href: str, prefixes: Mapping[str, str]) -> str:
+    """
+    Replace the longest of ``prefixes`` that ``href`` starts with.
+
+    Parameters
+    ----------
+    href : str
+        A URL.
+    prefixes : mapping
+        New prefixes, by old prefix, e.g.
+        ``{"https://old.blob.core.windows.net/floods/": "https://new..."}``.
+
+    Returns
+    -------
+    str
+        The URL with its prefix replaced, or unchanged if no prefix matches.
+    """
+    for old in sorted(prefixes, key=len, reverse=True):
+        if href.startswith(old):
+            return prefixes[old] + href[len(old) :]
+    return href
+
+
+def relocate_references(
+    refs: dict[str, Any], prefixes: Mapping[str, str]
+) -> tuple[dict[str, Any], int]:
+    """
+    Replace the URL prefixes of the files referenced by Kerchunk references.
+
+    Both version 0 references (a flat mapping of keys to references) and
+    version 1 references, where URLs may be ``templates`` and references
+    ``{{template}}`` strings, are supported. Templates are rewritten rather
+    than the references that use them. Inline data is left as is.
+
+    The references are modified in place.
+
+    Returns
+    -------
+    refs, count
+        The references, and the number of URLs that were changed.
+    """
+    count = 0
+
+    def replace(url: str) -> str:
+        nonlocal count
+        new = replace_prefix(url, prefixes)
+        count += new != url
+        return new
+
+    if "version" in refs and "refs" in refs:
+        templates = refs.get("templates", {})
+        for name, url in templates.items():
+            templates[name] = replace(url)
+        for gen in refs.get("gen", []):
+            if "url" in gen:
+                gen["url"] = replace(gen["url"])
+        references = refs["refs"]
+    else:
+        references = refs
+
+    for value in references.values():
+        # A list is a (url,) or (url, offset, size) reference; anything else
+        # is inline data.
+        if isinstance(value, list) and value and isinstance(value[0], str):
+            value[0] = replace(value[0])
+    return refs, count
+
+
+def relocate_item(
+    item: dict[str, Any],
+    prefixes: Mapping[str, str],
+    assets: Iterable[str] = DEFAULT_ASSETS,
+) -> tuple[dict[str, Any], int]:
+    """
+    Replace the URL prefixes of some of an item's assets.
+
+    The item is a dictionary, e.g. from :func:`bulk.read_item_dicts`, and is
+    modified in place.
+
+    Returns
+    -------
+    item, count
+        The item, and the number of hrefs that were changed.
+    """
+    count = 0
+    for key in assets:
+        asset = item.get("assets", {}).get(key)
+        if asset is not None and "href" in asset:
+            href = replace_prefix(asset["href"], prefixes)
+            count += href != asset["href"]
+            asset["href"] = href
+    return item, count
+
+
+@dataclass
+class RelocateResult:
+    """The outcome of rewriting one file."""
+
+    source: str
+    destination: str
+    count: int = 0
+    error: str | None = None
+
+
+def relocate_file(
+    source: str,
+    destination: str,
+    prefixes: Mapping[str, str],
+    kind: str = "references",
+    assets: Iterable[str] = DEFAULT_ASSETS,
+) -> RelocateResult:
+    """
+    Rewrite the URL prefixes in a reference file or item file.
+
+    Parameters
+    ----------
+    source, destination : str
+        Paths or URLs of the file to read and the file to write. They may be
+        the same, to rewrite the file in place.
+    kind : str
+        ``"references"`` for Kerchunk reference files, or ``"items"`` for STAC
+        items. Items are read from JSON, or NDJSON files ending in
+        ``.ndjson``, which are rewritten line by line.
+    """
+    if kind not in {"references", "items"}:
+        raise ValueError(f"kind must be 'references' or 'items', not {kind!r}")
+    result = RelocateResult(source, destination)
+
+    if kind == "items" and source.endswith(".ndjson"):
+        lines = []
+        with fsspec.open(source, "rt") as f:
+            for line in f:
+                if line.strip():
+                    item, count = relocate_item(json.loads(line), prefixes, assets)
+                    result.count += count
+                    lines.append(json.dumps(item) + "\n")
+        data = "".join(lines).encode()
+    else:
+        with fsspec.open(source, "rb") as f:
+            obj = json.load(f)
+        if kind == "references":
+            obj, result.count = relocate_references(obj, prefixes)
+        else:
+            obj, result.count = relocate_item(obj, prefixes, assets)
+        data = json.dumps(obj).encode()
+
+    # Unchanged files aren't written again, unless they're being copied.
+    if result.count or source != destination:
+        with fsspec.open(destination, "wb") as f:
+            f.write(data)
+    return result
+
+
+def relocate_files(
+    sources: Iterable[str],
+    prefixes: Mapping[str, str],
+    kind: str = "references",
+    output_dir: str | None = None,
+    assets: Iterable[str] = DEFAULT_ASSETS,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Iterator[RelocateResult]:
+    """
+    Rewrite the URL prefixes in many reference or item files concurrently.
+
+    Each file is small, so they're read, rewritten and written by a pool of
+    threads, and the results are yielded as they finish. Nothing is
+    re-read from the NetCDF files.
+
+    Parameters
+    ----------
+    sources : iterable of str
+        Paths or URLs of the files, or local glob patterns. They're read
+        lazily, so this can be a stream, e.g. from a blob listing.
+    prefixes : mapping
+        New prefixes, by old prefix. See :func:`replace_prefix`.
+    kind : str
+        ``"references"`` or ``"items"``. See :func:`relocate_file`.
+    output_dir : str, optional
+        Write the rewritten files, by name, to this directory. By default
+        they're rewritten in place. A source with the same name as an earlier
+        one fails rather than overwriting its output.
+    assets : iterable of str
+        The item assets whose hrefs are rewritten.
+    max_workers : int
+        The number of files rewritten at once.
+    """
+    assets = tuple(assets)
+    if output_dir is not None:
+        fs, path = fsspec.core.url_to_fs(output_dir)
+        fs.makedirs(path, exist_ok=True)
+
+    def destination(source: str) -> str:
+        if output_dir is None:
+            return source
+        return f"{output_dir.rstrip('/')}/{os.path.basename(source)}"
+
+    def run(source: str) -> RelocateResult:
+        try:
+            return relocate_file(
+                source, destination(source), prefixes, kind=kind, assets=assets
+            )
+        except Exception as e:
+            logger.exception("Failed to relocate %s", source)
+            return RelocateResult(
+                source, destination(source), error=f"{type(e).__name__}: {e}"
+            )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        # Bound the work submitted ahead, so a long listing isn't held in
+        # memory as futures.
+        pending: set[concurrent.futures.Future[RelocateResult]] = set()
+        destinations: set[str] = set()
+        for source in bulk.expand_paths(sources):
+            if output_dir is not None:
+                target = destination(source)
+                if target in destinations:
+                    error = f"Another source is also written to {target}"
+                    yield RelocateResult(source, target, error=error)
+                    continue
+                destinations.add(target)
+            if len(pending) >= 4 * max_workers:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                yield from (future.result() for future in done)
+            pending.add(pool.submit(run, source))
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
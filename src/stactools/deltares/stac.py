@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 import logging
+import os
 import re
 import textwrap
-import urllib.request
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 
-import shapely.geometry
 import xarray as xr
 import xstac
 from pystac import (
@@ -26,14 +25,22 @@ from pystac import (
     TemporalExtent,
 )
 from pystac.extensions.item_assets import ItemAssetsExtension
+from pystac.extensions.raster import (
+    Histogram,
+    RasterBand,
+    RasterExtension,
+    Statistics,
+)
 
-from . import constants
+from . import aggregate, constants, download, footprints, stats
 
 logger = logging.getLogger(__name__)
 
 
 def create_collection(
-    description: str | None = None, extra_fields: dict[str, Any] | None = None
+    description: str | None = None,
+    extra_fields: dict[str, Any] | None = None,
+    items: Iterable[Item | dict[str, Any]] | None = None,
 ) -> Collection:
     """Create a STAC Collection
 
@@ -43,6 +50,11 @@ def create_collection(
 
     See `Collection<https://pystac.readthedocs.io/en/latest/api.html#collection>`_.
 
+    Args:
+        items (iterable, optional): Items to compute the summaries, extent and
+            ``cube:dimensions`` from, in a single streaming pass. By default,
+            these are hardcoded.
+
     Returns:
         Collection: STAC Collection object
     """
@@ -156,6 +168,11 @@ def create_collection(
     if extra_fields:
         collection.extra_fields.update(extra_fields)
 
+    if items is not None:
+        aggregator = aggregate.CollectionAggregator(SUMMARIES)
+        aggregator.add_items(items)
+        aggregator.apply(collection)
+
     return collection
 
 
@@ -199,14 +216,54 @@ class PathParts:
 def create_item_from_dataset(
     ds: xr.Dataset,
     asset_href: str,
+    footprint: bool = False,
+    footprint_resolution: float = footprints.DEFAULT_RESOLUTION,
+    statistics: bool = False,
 ) -> Item:
+    """
+    Create a STAC item from a flood dataset.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        The dataset opened from ``asset_href``.
+    asset_href : str
+        URL to the NetCDF file.
+    footprint : bool
+        Whether to compute the item's geometry from the inundated cells of
+        ``ds.inun``. This reads the whole array (in bounded-memory blocks). By
+        default, and for maps without any inundation, the geometry covers the
+        globe.
+    footprint_resolution : float
+        The resolution, in degrees, of the footprint.
+    statistics : bool
+        Whether to compute summary statistics and a histogram of the
+        inundation depth, recorded on the ``data`` asset with the raster
+        extension, and the flooded area in ``deltares:flooded_area``. This
+        reads the whole array (in bounded-memory blocks). With ``footprint``
+        too, both are computed in the same pass.
+    """
     parts = PathParts.from_url(asset_href)
-    geom = shapely.geometry.box(-180, -90, 180, 90)
+    inun_statistics = flooded_area = None
+    if footprint and statistics:
+        lon = ds.inun["lon"].values
+        factor = footprints.footprint_factor(lon, footprint_resolution)
+        mask = footprints.CoarseMask((ds.sizes["lat"], ds.sizes["lon"]), factor)
+        inun_statistics, flooded_area = stats.flood_statistics(ds.inun, mask=mask)
+        geometry, bbox = footprints.footprint_to_stac(
+            footprints.mask_footprint(mask.mask, lon, ds.inun["lat"].values, factor)
+        )
+    elif footprint:
+        geometry, bbox = footprints.footprint_to_stac(
+            footprints.compute_footprint(ds.inun, resolution=footprint_resolution)
+        )
+    else:
+        geometry, bbox = footprints.footprint_to_stac(footprints.GLOBE)
 
     template = Item(
         parts.item_id,
-        shapely.geometry.mapping(geom),
-        geom.bounds,
+        geometry,
+        bbox,
         ds.time.to_pandas().dt.to_pydatetime()[0],
         {},
     )
@@ -225,6 +282,20 @@ def create_item_from_dataset(
             roles=constants.DATA_ASSET_ROLES,
         ),
     )
+
+    if statistics:
+        if inun_statistics is None or flooded_area is None:
+            inun_statistics, flooded_area = stats.flood_statistics(ds.inun)
+        item.properties["deltares:flooded_area"] = flooded_area
+        histogram = inun_statistics.histogram()
+        assert histogram is not None
+        band = RasterBand.create(
+            unit="m",
+            statistics=Statistics.create(**inun_statistics.to_dict()),
+            histogram=Histogram.create(**histogram),
+        )
+        RasterExtension.ext(item.assets["data"], add_if_missing=True).bands = [band]
+
     return item
 
 
@@ -232,6 +303,8 @@ def create_item(
     asset_href: str,
     transform_href: Callable[[str], str] | None = None,
     filename: str | None = None,
+    footprint: bool = False,
+    statistics: bool = False,
 ) -> Item:
     """
     Create a STAC item from a URL to a Kerchunk index file.
@@ -240,7 +313,26 @@ def create_item(
     ----------
     asset_href : str
         URL to the NetCDF file.
+    footprint : bool
+        Whether to compute the item's geometry from the inundated cells. See
+        :func:`create_item_from_dataset`.
+    statistics : bool
+        Whether to compute summary statistics of the inundation depth. See
+        :func:`create_item_from_dataset`.
+
+    The size and checksum of the file, computed while it's downloaded, are
+    recorded on the ``data`` asset with the file extension.
     """
-    filename, _ = urllib.request.urlretrieve(asset_href, filename=filename)
-    ds = xr.open_dataset(filename, engine="h5netcdf")
-    return create_item_from_dataset(ds, asset_href)
+    href = asset_href if transform_href is None else transform_href(asset_href)
+    info = download.download(href, filename=filename)
+    assert info.filename is not None
+    try:
+        with xr.open_dataset(info.filename, engine="h5netcdf") as ds:
+            item = create_item_from_dataset(
+                ds, asset_href, footprint=footprint, statistics=statistics
+            )
+    finally:
+        if filename is None:
+            os.remove(info.filename)
+    download.add_file_info(item.assets["data"], info)
+    return item
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import xarray as xr
+
+from stactools.deltares.utils import DEFAULT_MAX_BLOCK_CELLS, block_size, iter_blocks
+
+if TYPE_CHECKING:
+    from stactools.deltares.footprints import CoarseMask
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+#: Range and number of buckets of the inundation depth histogram, in meters.
+#: Depths outside the range are counted in the first or last bucket.
+FLOOD_HISTOGRAM_RANGE = (0.0, 10.0)
+FLOOD_HISTOGRAM_BUCKETS = 20
+
+
+@dataclass
+class RunningStatistics:
+    """
+    Summary statistics accumulated over blocks of an array.
+
+    Each call to :meth:`update` folds in one block, so the statistics of an
+    array can be computed in a single pass without holding it in memory.
+    Non-finite values (e.g. NaNs from decoded fill values) are ignored. The
+    variance is combined with Chan et al.'s parallel algorithm, which stays
+    stable for long series.
+    """
+
+    histogram_range: tuple[float, float] | None = None
+    histogram_buckets: int = 0
+    total: int = 0
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = math.inf
+    maximum: float = -math.inf
+    buckets: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype="int64"))
+
+    def __post_init__(self) -> None:
+        if self.histogram_range is not None and not len(self.buckets):
+            self.buckets = np.zeros(self.histogram_buckets, dtype="int64")
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values).ravel()
+        self.total += values.size
+        values = values[np.isfinite(values)]
+        n = values.size
+        if not n:
+            return
+
+        mean = float(values.mean(dtype="float64"))
+        m2 = float(np.square(values - mean, dtype="float64").sum())
+        count = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / count
+        self.m2 += m2 + delta**2 * self.count * n / count
+        self.count = count
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+        if self.histogram_range is not None:
+            lo, hi = self.histogram_range
+            counts, _ = np.histogram(
+                np.clip(values, lo, hi),
+                bins=self.histogram_buckets,
+                range=self.histogram_range,
+            )
+            self.buckets += counts
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else math.nan
+
+    def to_dict(self) -> dict[str, Any]:
+        """The statistics, using the field names of the raster extension."""
+        if not self.count:
+            return {"valid_percent": 0.0}
+        return {
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "valid_percent": 100 * self.count / self.total,
+        }
+
+    def histogram(self) -> dict[str, Any] | None:
+        """The histogram, using the field names of the raster extension."""
+        if self.histogram_range is None:
+            return None
+        lo, hi = self.histogram_range
+        return {
+            "count": self.histogram_buckets,
+            "min": lo,
+            "max": hi,
+            "buckets": self.buckets.tolist(),
+        }
+
+
+def cell_area(lat: np.ndarray, lon_step: float, lat_step: float) -> np.ndarray:
+    """The area, in square kilometers, of cells centered on ``lat``."""
+    lat_step = abs(lat_step)
+    upper = np.radians(np.clip(lat + lat_step / 2, -90, 90))
+    lower = np.radians(np.clip(lat - lat_step / 2, -90, 90))
+    return (
+        EARTH_RADIUS_KM**2
+        * math.radians(abs(lon_step))
+        * (np.sin(upper) - np.sin(lower))
+    )
+
+
+def flood_statistics(
+    da: xr.DataArray,
+    max_block_cells: int = DEFAULT_MAX_BLOCK_CELLS,
+    mask: CoarseMask | None = None,
+) -> tuple[RunningStatistics, float]:
+    """
+    Compute summary statistics of an inundation array in a single pass.
+
+    The array is read in blocks of whole rows (along ``lat``), of at most
+    ``max_block_cells`` cells each. Dry cells, stored as zero, are left out
+    of the statistics and histogram like missing ones, so they describe the
+    depth where there is flooding and ``valid_percent`` is the percentage
+    of flooded cells.
+
+    If a :class:`~stactools.deltares.footprints.CoarseMask` is given, it's
+    updated from the same blocks, so a footprint can be computed without
+    reading the array again. Blocks are then aligned to the mask's cells, and
+    split along ``lon`` when ``factor`` rows are over the budget, so they're
+    only larger than ``max_block_cells`` if a single ``factor x factor`` tile
+    is.
+
+    Returns
+    -------
+    statistics, flooded_area
+        The statistics of the inundation depth, including a histogram, and
+        the total area, in square kilometers, of cells with a depth greater
+        than zero.
+    """
+    stats = RunningStatistics(FLOOD_HISTOGRAM_RANGE, FLOOD_HISTOGRAM_BUCKETS)
+    lat = da["lat"].values
+    lon = da["lon"].values
+    lat_step = float(lat[1] - lat[0]) if len(lat) > 1 else 0.0
+    lon_step = float(lon[1] - lon[0]) if len(lon) > 1 else 0.0
+    da = da.transpose(..., "lat", "lon")
+
+    flooded_area = 0.0
+    rows = block_size(da, "lat", max_block_cells)
+    cols = da.sizes["lon"]
+    if mask is not None:
+        # Blocks start on the rows and columns of the coarse mask's cells.
+        factor = mask.factor
+        rows = rows // factor * factor
+        if not rows:
+            # A band of ``factor`` rows is over the budget, so split it into
+            # tiles of whole coarse cells.
+            rows = factor
+            per_col = da.size // max(da.sizes["lon"], 1) // max(len(lat), 1) * rows
+            cols = max(factor, max_block_cells // max(per_col, 1) // factor * factor)
+    for key, values in iter_blocks(da, {"lat": rows, "lon": cols}):
+        if mask is not None:
+            mask.update(values, key["lat"].start, key["lon"].start)
+        wet = values > 0
+        stats.update(np.where(wet, values, np.nan))
+        flooded = wet.reshape(-1, *values.shape[-2:]).any(axis=0)
+        area = cell_area(lat[key["lat"]], lon_step, lat_step)
+        flooded_area += float((flooded.sum(axis=1) * area).sum())
+
+    return stats, flooded_area
+
+
+def dataset_statistics(
+    ds: xr.Dataset,
+    dim: str = "time",
+    max_block_cells: int = DEFAULT_MAX_BLOCK_CELLS,
+) -> dict[str, RunningStatistics]:
+    """
+    Compute summary statistics of each variable with dimension ``dim``.
+
+    Each variable is read once, in blocks along ``dim`` of at most
+    ``max_block_cells`` cells.
+    """
+    result = {}
+    for name, da in ds.data_vars.items():
+        if dim not in da.dims:
+            continue
+        stats = RunningStatistics()
+        for _, values in iter_blocks(da, {dim: block_size(da, dim, max_block_cells)}):
+            stats.update(values)
+        result[str(name)] = stats
+    return result
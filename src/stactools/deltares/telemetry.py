@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import json
+import logging
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterable, Iterator
+
+import fsspec
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+#: Percentiles of the span durations reported by :func:`summarize`.
+PERCENTILES = [50, 90, 99]
+
+
+def peak_rss() -> int | None:
+    """The peak resident set size of this process, in bytes, if it's known."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return int(maxrss if sys.platform == "darwin" else maxrss * 1024)
+
+
+@dataclass
+class Span:
+    """
+    The timing and I/O of one stage of processing one file.
+
+    Attributes
+    ----------
+    stage : str
+        The name of the stage, e.g. ``download`` or ``upload_item``.
+    key : str
+        What was processed, e.g. the URL of a NetCDF file.
+    seconds : float
+        The wall-clock duration of the stage.
+    bytes_read, bytes_written : int
+        The number of bytes read and written by the stage, where known.
+    peak_rss : int, optional
+        The peak resident set size of the process at the end of the stage.
+    skipped : bool
+        Whether the stage's work was skipped, e.g. because the output
+        already existed.
+    cached : bool
+        Whether the stage was served from a cache.
+    error : str, optional
+        The error raised by the stage, if any.
+    """
+
+    stage: str
+    key: str = ""
+    start: float = 0.0
+    seconds: float = 0.0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    peak_rss: int | None = None
+    skipped: bool = False
+    cached: bool = False
+    error: str | None = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+
+class RecordedError(Exception):
+    """
+    An error raised while processing a file, with the spans recorded up to
+    it, so a worker can return them to the driver along with the error.
+
+    Attributes
+    ----------
+    spans : list of Span
+        The spans recorded before and including the failed stage.
+    """
+
+    def __init__(self, message: str, spans: list[Span]) -> None:
+        # Both are arguments, so the error can be pickled.
+        super().__init__(message, spans)
+        self.spans = spans
+
+    def __str__(self) -> str:
+        return str(self.args[0])
+
+
+class Recorder:
+    """
+    Record :class:`Span` objects for the stages of processing a file.
+
+    Recorders are cheap and picklable, so a worker can create one per task and
+    return its spans to the driver.
+
+    Parameters
+    ----------
+    key : str
+        Recorded on each span, e.g. the URL of the file being processed.
+
+    Examples
+    --------
+    >>> recorder = Recorder(url)
+    >>> with recorder.span("download") as span:
+    ...     urllib.request.urlretrieve(url, filename)
+    ...     span.bytes_read = os.path.getsize(filename)
+    """
+
+    def __init__(self, key: str = "") -> None:
+        self.key = key
+        self.spans: list[Span] = []
+
+    @contextlib.contextmanager
+    def span(self, stage: str, **kwargs: Any) -> Iterator[Span]:
+        """
+        Time a stage. The span is yielded so the stage can record its I/O and
+        flags, and is recorded (with any error) when the stage exits.
+        """
+        span = Span(stage, key=self.key, start=time.time(), **kwargs)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.seconds = time.perf_counter() - start
+            span.peak_rss = peak_rss()
+            self.spans.append(span)
+            logger.debug("%s", span)
+
+
+def write_spans(spans: Iterable[Span], path: str, mode: str = "w") -> None:
+    """Write spans to a JSON lines file."""
+    with fsspec.open(path, mode + "t") as f:
+        for span in spans:
+            f.write(span.to_json())
+            f.write("\n")
+
+
+def read_spans(path: str) -> list[Span]:
+    """Read spans written by :func:`write_spans`."""
+    with fsspec.open(path, "rt") as f:
+        return [Span(**json.loads(line)) for line in f if line.strip()]
+
+
+def summarize(spans: Iterable[Span]) -> dict[str, dict[str, Any]]:
+    """
+    Summarize spans by stage.
+
+    Returns
+    -------
+    dict
+        For each stage, in the order they're first seen, the ``count`` of
+        spans and the number ``skipped``, ``cached`` and with an ``error``;
+        the ``total``, ``max`` and ``p50``/``p90``/``p99`` durations in
+        seconds; the total ``bytes_read`` and ``bytes_written``; the
+        ``throughput`` in bytes (read and written) per second of the stage's
+        duration; and the largest ``peak_rss``.
+    """
+    by_stage: dict[str, list[Span]] = collections.defaultdict(list)
+    for span in spans:
+        by_stage[span.stage].append(span)
+
+    result = {}
+    for stage, stage_spans in by_stage.items():
+        seconds = np.array([span.seconds for span in stage_spans])
+        nbytes = sum(span.bytes_read + span.bytes_written for span in stage_spans)
+        rss = [span.peak_rss for span in stage_spans if span.peak_rss is not None]
+        summary: dict[str, Any] = {
+            "count": len(stage_spans),
+            "skipped": sum(span.skipped for span in stage_spans),
+            "cached": sum(span.cached for span in stage_spans),
+            "errors": sum(span.error is not None for span in stage_spans),
+            "total": float(seconds.sum()),
+            "max": float(seconds.max()),
+        }
+        for q, value in zip(PERCENTILES, np.percentile(seconds, PERCENTILES)):
+            summary[f"p{q}"] = float(value)
+        summary["bytes_read"] = sum(span.bytes_read for span in stage_spans)
+        summary["bytes_written"] = sum(span.bytes_written for span in stage_spans)
+        summary["throughput"] = nbytes / summary["total"] if summary["total"] else 0.0
+        summary["peak_rss"] = max(rss) if rss else None
+        result[stage] = summary
+    return result
+
+
+def _format_bytes(n: float | None) -> str:
+    if n is None:
+        return "-"
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def format_report(spans: Iterable[Span]) -> str:
+    """A plain-text table of :func:`summarize`, one row per stage."""
+    spans = list(spans)
+    summary = summarize(spans)
+    header = (
+        f"{'stage':<16}{'count':>7}{'skip':>6}{'err':>5}{'p50 s':>9}{'p90 s':>9}"
+        f"{'p99 s':>9}{'total s':>10}{'read':>12}{'written':>12}{'rate/s':>12}"
+        f"{'peak rss':>12}"
+    )
+    lines = [header]
+    for stage, s in summary.items():
+        lines.append(
+            f"{stage:<16}{s['count']:>7}{s['skipped']:>6}{s['errors']:>5}"
+            f"{s['p50']:>9.2f}{s['p90']:>9.2f}{s['p99']:>9.2f}{s['total']:>10.1f}"
+            f"{_format_bytes(s['bytes_read']):>12}"
+            f"{_format_bytes(s['bytes_written']):>12}"
+            f"{_format_bytes(s['throughput']):>12}"
+            f"{_format_bytes(s['peak_rss']):>12}"
+        )
+    # Spans without a start time, e.g. for tasks that failed before
+    # recording any, don't count towards the elapsed time.
+    timed = [span for span in spans if span.start]
+    if timed:
+        keys = {span.key for span in spans}
+        start = min(span.start for span in timed)
+        end = max(span.start + span.seconds for span in timed)
+        elapsed = end - start
+        rate = len(keys) / elapsed if elapsed else 0.0
+        lines.append(f"{len(keys)} files in {elapsed:.1f} s ({rate:.2f} files/s)")
+    return "\n".join(lines)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import itertools
+from typing import Iterator
+
+import numpy as np
+import xarray as xr
+
+#: Upper bound on the number of cells read at once by blockwise reductions.
+DEFAULT_MAX_BLOCK_CELLS = 2**24
+
+
+def iter_blocks(
+    da: xr.DataArray, sizes: dict[str, int]
+) -> Iterator[tuple[dict[str, slice], np.ndarray]]:
+    """
+    Iterate over the blocks of a DataArray, loading one block at a time.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        The array to iterate over. It should be lazily loaded (e.g. opened with
+        ``xr.open_dataset`` or backed by dask) so that only the current block is
+        read into memory.
+    sizes : dict
+        Mapping of dimension name to block size along that dimension.
+        Dimensions not in ``sizes`` are read whole.
+
+    Yields
+    ------
+    key, values
+        The positional slices of the block, suitable for ``da.isel(key)``,
+        and the block's values as a NumPy array.
+    """
+    dims = list(sizes)
+    starts = [range(0, da.sizes[dim], sizes[dim]) for dim in dims]
+    for offsets in itertools.product(*starts):
+        key = {
+            dim: slice(start, min(start + sizes[dim], da.sizes[dim]))
+            for dim, start in zip(dims, offsets)
+        }
+        yield key, np.asarray(da.isel(key).values)
+
+
+def block_size(da: xr.DataArray, dim: str, max_cells: int) -> int:
+    """
+    The block size along ``dim`` keeping blocks under ``max_cells`` cells.
+
+    Blocks always span the full extent of the other dimensions.
+    """
+    per_step = da.size // max(da.sizes[dim], 1)
+    return max(1, max_cells // max(per_step, 1))
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+import itertools
+import json
+import logging
+import os
+import tempfile
+import urllib.parse
+from typing import Any, Iterable, Iterator
+
+import fsspec
+import jsonschema
+import pystac
+from pystac import STACObjectType, STACValidationError
+from pystac.extensions.datacube import DatacubeExtension
+from pystac.extensions.file import FileExtension
+from pystac.extensions.item_assets import ItemAssetsExtension
+from pystac.extensions.raster import RasterExtension
+from pystac.validation.schema_uri_map import DefaultSchemaUriMap
+from pystac.validation.stac_validator import STACValidator
+from referencing import Registry, Resource
+
+logger = logging.getLogger(__name__)
+
+#: Environment variable overriding the schema cache directory.
+SCHEMA_CACHE_ENV = "STACTOOLS_DELTARES_SCHEMA_CACHE"
+#: Extension schemas used by the items and collections created by this package.
+EXTENSION_SCHEMA_URIS = [
+    DatacubeExtension.get_schema_uri(),
+    FileExtension.get_schema_uri(),
+    ItemAssetsExtension.get_schema_uri(),
+    RasterExtension.get_schema_uri(),
+]
+
+
+class SchemaNotCachedError(Exception):
+    """Raised when a schema isn't cached and fetching schemas is disabled."""
+
+    def __init__(self, uri: str) -> None:
+        super().__init__(
+            f"The schema {uri} isn't in the schema cache. Run "
+            "`stac deltares fetch-schemas` on a machine with network access and "
+            f"copy the cache directory, or set {SCHEMA_CACHE_ENV}."
+        )
+
+
+def default_cache_dir() -> str:
+    """The schema cache directory, from ``$STACTOOLS_DELTARES_SCHEMA_CACHE``."""
+    return os.environ.get(
+        SCHEMA_CACHE_ENV,
+        os.path.join(
+            os.path.expanduser("~"), ".cache", "stactools-deltares", "schemas"
+        ),
+    )
+
+
+def _bundled_schemas() -> dict[str, dict[str, Any]]:
+    # Recent versions of pystac ship the core schemas.
+    try:
+        from pystac.validation.local_validator import get_local_schema_cache
+    except ImportError:
+        return {}
+    result: dict[str, dict[str, Any]] = get_local_schema_cache()
+    return result
+
+
+def core_schema_uri(stac_dict: dict[str, Any]) -> str | None:
+    """The URI of the core schema for a STAC object's type and version."""
+    object_type = pystac.serialization.identify_stac_object_type(stac_dict)
+    if object_type is None:
+        return None
+    uri: str | None = DefaultSchemaUriMap().get_object_schema_uri(
+        object_type, stac_dict.get("stac_version", pystac.get_stac_version())
+    )
+    return uri
+
+
+class SchemaCache:
+    """
+    Read JSON schemas from memory, a local directory, or the network, in that
+    order, saving the schemas read from the network to the directory.
+
+    Parameters
+    ----------
+    path : str, optional
+        The cache directory. Defaults to :func:`default_cache_dir`.
+    fetch : bool
+        Whether to fetch schemas missing from the cache. Without this, a
+        missing schema raises :class:`SchemaNotCachedError`.
+    """
+
+    def __init__(self, path: str | None = None, fetch: bool = True) -> None:
+        self.path = path or default_cache_dir()
+        self.fetch = fetch
+        self.schemas = dict(_bundled_schemas())
+
+    def filename(self, uri: str) -> str:
+        parsed = urllib.parse.urlparse(uri)
+        return os.path.join(self.path, parsed.netloc, *parsed.path.split("/"))
+
+    def get(self, uri: str) -> dict[str, Any]:
+        uri = uri.split("#")[0]
+        if uri in self.schemas:
+            return self.schemas[uri]
+        filename = self.filename(uri)
+        if os.path.exists(filename):
+            with open(filename) as f:
+                schema: dict[str, Any] = json.load(f)
+        elif self.fetch:
+            logger.info("Fetching schema %s", uri)
+            with fsspec.open(uri, "rt") as f:
+                schema = json.load(f)
+            self.save(uri, schema)
+        else:
+            raise SchemaNotCachedError(uri)
+        self.schemas[uri] = schema
+        return schema
+
+    def save(self, uri: str, schema: dict[str, Any]) -> None:
+        filename = self.filename(uri)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename), prefix=".")
+        with os.fdopen(fd, "w") as f:
+            json.dump(schema, f)
+        os.replace(tmp, filename)
+
+    def retrieve(self, uri: str) -> Resource[Any]:
+        return Resource.from_contents(self.get(uri))
+
+
+def _refs(schema: Any) -> Iterator[str]:
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            if key == "$ref" and isinstance(value, str):
+                yield value
+            else:
+                yield from _refs(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            yield from _refs(value)
+
+
+def referenced_schemas(cache: SchemaCache, uri: str) -> dict[str, dict[str, Any]]:
+    """A schema and all the schemas it references, recursively, keyed by URI."""
+    result: dict[str, dict[str, Any]] = {}
+    pending = [uri]
+    while pending:
+        uri = pending.pop().split("#")[0]
+        if not uri or uri in result:
+            continue
+        result[uri] = cache.get(uri)
+        pending.extend(urllib.parse.urljoin(uri, ref) for ref in _refs(result[uri]))
+    return result
+
+
+def fetch_schemas(
+    uris: Iterable[str] | None = None, cache_dir: str | None = None
+) -> list[str]:
+    """
+    Download schemas, and the schemas they reference, into the cache.
+
+    Parameters
+    ----------
+    uris : list of str, optional
+        The schemas to fetch. Defaults to the core item and collection schemas
+        and :data:`EXTENSION_SCHEMA_URIS`.
+    cache_dir : str, optional
+        The cache directory. Defaults to :func:`default_cache_dir`.
+
+    Returns
+    -------
+    list of str
+        The URIs of the cached schemas.
+    """
+    if uris is None:
+        version = pystac.get_stac_version()
+        uri_map = DefaultSchemaUriMap()
+        core = [
+            uri_map.get_object_schema_uri(STACObjectType.ITEM, version),
+            uri_map.get_object_schema_uri(STACObjectType.COLLECTION, version),
+        ]
+        uris = [uri for uri in core if uri] + EXTENSION_SCHEMA_URIS
+    cache = SchemaCache(cache_dir, fetch=True)
+    seen: dict[str, dict[str, Any]] = {}
+    for uri in uris:
+        seen.update(referenced_schemas(cache, uri))
+    for uri, schema in seen.items():
+        if not os.path.exists(cache.filename(uri)):
+            cache.save(uri, schema)
+    return sorted(seen)
+
+
+class CachedSchemaValidator(STACValidator):
+    """
+    A STAC validator using locally cached schemas and compiled validators.
+
+    Each schema is read (and checked) once and compiled into a
+    :mod:`jsonschema` validator once, so validating many objects costs
+    only the validation itself. Use :func:`use_cached_schemas` to make
+    pystac's ``validate`` methods use it.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        The schema cache directory. Defaults to :func:`default_cache_dir`.
+    fetch : bool
+        Whether to fetch schemas missing from the cache.
+    """
+
+    def __init__(self, cache_dir: str | None = None, fetch: bool = True) -> None:
+        self.cache = SchemaCache(cache_dir, fetch=fetch)
+        self.registry: Registry[Any] = Registry(
+            retrieve=self.cache.retrieve  # type: ignore[call-arg]
+        )
+        self._validators: dict[str, Any] = {}
+
+    def validator(self, uri: str) -> Any:
+        """The compiled validator for a schema."""
+        if uri not in self._validators:
+            # Adding every referenced schema to the registry up front is much
+            # faster than resolving references as they're found.
+            schemas = referenced_schemas(self.cache, uri)
+            self.registry = self.registry.with_resources(
+                (key, Resource.from_contents(value)) for key, value in schemas.items()
+            ).crawl()
+            schema = schemas[uri]
+            cls = jsonschema.validators.validator_for(schema)
+            cls.check_schema(schema)
+            self._validators[uri] = cls(schema, registry=self.registry)
+        return self._validators[uri]
+
+    def schema_uris(self, stac_dict: dict[str, Any]) -> list[str]:
+        """The core and extension schemas a STAC object should be validated against."""
+        uris = [core_schema_uri(stac_dict)]
+        uris.extend(stac_dict.get("stac_extensions", []))
+        return [uri for uri in uris if uri]
+
+    def iter_errors(self, stac_dict: dict[str, Any]) -> Iterator[str]:
+        """Yield a message for each way a STAC object is invalid."""
+        for uri in self.schema_uris(stac_dict):
+            for error in self.validator(uri).iter_errors(stac_dict):
+                path = "/".join(str(p) for p in error.absolute_path)
+                yield f"{uri}: {path}: {error.message}"
+
+    def _validate(self, stac_dict: dict[str, Any], uri: str, href: str | None) -> str:
+        errors = list(self.validator(uri).iter_errors(stac_dict))
+        if errors:
+            best = jsonschema.exceptions.best_match(errors)
+            msg = (
+                f"Validation failed for {stac_dict.get('type')} "
+                f"{'at ' + href + ' ' if href else ''}"
+                f"with ID {stac_dict.get('id')} against schema at {uri}\n{best}"
+            )
+            raise STACValidationError(msg, source=errors) from best
+        return uri
+
+    def validate_core(
+        self,
+        stac_dict: dict[str, Any],
+        stac_object_type: STACObjectType,
+        stac_version: str,
+        href: str | None = None,
+    ) -> str | None:
+        uri = DefaultSchemaUriMap().get_object_schema_uri(
+            stac_object_type, stac_version
+        )
+        if uri is None:
+            return None
+        return self._validate(stac_dict, uri, href)
+
+    def validate_extension(
+        self,
+        stac_dict: dict[str, Any],
+        stac_object_type: STACObjectType,
+        stac_version: str,
+        extension_id: str,
+        href: str | None = None,
+    ) -> str | None:
+        return self._validate(stac_dict, extension_id, href)
+
+
+@functools.lru_cache(maxsize=None)
+def get_validator(
+    cache_dir: str | None = None, fetch: bool = True
+) -> CachedSchemaValidator:
+    """The process-wide :class:`CachedSchemaValidator` for a cache directory."""
+    return CachedSchemaValidator(cache_dir, fetch=fetch)
+
+
+def use_cached_schemas(
+    cache_dir: str | None = None, fetch: bool = True
+) -> CachedSchemaValidator:
+    """Make pystac validate with a :class:`CachedSchemaValidator`."""
+    validator = get_validator(cache_dir, fetch)
+    pystac.validation.set_validator(validator)
+    return validator
+
+
+def _validate_one(
+    stac_dict: dict[str, Any], cache_dir: str | None, fetch: bool
+) -> tuple[str, list[str]]:
+    validator = get_validator(cache_dir, fetch)
+    return stac_dict.get("id", ""), list(validator.iter_errors(stac_dict))
+
+
+def validate_dicts(
+    stac_dicts: Iterable[dict[str, Any]],
+    cache_dir: str | None = None,
+    fetch: bool = True,
+    max_workers: int | None = None,
+    chunksize: int = 64,
+) -> Iterator[tuple[str, list[str]]]:
+    """
+    Validate many STAC objects on a pool of processes.
+
+    Each process compiles the validators once, and the objects are sent to the
+    processes in chunks of ``chunksize``. At most ``16 * chunksize`` objects
+    are read from ``stac_dicts`` ahead of the results.
+
+    Yields
+    ------
+    id, errors
+        The ID of each object, in order, and its validation errors.
+    """
+    validate = functools.partial(_validate_one, cache_dir=cache_dir, fetch=fetch)
+    iterator = iter(stac_dicts)
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as pool:
+        while True:
+            batch = list(itertools.islice(iterator, 16 * chunksize))
+            if not batch:
+                break
+            yield from pool.map(validate, batch, chunksize=chunksize)
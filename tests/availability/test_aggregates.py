@@ -0,0 +1,53 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pystac
+import xarray as xr
+
+from stactools.deltares.availability import aggregates
+
+
+def make_dataset() -> xr.Dataset:
+    time = pd.date_range("1970-12-15", "1972-02-10")
+    values = np.random.default_rng(0).random((len(time), 3, 2), dtype="float32")
+    values[::7] = np.nan
+    return xr.Dataset(
+        {
+            "latitude": ("GrandID", [10.0, 20.0, 30.0]),
+            "P_res": (("time", "GrandID", "ksathorfrac"), values, {"units": "m3"}),
+        },
+        coords={"time": time, "GrandID": [1, 2, 3], "ksathorfrac": [5, 20]},
+    )
+
+
+def test_compute_aggregates() -> None:
+    ds = make_dataset()
+    # Blocks that don't line up with months.
+    result = aggregates.compute_aggregates(ds, max_block_cells=6 * 10)
+    ds = ds.set_coords("latitude")
+
+    expected = ds.P_res.resample(time="MS").mean()
+    xr.testing.assert_allclose(result["monthly"].P_res, expected, rtol=1e-6)
+    assert result["monthly"].P_res.dtype == "float32"
+    assert result["monthly"].P_res.attrs == {"units": "m3"}
+
+    expected = ds.P_res.resample(time="YS").mean()
+    xr.testing.assert_allclose(result["annual"].P_res, expected, rtol=1e-6)
+
+    expected = ds.P_res.groupby("time.month").mean()
+    xr.testing.assert_allclose(result["climatology"].P_res, expected, rtol=1e-6)
+
+
+def test_write_aggregates(tmp_path: pathlib.Path) -> None:
+    result = aggregates.compute_aggregates(make_dataset())
+    stores = {key: str(tmp_path / f"{key}.zarr") for key in aggregates.AGGREGATES}
+    aggregates.write_aggregates(result, stores)
+
+    for key, store in stores.items():
+        xr.testing.assert_equal(xr.open_zarr(store).load(), result[key])
+
+    item = pystac.Item("BOM", None, None, pd.Timestamp("1970-01-01"), {})
+    aggregates.add_aggregate_assets(item, stores)
+    assert item.assets["monthly"].href == stores["monthly"]
+    assert item.assets["climatology"].roles == ["data", "zarr"]
@@ -0,0 +1,60 @@
+import pathlib
+
+import numpy as np
+import pytest
+import shapely.geometry
+import xarray as xr
+
+from stactools.deltares.availability import locations
+
+
+@pytest.fixture
+def table() -> locations.ReservoirLocations:
+    era5 = xr.Dataset(
+        {
+            "longitude": ("GrandID", [4.9, 5.1, -120.0]),
+            "latitude": ("GrandID", [52.3, 52.1, 38.0]),
+        },
+        coords={"GrandID": [1, 2, 3]},
+    )
+    bom = xr.Dataset(
+        {
+            "longitude": ("GrandID", [150.0, 5.0]),
+            "latitude": ("GrandID", [-33.0, 52.2]),
+        },
+        coords={"GrandID": [7, 2]},
+    )
+    return locations.concat(
+        [
+            locations.locations_from_dataset(era5, "ERA5"),
+            locations.locations_from_dataset(bom, "BOM"),
+        ]
+    )
+
+
+def test_query(table: locations.ReservoirLocations) -> None:
+    result = table.query_bbox([4, 52, 6, 53])
+    assert result.grand_id.tolist() == [1, 2, 2]
+    assert result.reservoir.tolist() == ["ERA5", "ERA5", "BOM"]
+
+    result = table.query(shapely.geometry.box(4, 52, 6, 53), reservoir="BOM")
+    assert result.grand_id.tolist() == [2]
+
+    result = table.query(shapely.geometry.mapping(shapely.geometry.box(0, 0, 1, 1)))
+    assert len(result) == 0
+
+
+def test_nearest(table: locations.ReservoirLocations) -> None:
+    assert table.nearest(149, -30).grand_id.tolist() == [7]
+    assert table.nearest(4.8, 52.4, reservoir="ERA5").grand_id.tolist() == [1]
+
+
+def test_roundtrip(table: locations.ReservoirLocations, tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "locations.nc")
+    table.to_netcdf(path)
+    result = locations.read_locations(path)
+
+    np.testing.assert_array_equal(result.grand_id, table.grand_id)
+    np.testing.assert_array_equal(result.longitude, table.longitude)
+    np.testing.assert_array_equal(result.reservoir, table.reservoir)
+    assert result.query_bbox([4, 52, 6, 53]).grand_id.tolist() == [1, 2, 2]
@@ -0,0 +1,41 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import zarr
+
+from stactools.deltares.availability import rechunk
+
+
+def test_write_timeseries_zarr(tmp_path: pathlib.Path) -> None:
+    time = pd.date_range("1970-01-01", periods=30)
+    grand_id = np.arange(1, 12)
+    ds = xr.Dataset(
+        {
+            "latitude": ("GrandID", np.linspace(-40, 60, 11)),
+            "longitude": ("GrandID", np.linspace(-100, 120, 11)),
+            "P_res": (
+                ("time", "GrandID", "ksathorfrac"),
+                np.random.default_rng(0).random((30, 11, 5), dtype="float32"),
+            ),
+        },
+        coords={
+            "time": time,
+            "GrandID": grand_id,
+            "ksathorfrac": [5, 20, 50, 100, 250],
+        },
+    )
+    path = str(tmp_path / "BOM.zarr")
+
+    rechunk.write_timeseries_zarr(
+        ds, path, grand_ids_per_chunk=2, max_block_cells=4 * 150
+    )
+
+    result = xr.open_zarr(path, consolidated=True)
+    xr.testing.assert_equal(result.load(), ds)
+    assert result.P_res.encoding["chunks"] == (30, 2, 5)
+    assert result.latitude.encoding["chunks"] == (2,)
+    arr = zarr.open_group(path, mode="r")["P_res"]
+    assert isinstance(arr, zarr.Array)
+    assert arr.chunks == (30, 2, 5)
@@ -0,0 +1,46 @@
+import datetime
+import json
+from typing import Callable
+
+import pystac
+import pytest
+import shapely
+
+
+def _make_item(
+    dem_name: object = "LIDAR",
+    sea_level_year: int = 2018,
+    return_period: int = 0,
+    bbox: list[float] | None = None,
+    resolution: str | None = "90m",
+) -> pystac.Item:
+    bbox = bbox or [0.0, 0.0, 1.0, 1.0]
+    properties = {
+        "deltares:dem_name": dem_name,
+        "deltares:sea_level_year": sea_level_year,
+        "deltares:return_period": return_period,
+        "cube:dimensions": {
+            "time": {
+                "type": "temporal",
+                "extent": [f"{sea_level_year}-01-01T00:00:00Z"] * 2,
+            },
+            "lat": {"type": "spatial", "axis": "y", "extent": bbox[1::2]},
+        },
+    }
+    if resolution is not None:
+        properties["deltares:resolution"] = resolution
+    item = pystac.Item(
+        f"{dem_name}-{resolution}-{sea_level_year}-{return_period:04d}",
+        json.loads(shapely.to_geojson(shapely.box(*bbox))),
+        bbox,
+        datetime.datetime(sea_level_year, 1, 1, tzinfo=datetime.timezone.utc),
+        properties,
+    )
+    item.add_asset("data", pystac.Asset(f"https://example.com/{item.id}.nc"))
+    return item
+
+
+@pytest.fixture
+def make_item() -> Callable[..., pystac.Item]:
+    """A factory of flood items with the given ``deltares:`` properties."""
+    return _make_item
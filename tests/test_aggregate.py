@@ -0,0 +1,65 @@
+import datetime
+from typing import Callable
+
+import pystac
+
+from stactools.deltares import aggregate
+
+
+def test_aggregator(make_item: Callable[..., pystac.Item]) -> None:
+    aggregator = aggregate.CollectionAggregator(
+        ["deltares:dem_name", "deltares:sea_level_year", "deltares:resolution"]
+    )
+    n = aggregator.add_items(
+        [
+            make_item("NASADEM", 2050, 100, [0, 0, 10, 10], resolution=None),
+            make_item("LIDAR", 2018, 2, [-20, 5, 5, 40], resolution=None),
+            make_item("LIDAR", 2050, 2, [0, 0, 10, 10], resolution=None).to_dict(),
+        ]
+    )
+    assert n == aggregator.count == 3
+    assert aggregator.summaries() == {
+        "deltares:dem_name": ["LIDAR", "NASADEM"],
+        "deltares:sea_level_year": [2018, 2050],
+    }
+    assert aggregator.bbox == [-20, 0, 10, 40]
+    assert aggregator.start == datetime.datetime(
+        2018, 1, 1, tzinfo=datetime.timezone.utc
+    )
+    assert aggregator.end == datetime.datetime(2050, 1, 1, tzinfo=datetime.timezone.utc)
+
+    dimensions = aggregator.cube_dimensions()
+    assert dimensions["time"]["extent"] == [
+        "2018-01-01T00:00:00Z",
+        "2050-01-01T00:00:00Z",
+    ]
+    assert dimensions["lat"] == {"type": "spatial", "axis": "y", "extent": [0, 40]}
+
+
+def test_apply(make_item: Callable[..., pystac.Item]) -> None:
+    existing = {"time": {"type": "temporal"}, "lon": {"type": "spatial"}}
+    intervals: list[list[datetime.datetime | None]] = [[None, None]]
+    collection = pystac.Collection(
+        "test",
+        "test",
+        pystac.Extent(
+            pystac.SpatialExtent([[-180.0, -90.0, 180.0, 90.0]]),
+            pystac.TemporalExtent(intervals),
+        ),
+        extra_fields={"cube:dimensions": existing},
+    )
+    aggregator = aggregate.CollectionAggregator(["deltares:dem_name"])
+
+    aggregator.apply(collection)
+    assert collection.extent.spatial.bboxes == [[-180, -90, 180, 90]]
+
+    aggregator.add(make_item("LIDAR", 2018, 2, [-20, 5, 5, 40]))
+    aggregator.apply(collection)
+    assert collection.summaries.get_list("deltares:dem_name") == ["LIDAR"]
+    assert collection.extent.spatial.bboxes == [[-20, 5, 5, 40]]
+    assert collection.extent.temporal.intervals[0][0] == datetime.datetime(
+        2018, 1, 1, tzinfo=datetime.timezone.utc
+    )
+    assert set(collection.extra_fields["cube:dimensions"]) == {"time", "lat", "lon"}
+    # The collection's original dimensions aren't modified in place.
+    assert existing == {"time": {"type": "temporal"}, "lon": {"type": "spatial"}}
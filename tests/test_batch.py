@@ -0,0 +1,83 @@
+import datetime
+import json
+import pathlib
+from typing import Any
+
+import pystac
+import pytest
+
+from stactools.deltares import batch
+
+
+def create_item(source: str) -> pystac.Item:
+    if "bad" in source:
+        raise ValueError(f"Can't read {source}")
+    return pystac.Item(
+        pathlib.Path(source).stem, None, None, datetime.datetime(2010, 1, 1), {}
+    )
+
+
+def test_list_sources(tmp_path: pathlib.Path) -> None:
+    for name in ["a.nc", "b.nc", "c.txt"]:
+        (tmp_path / name).touch()
+    list_file = tmp_path / "sources.txt"
+    list_file.write_text("https://example.com/d.nc\n\nhttps://example.com/e.nc\n")
+
+    result = list(
+        batch.list_sources([str(tmp_path / "*.nc")], list_file=str(list_file))
+    )
+    assert result == [
+        str(tmp_path / "a.nc"),
+        str(tmp_path / "b.nc"),
+        "https://example.com/d.nc",
+        "https://example.com/e.nc",
+    ]
+
+
+def test_create_local_item(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a.nc").write_bytes(b"data")
+    prefixes = {f"{tmp_path}/": "https://example.com/floods/"}
+    calls = []
+
+    def create_item(href: str, transform_href: Any = None) -> pystac.Item:
+        calls.append((href, transform_href and transform_href(href)))
+        return pystac.Item("a", None, None, datetime.datetime(2010, 1, 1), {})
+
+    batch.create_local_item(create_item, prefixes, str(tmp_path / "a.nc"))
+    batch.create_local_item(create_item, prefixes, "https://example.com/b.nc")
+    assert calls == [
+        ("https://example.com/floods/a.nc", (tmp_path / "a.nc").as_uri()),
+        ("https://example.com/b.nc", None),
+    ]
+    with pytest.raises(ValueError, match="no prefix"):
+        batch.create_local_item(create_item, {}, str(tmp_path / "a.nc"))
+
+
+@pytest.mark.parametrize("use_threads", [True, False])
+def test_create_items(tmp_path: pathlib.Path, use_threads: bool) -> None:
+    sources = [f"{name}.nc" for name in ["a", "bad", "c", "d", "e"]]
+    results = list(
+        batch.create_items(
+            create_item,
+            sources,
+            str(tmp_path),
+            max_workers=2,
+            use_threads=use_threads,
+        )
+    )
+
+    assert sorted(result.source for result in results) == sorted(sources)
+    failures = [result for result in results if not result.ok]
+    assert len(failures) == 1
+    assert failures[0].source == "bad.nc"
+    assert "Can't read bad.nc" in (failures[0].error or "")
+    assert json.loads(failures[0].to_json())["source"] == "bad.nc"
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "a.json",
+        "c.json",
+        "d.json",
+        "e.json",
+    ]
+    item = pystac.Item.from_file(str(tmp_path / "a.json"))
+    assert item.id == "a"
@@ -0,0 +1,130 @@
+import json
+import pathlib
+from typing import Callable
+
+import pystac
+import pytest
+
+from stactools.deltares import bulk
+
+
+@pytest.fixture
+def items(make_item: Callable[..., pystac.Item]) -> list[pystac.Item]:
+    return [
+        make_item(dem_name, return_period=return_period)
+        for dem_name in ["LIDAR", "NASADEM"]
+        for return_period in [0, 2, 5]
+    ]
+
+
+def test_ndjson_roundtrip(tmp_path: pathlib.Path, items: list[pystac.Item]) -> None:
+    for item in items:
+        pystac.write_file(item, dest_href=str(tmp_path / "items" / f"{item.id}.json"))
+    path = str(tmp_path / "items.ndjson")
+
+    count = bulk.export_items(
+        bulk.read_item_dicts([str(tmp_path / "items" / "*.json")]), ndjson_path=path
+    )
+
+    assert count == 6
+    lines = (tmp_path / "items.ndjson").read_text().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == sorted(x.id for x in items)
+    assert [x["id"] for x in bulk.read_item_dicts([path])] == sorted(
+        x.id for x in items
+    )
+
+
+def test_geoparquet(tmp_path: pathlib.Path, items: list[pystac.Item]) -> None:
+    pytest.importorskip("stac_geoparquet")
+    import pyarrow.parquet
+
+    path = str(tmp_path / "items")
+    with bulk.GeoParquetWriter(
+        path, partition_by="deltares:dem_name", chunk_size=2
+    ) as writer:
+        for item in items:
+            writer.write(item)
+
+    assert writer.count == 6
+    assert sorted(
+        p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.parquet")
+    ) == [
+        "items/deltares:dem_name=LIDAR/part-00000.parquet",
+        "items/deltares:dem_name=LIDAR/part-00001.parquet",
+        "items/deltares:dem_name=NASADEM/part-00000.parquet",
+        "items/deltares:dem_name=NASADEM/part-00001.parquet",
+    ]
+    table = pyarrow.parquet.read_table(
+        f"{path}/deltares:dem_name=LIDAR/part-00000.parquet"
+    )
+    assert table.column("id").to_pylist() == [
+        "LIDAR-90m-2018-0000",
+        "LIDAR-90m-2018-0002",
+    ]
+
+
+def test_geoparquet_partitions(
+    tmp_path: pathlib.Path, make_item: Callable[..., pystac.Item]
+) -> None:
+    pytest.importorskip("stac_geoparquet")
+    import pyarrow.parquet
+
+    path = str(tmp_path / "items")
+    items = [
+        make_item("a/b:c", return_period=return_period) for return_period in [0, 2]
+    ]
+    # Only on the items of the second file.
+    items[1].properties["deltares:extra"] = 1.5
+    with bulk.GeoParquetWriter(
+        path, partition_by="deltares:dem_name", chunk_size=1
+    ) as writer:
+        for item in items:
+            writer.write(item)
+
+    directory = tmp_path / "items" / "deltares:dem_name=a%2Fb%3Ac"
+    tables = [
+        pyarrow.parquet.read_table(directory / name)
+        for name in ["part-00000.parquet", "part-00001.parquet"]
+    ]
+    assert tables[0].schema == tables[1].schema
+    assert tables[0].column("deltares:extra").to_pylist() == [None]
+    assert tables[1].column("deltares:extra").to_pylist() == [1.5]
+
+
+def test_geoparquet_null_geometry(
+    tmp_path: pathlib.Path, items: list[pystac.Item]
+) -> None:
+    pytest.importorskip("stac_geoparquet")
+    import pyarrow.parquet
+
+    items[1].geometry = None
+    items[1].bbox = None
+    path = str(tmp_path / "items")
+    with bulk.GeoParquetWriter(path) as writer:
+        for item in items:
+            writer.write(item)
+
+    assert (writer.count, writer.skipped) == (5, 1)
+    table = pyarrow.parquet.read_table(f"{path}/part-00000.parquet")
+    assert table.column("id").to_pylist() == [
+        item.id for item in items if item.geometry is not None
+    ]
+
+
+def test_geoparquet_fsspec(items: list[pystac.Item]) -> None:
+    pytest.importorskip("stac_geoparquet")
+    import fsspec
+    import pyarrow.parquet
+
+    path = "memory://test-geoparquet-fsspec/items"
+    with bulk.GeoParquetWriter(path, partition_by="deltares:dem_name") as writer:
+        for item in items:
+            writer.write(item)
+
+    assert writer.paths == [
+        f"{path}/deltares:dem_name=LIDAR/part-00000.parquet",
+        f"{path}/deltares:dem_name=NASADEM/part-00000.parquet",
+    ]
+    with fsspec.open(writer.paths[1], "rb") as f:
+        table = pyarrow.parquet.read_table(f)
+    assert table.num_rows == 3
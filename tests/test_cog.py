@@ -0,0 +1,46 @@
+import pathlib
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from stactools.deltares import cog
+
+rasterio = pytest.importorskip("rasterio")
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+def test_write_cog(tmp_path: pathlib.Path, ascending: bool) -> None:
+    lat = np.linspace(-89.75, 89.75, 360)
+    if not ascending:
+        lat = lat[::-1]
+    lon = np.linspace(-179.75, 179.75, 720)
+    data = np.zeros((1, 360, 720), dtype="float32")
+    data[0, lat > 80, :10] = 2.0
+    data[0, lat < -89, -1] = np.nan
+    da = xr.DataArray(
+        data, dims=["time", "lat", "lon"], coords={"lat": lat, "lon": lon}
+    )
+    path = str(tmp_path / "cog.tif")
+
+    cog.write_cog(da, path, blocksize=64, window_blocks=2, max_workers=2)
+
+    with rasterio.open(path) as src:
+        assert src.driver == "GTiff"
+        assert src.profile["tiled"]
+        assert src.block_shapes == [(64, 64)]
+        assert src.overviews(1) == [2, 4, 8, 16]
+        assert src.bounds == (-180, -90, 180, 90)
+        assert src.crs.to_epsg() == 4326
+        result = src.read(1)
+        assert result.shape == (360, 720)
+        assert (result[:20, :10] == 2).all()
+        assert np.nansum(result) == 20 * 10 * 2
+        assert np.isnan(result[-1, -1])
+        assert src.tags(ns="IMAGE_STRUCTURE")["LAYOUT"] == "COG"
+
+
+def test_write_cog_raises() -> None:
+    da = xr.DataArray(np.zeros((2, 2, 2)), dims=["time", "lat", "lon"])
+    with pytest.raises(ValueError, match="2D"):
+        cog.write_cog(da, "cog.tif")
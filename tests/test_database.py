@@ -0,0 +1,52 @@
+from typing import Callable
+
+import pystac
+import pytest
+
+from stactools.deltares import database
+
+
+@pytest.fixture
+def db(make_item: Callable[..., pystac.Item]) -> database.ItemDatabase:
+    db = database.ItemDatabase()
+    db.add_items(
+        make_item(dem_name, year, rp, [0, 0, 10, 10] if rp < 100 else [50, 50, 60, 60])
+        for dem_name in ["LIDAR", "NASADEM"]
+        for year in [2018, 2050]
+        for rp in [0, 2, 100, 250]
+    )
+    return db
+
+
+def test_search(db: database.ItemDatabase) -> None:
+    result = db.search(
+        dem_name="LIDAR",
+        sea_level_year=2050,
+        query={"deltares:return_period": {"gte": 100}},
+    )
+    assert [x.id for x in result] == ["LIDAR-90m-2050-0100", "LIDAR-90m-2050-0250"]
+    assert db.count(query={"deltares:dem_name": {"in": ["LIDAR", "NASADEM"]}}) == 16
+    assert db.count(bbox=[5, 5, 6, 6]) == 8
+    assert db.count(bbox=[5, 5, 6, 6], return_period=100) == 0
+    assert db.count(ids=["LIDAR-90m-2018-0000", "missing"]) == 1
+    assert len(list(db.search(limit=3))) == 3
+
+
+def test_search_raises(db: database.ItemDatabase) -> None:
+    with pytest.raises(ValueError, match="Can't query"):
+        db.count(query={"datetime": {"eq": "2010"}})
+    with pytest.raises(ValueError, match="Unknown operator"):
+        db.count(query={"deltares:return_period": {"like": 1}})
+
+
+def test_replace(
+    db: database.ItemDatabase, make_item: Callable[..., pystac.Item]
+) -> None:
+    item = make_item("LIDAR", 2018, 0, [100, 10, 101, 11])
+    db.add_items([item])
+
+    assert db.count() == 16
+    assert db.count(bbox=[100, 10, 101, 11]) == 1
+    assert db.count(bbox=[5, 5, 6, 6]) == 7
+    (result,) = db.search(ids=[item.id])
+    assert result.bbox == [100, 10, 101, 11]
@@ -0,0 +1,117 @@
+import datetime
+import hashlib
+import io
+import os
+import pathlib
+import tempfile
+import urllib.request
+
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from stactools.deltares import download
+
+
+def test_multihash() -> None:
+    digest = hashlib.sha256(b"").digest()
+    assert download.multihash(digest) == "1220" + digest.hex()
+    # Codes of 128 and over take more than one byte.
+    assert download.multihash(b"\x00", code=0xB220) == "a0e40201" + "00"
+
+
+def test_download(tmp_path: pathlib.Path) -> None:
+    data = os.urandom(100_000)
+    src = tmp_path / "src.nc"
+    src.write_bytes(data)
+    dst = tmp_path / "dst.nc"
+
+    info = download.download(src.as_uri(), filename=str(dst), block_size=4096)
+    assert info.filename == str(dst)
+    assert dst.read_bytes() == data
+    assert info.size == len(data)
+    assert info.checksum == "1220" + hashlib.sha256(data).hexdigest()
+
+    info = download.download(src.as_uri())
+    assert info.filename is not None
+    try:
+        assert info.filename.endswith(".nc")
+        assert info.size == len(data)
+    finally:
+        os.remove(info.filename)
+
+
+def test_add_file_info() -> None:
+    item = pystac.Item("item", None, None, datetime.datetime(2010, 1, 1), {})
+    item.add_asset("data", pystac.Asset("data.nc"))
+    download.add_file_info(
+        item.assets["data"], download.Download("data.nc", 10, "1220abcd")
+    )
+    d = item.to_dict()
+    assert d["assets"]["data"]["file:size"] == 10
+    assert d["assets"]["data"]["file:checksum"] == "1220abcd"
+    assert pystac.extensions.file.FileExtension.get_schema_uri() in d["stac_extensions"]
+
+
+def test_download_to_memory(tmp_path: pathlib.Path) -> None:
+    data = os.urandom(100_000)
+    src = tmp_path / "src.nc"
+    src.write_bytes(data)
+
+    info = download.download(src.as_uri(), block_size=4096, max_memory_size=len(data))
+    assert info.filename is None
+    assert info.buffer == bytearray(data)
+    assert info.checksum == "1220" + hashlib.sha256(data).hexdigest()
+    with info.open() as a, info.open() as b:
+        assert a.read(10) == data[:10]
+        # Each reader has its own position.
+        b.seek(-10, io.SEEK_END)
+        assert b.read() == data[-10:]
+        assert a.read(10) == data[10:20]
+
+    info = download.download(src.as_uri(), max_memory_size=len(data) - 1)
+    assert info.filename is not None
+    try:
+        assert info.buffer is None
+    finally:
+        os.remove(info.filename)
+
+
+def test_download_empty(tmp_path: pathlib.Path) -> None:
+    src = tmp_path / "src.nc"
+    src.write_bytes(b"")
+    for max_memory_size in [0, 100]:
+        info = download.download(src.as_uri(), max_memory_size=max_memory_size)
+        assert info.filename is not None
+        try:
+            assert info.buffer is None
+            assert info.size == 0
+        finally:
+            os.remove(info.filename)
+
+
+def test_download_failure_removes_temporary_file(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    class Response(io.BytesIO):
+        headers: dict[str, str] = {}
+
+        def read(self, size: int | None = -1) -> bytes:
+            if self.tell():
+                raise OSError("Connection reset")
+            return super().read(size)
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(urllib.request, "urlopen", lambda href: Response(b"x" * 100))
+    with pytest.raises(OSError, match="Connection reset"):
+        download.download("https://example.com/data.nc", block_size=10)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_open_dataset_from_memory(tmp_path: pathlib.Path) -> None:
+    ds = xr.Dataset({"inun": (("lat", "lon"), np.arange(12.0).reshape(3, 4))})
+    ds.to_netcdf(tmp_path / "data.nc", engine="h5netcdf")
+    info = download.download((tmp_path / "data.nc").as_uri(), max_memory_size=2**20)
+    with info.open() as f, xr.open_dataset(f, engine="h5netcdf") as result:
+        xr.testing.assert_equal(result.load(), ds)
@@ -0,0 +1,162 @@
+import datetime
+from typing import Any
+
+import numpy as np
+import pystac
+import pytest
+import shapely.geometry
+import xarray as xr
+
+from stactools.deltares import extract
+
+
+@pytest.fixture
+def da() -> xr.DataArray:
+    lat = np.arange(89.5, -90, -1.0)
+    lon = np.arange(-179.5, 180, 1.0)
+    values = np.arange(len(lat) * len(lon), dtype="float32").reshape(len(lat), -1)
+    return xr.DataArray(
+        values[np.newaxis],
+        dims=("time", "lat", "lon"),
+        coords={"time": [0], "lat": lat, "lon": lon},
+        name="inun",
+    ).chunk({"lat": 50, "lon": 100})
+
+
+def test_nearest_index() -> None:
+    coord = np.array([1.5, 0.5, -0.5])
+    result = extract.nearest_index(coord, np.array([1.4, 0.9, -0.9, -1.1, 2.1, np.nan]))
+    np.testing.assert_array_equal(result, [0, 1, 2, -1, -1, -1])
+
+
+def test_chunk_sizes(da: xr.DataArray) -> None:
+    assert extract.chunk_sizes(da, ["lat", "lon"]) == (50, 100)
+    loaded = da.load()
+    loaded.encoding["chunksizes"] = (1, 10, 20)
+    assert extract.chunk_sizes(loaded, ["lat", "lon"]) == (10, 20)
+
+
+def test_extract_points(da: xr.DataArray) -> None:
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-180, 180, 1000)
+    lat = rng.uniform(-90, 90, 1000)
+    lon[0], lat[0] = 200, 0
+
+    result = extract.extract_points(da, lon, lat)
+    assert result.dims == ("time", "point")
+    assert np.isnan(result[0, 0])
+    expected = da.sel(
+        lon=xr.DataArray(lon[1:]), lat=xr.DataArray(lat[1:]), method="nearest"
+    )
+    np.testing.assert_array_equal(result[:, 1:], expected)
+
+
+def test_gather_reads_each_chunk_once(
+    da: xr.DataArray, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    reads = []
+    isel = xr.DataArray.isel
+
+    def counting_isel(self: xr.DataArray, *args: Any, **kwargs: Any) -> xr.DataArray:
+        reads.append(args)
+        return isel(self, *args, **kwargs)
+
+    monkeypatch.setattr(xr.DataArray, "isel", counting_isel)
+    result = extract.gather(da, np.array([0, 1, 2, 60, 0]), np.array([0, 1, 2, 0, 150]))
+    monkeypatch.undo()
+    assert len(reads) == 3
+    np.testing.assert_array_equal(
+        result[0], da.values[0, [0, 1, 2, 60, 0], [0, 1, 2, 0, 150]]
+    )
+
+
+def test_extract_regions(da: xr.DataArray) -> None:
+    geometries = [
+        shapely.geometry.box(0, 0, 2, 2),
+        shapely.geometry.box(0, 0, 1, 1),
+        shapely.geometry.box(500, 500, 501, 501),
+    ]
+    result = extract.extract_regions(da, geometries)
+    cells = da.sel(lat=slice(2, 0), lon=slice(0, 2))
+    assert result["count"].values.tolist() == [[4, 1, 0]]
+    assert result["flooded"].values.tolist() == [[4, 1, 0]]
+    assert result["mean"][0, 0] == float(cells.mean())
+    assert result["max"][0, 0] == float(cells.max())
+    assert np.isnan(result["max"][0, 2])
+
+
+def test_extract_regions_empty(da: xr.DataArray) -> None:
+    result = extract.extract_regions(da, [shapely.geometry.box(500, 500, 501, 501)])
+    assert result["count"].values.tolist() == [[0]]
+    assert result["flooded"].values.tolist() == [[0]]
+    assert np.isnan(result["mean"][0, 0])
+    assert np.isnan(result["max"][0, 0])
+
+
+def test_extract_regions_reads_each_chunk_once(
+    da: xr.DataArray, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    geometries = [
+        shapely.geometry.Point(0, 0).buffer(60),
+        shapely.geometry.box(-10, -10, 10, 10),
+        shapely.geometry.box(170, 80, 180, 90),
+    ]
+    region, y_index, x_index = extract.region_indices(
+        geometries, da["lon"].values, da["lat"].values
+    )
+    values = da.values[0, y_index, x_index]
+
+    reads = []
+    isel = xr.DataArray.isel
+
+    def counting_isel(self: xr.DataArray, *args: Any, **kwargs: Any) -> xr.DataArray:
+        reads.append(args)
+        return isel(self, *args, **kwargs)
+
+    monkeypatch.setattr(xr.DataArray, "isel", counting_isel)
+    result = extract.extract_regions(da, geometries)
+    monkeypatch.undo()
+    # Rows 0-149 and columns 100-299 for the first two, and the last chunk.
+    assert len(reads) == 3 * 2 + 1
+    assert result["count"].values[0].tolist() == np.bincount(region).tolist()
+    np.testing.assert_allclose(
+        result["mean"].values[0],
+        np.bincount(region, weights=values) / np.bincount(region),
+    )
+    assert result["max"].values[0].tolist() == [
+        values[region == i].max() for i in range(3)
+    ]
+
+
+def test_region_indices_blocks(da: xr.DataArray) -> None:
+    geometries = [
+        shapely.geometry.Point(0, 0).buffer(10),
+        shapely.geometry.box(0, 0, 2, 2),
+    ]
+    x, y = da["lon"].values, da["lat"].values
+    expected = extract.region_indices(geometries, x, y)
+    result = extract.region_indices(geometries, x, y, max_block_cells=25)
+    for a, b in zip(result, expected):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_extract_items(da: xr.DataArray) -> None:
+    items = []
+    datasets = {}
+    for return_period in [2, 100]:
+        item = pystac.Item(
+            f"LIDAR-90m-2018-{return_period:04d}",
+            None,
+            None,
+            datetime.datetime(2010, 1, 1),
+            {"deltares:return_period": return_period},
+        )
+        items.append(item)
+        datasets[item.id] = (da * return_period).to_dataset()
+
+    result = extract.extract_items(
+        items, [0.5, 10.5], [0.5, -10.5], open_item=lambda item: datasets[item.id]
+    )
+    assert result.dims == ("item", "point")
+    assert result.return_period.values.tolist() == [2, 100]
+    np.testing.assert_array_equal(result[1], result[0] * 50)
@@ -0,0 +1,84 @@
+from typing import Any, Iterator
+
+import numpy as np
+import pytest
+import shapely.geometry
+import xarray as xr
+
+from stactools.deltares import footprints
+
+
+@pytest.fixture
+def inun() -> xr.DataArray:
+    lat = np.linspace(89.5, -89.5, 180)
+    lon = np.linspace(-179.5, 179.5, 360)
+    data = np.zeros((1, 180, 360), dtype="float32")
+    data[0, 40:45, 10:20] = 1.0  # 45N-50N, 170W-160W
+    data[0, 100:102, 300:302] = np.nan
+    data[0, 120:130, 350:360] = 0.5  # 30S-40S, 170E-180E
+    return xr.DataArray(
+        data, dims=["time", "lat", "lon"], coords={"lat": lat, "lon": lon}
+    )
+
+
+def test_coarse_mask(inun: xr.DataArray) -> None:
+    mask = footprints.coarse_mask(inun, factor=10, max_block_cells=400)
+    assert mask.shape == (18, 36)
+    assert mask.sum() == 2
+    assert mask[4, 1] and mask[12, 35]
+
+
+def test_compute_footprint(inun: xr.DataArray) -> None:
+    result = footprints.compute_footprint(inun, resolution=5)
+    assert isinstance(result, shapely.geometry.MultiPolygon)
+    assert result.bounds == (-170.0, -40.0, 180.0, 50.0)
+    assert result.area == pytest.approx(10 * 5 + 10 * 10)
+
+
+def test_compute_footprint_empty(inun: xr.DataArray) -> None:
+    assert footprints.compute_footprint(inun * 0) is None
+    geometry, bbox = footprints.footprint_to_stac(None)
+    assert shapely.geometry.shape(geometry).equals(footprints.GLOBE)
+    assert bbox == [-180.0, -90.0, 180.0, 90.0]
+
+
+def test_footprint_with_statistics(inun: xr.DataArray) -> None:
+    from stactools.deltares import stats
+
+    factor = footprints.footprint_factor(inun.lon.values, resolution=5)
+    mask = footprints.CoarseMask((180, 360), factor)
+    statistics, _ = stats.flood_statistics(inun, max_block_cells=3000, mask=mask)
+    assert statistics.count == 50 + 100
+    result = footprints.mask_footprint(
+        mask.mask, inun.lon.values, inun.lat.values, factor
+    )
+    assert result == footprints.compute_footprint(inun, resolution=5)
+
+
+def test_footprint_with_statistics_bounded_blocks(
+    inun: xr.DataArray, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from stactools.deltares import stats, utils
+
+    factor = footprints.footprint_factor(inun.lon.values, resolution=5)
+    expected = footprints.CoarseMask((180, 360), factor)
+    expected_statistics, expected_area = stats.flood_statistics(inun, mask=expected)
+
+    sizes = []
+
+    def record(da: xr.DataArray, sizes_: dict[str, int]) -> Iterator[Any]:
+        for key, values in utils.iter_blocks(da, sizes_):
+            sizes.append(values.size)
+            yield key, values
+
+    monkeypatch.setattr(stats, "iter_blocks", record)
+    mask = footprints.CoarseMask((180, 360), factor)
+    statistics, flooded_area = stats.flood_statistics(
+        inun, max_block_cells=1000, mask=mask
+    )
+    assert len(sizes) > 180 // factor
+    assert max(sizes) <= 1000
+    assert (mask.mask == expected.mask).all()
+    assert statistics.to_dict() == pytest.approx(expected_statistics.to_dict())
+    assert (statistics.buckets == expected_statistics.buckets).all()
+    assert flooded_area == pytest.approx(expected_area)
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+# Modules that registering the CLI commands shouldn't import.
+HEAVY_MODULES = [
+    "xarray",
+    "xstac",
+    "pandas",
+    "dask",
+    "kerchunk",
+    "planetary_computer",
+    "azure.storage.blob",
+    "stactools.deltares.stac",
+]
+#: Seconds allowed for registering the commands, beyond importing stactools.core.
+BUDGET = float(os.environ.get("STACTOOLS_DELTARES_IMPORT_BUDGET", "1.0"))
+
+CODE = """
+import json
+import sys
+import time
+
+import stactools.core
+
+start = time.perf_counter()
+import click
+
+import stactools.deltares
+
+group = click.Group()
+registry = type("Registry", (), {"register_subcommand": lambda self, f: f(group)})
+stactools.deltares.register_plugin(registry())
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": list(sys.modules)}))
+"""
+
+
+def test_register_plugin_is_lazy() -> None:
+    output = subprocess.run(
+        [sys.executable, "-c", CODE], capture_output=True, check=True, text=True
+    ).stdout
+    result = json.loads(output)
+    assert [m for m in HEAVY_MODULES if m in result["modules"]] == []
+    assert result["seconds"] < BUDGET, f"Registering took {result['seconds']:.2f}s"
+
+
+def test_lazy_attributes() -> None:
+    import stactools.deltares
+    import stactools.deltares.availability
+
+    assert callable(stactools.deltares.create_item)
+    assert stactools.deltares.availability.rechunk.DEFAULT_GRAND_IDS_PER_CHUNK == 4
@@ -0,0 +1,35 @@
+import pathlib
+import time
+
+from stactools.deltares import profiling
+
+
+def busy(seconds: float) -> int:
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def test_profile() -> None:
+    result, stacks = profiling.profile(busy, 0.2, interval=0.005)
+    assert result > 0
+    assert sum(stacks.values()) > 10
+    # Nearly every sample is inside busy, called from profile.
+    in_busy = sum(
+        count
+        for stack, count in stacks.items()
+        if stack.endswith(":busy") and "stactools.deltares.profiling:profile" in stack
+    )
+    assert in_busy >= 0.9 * sum(stacks.values())
+
+
+def test_merge_and_folded(tmp_path: pathlib.Path) -> None:
+    merged = profiling.merge([{"a;b": 2, "a": 1}, {"a;b": 3}])
+    assert merged == {"a;b": 5, "a": 1}
+
+    path = str(tmp_path / "profile.folded")
+    profiling.write_folded(merged, path)
+    assert pathlib.Path(path).read_text() == "a 1\na;b 5\n"
+    assert profiling.read_folded(path) == merged
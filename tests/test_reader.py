@@ -0,0 +1,164 @@
+import datetime
+import json
+import os
+import pathlib
+from typing import Any
+
+import numpy as np
+import pystac
+import pytest
+import xarray as xr
+
+from stactools.deltares import reader
+
+
+@pytest.fixture
+def item(tmp_path: pathlib.Path) -> pystac.Item:
+    import kerchunk.hdf
+
+    ds = xr.Dataset(
+        {
+            "inun": (
+                ("lat", "lon"),
+                np.arange(200 * 300, dtype="float32").reshape(200, 300),
+            )
+        },
+        coords={"lat": np.arange(200.0), "lon": np.arange(300.0)},
+    )
+    path = tmp_path / "data.nc"
+    ds.to_netcdf(path, engine="h5netcdf", encoding={"inun": {"chunksizes": (50, 100)}})
+    with open(path, "rb") as f:
+        refs = kerchunk.hdf.SingleHdf5ToZarr(f, path.as_uri()).translate()
+    (tmp_path / "data.json").write_text(json.dumps(refs))
+
+    item = pystac.Item("data", None, None, datetime.datetime(2010, 1, 1), {})
+    item.add_asset("data", pystac.Asset(str(path)))
+    item.add_asset("index", pystac.Asset(str(tmp_path / "data.json")))
+    return item
+
+
+def test_open_item(item: pystac.Item) -> None:
+    reader.load_references.cache_clear()
+    ds = reader.open_item(item)
+    expected = xr.open_dataset(item.assets["data"].href, engine="h5netcdf")
+    xr.testing.assert_equal(ds.load(), expected.load())
+
+    reader.open_item(item)
+    info = reader.load_references.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_load_references_transform_href(item: pystac.Item) -> None:
+    reader.load_references.cache_clear()
+    hrefs = []
+
+    def sign(href: str) -> str:
+        hrefs.append(href)
+        return href
+
+    for _ in range(2):
+        reader.open_item(item, transform_href=sign)
+    # The references are cached by the href before it's transformed.
+    assert hrefs == [item.assets["index"].href]
+
+
+def test_open_item_chunk_cache(item: pystac.Item, tmp_path: pathlib.Path) -> None:
+    chunk_size = 50 * 100 * 4
+    cache = reader.ChunkCache(str(tmp_path / "cache"))
+    ds = reader.open_item(item, chunk_cache=cache)
+    ds.inun[:50, :100].load()
+    assert cache.hits == 0
+    size = cache.size
+    assert size >= chunk_size
+
+    # A second session only reads the chunks it hasn't seen before.
+    cache = reader.ChunkCache(str(tmp_path / "cache"))
+    assert cache.size == size
+    ds = reader.open_item(item, chunk_cache=cache)
+    result = ds.inun[:50, :200].values
+    np.testing.assert_array_equal(
+        result, np.arange(200 * 300, dtype="float32").reshape(200, 300)[:50, :200]
+    )
+    assert cache.hits > 0
+    assert cache.size == size + chunk_size
+
+
+def test_chunk_cache_eviction(tmp_path: pathlib.Path) -> None:
+    cache = reader.ChunkCache(str(tmp_path), max_size=25)
+    cache.put("a", bytes(10))
+    cache.put("b", bytes(10))
+    os.utime(tmp_path / "a", (1, 1))
+    os.utime(tmp_path / "b", (2, 2))
+    # Reading "a" makes "b" the least recently used.
+    assert cache.get("a") == bytes(10)
+    cache.put("c", bytes(10))
+
+    assert cache.size == 20
+    assert cache.get("b") is None
+    assert cache.get("c") == bytes(10)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    assert reader.ChunkCache(str(tmp_path), max_size=15).size == 10
+
+
+def test_chunk_cache_put_existing(tmp_path: pathlib.Path) -> None:
+    cache = reader.ChunkCache(str(tmp_path), max_size=25)
+    cache.put("a", bytes(10))
+    cache.put("a", bytes(10))
+    cache.put("b", bytes(10))
+    assert cache.size == 20
+    assert cache.get("a") == bytes(10)
+
+
+def test_open_item_without_index(item: pystac.Item) -> None:
+    del item.assets["index"]
+    with pytest.raises(ValueError, match="index"):
+        reader.open_item(item)
+
+
+def test_cat_chunks(item: pystac.Item) -> None:
+    refs = reader.load_references(item.assets["index"].href)
+    fs = reader.CoalescingReferenceFileSystem(refs)
+    keys = [f"inun/{i}.{j}" for i in range(4) for j in range(3)]
+    assert all(fs.coalesces(key) for key in keys)
+    assert not fs.coalesces("inun/.zarray")
+
+    result = fs.cat_chunks(keys)
+    assert result == {key: fs.cat_file(key) for key in keys}
+    assert (fs.chunks, fs.requests) == (12, 1)
+
+    fs = reader.CoalescingReferenceFileSystem(refs, max_gap=0, max_block=1)
+    fs.cat_chunks(keys)
+    assert (fs.chunks, fs.requests) == (12, 12)
+
+
+def test_open_item_coalesce(
+    item: pystac.Item, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    batches = []
+    cat_chunks = reader.CoalescingReferenceFileSystem.cat_chunks
+
+    def counting_cat_chunks(self: Any, paths: Any) -> Any:
+        batches.append(sorted(paths))
+        return cat_chunks(self, paths)
+
+    monkeypatch.setattr(
+        reader.CoalescingReferenceFileSystem, "cat_chunks", counting_cat_chunks
+    )
+    expected = np.arange(200 * 300, dtype="float32").reshape(200, 300)
+    ds = reader.open_item(item, coalesce=True)
+    batches.clear()
+    np.testing.assert_array_equal(
+        ds.inun[20:120, 50:250].values, expected[20:120, 50:250]
+    )
+    # The 3 x 3 chunks of the window are read together.
+    assert len(batches) == 1
+    assert len(batches[0]) == 9
+
+    cache = reader.ChunkCache(str(tmp_path / "cache"))
+    ds = reader.open_item(item, coalesce=True, chunk_cache=cache)
+    np.testing.assert_array_equal(ds.inun.values, expected)
+    ds = reader.open_item(item, coalesce=True, chunk_cache=cache)
+    np.testing.assert_array_equal(ds.inun.values, expected)
+    # The chunks of inun, lat and lon all come from the cache.
+    assert (cache.hits, cache.misses) == (14, 14)
@@ -0,0 +1,109 @@
+import datetime
+import json
+import pathlib
+from typing import Any
+
+import pystac
+
+from stactools.deltares import relocate
+
+OLD = "https://deltaresfloodssa.blob.core.windows.net/floods/v2021.06/"
+NEW = "https://example.blob.core.windows.net/floods/v2022.01/"
+
+
+def make_refs() -> dict[str, Any]:
+    return {
+        "version": 1,
+        "templates": {"u": OLD + "global/LIDAR/5km/a.nc"},
+        "refs": {
+            ".zgroup": '{"zarr_format":2}',
+            "inun/0.0": ["{{u}}", 100, 50],
+            "lat/0": [OLD + "global/LIDAR/5km/a.nc", 0, 10],
+            "lon/0": ["https://elsewhere.example.com/a.nc", 0, 10],
+            "time/0": "base64:AAAA",
+        },
+    }
+
+
+def test_replace_prefix() -> None:
+    prefixes = {OLD: NEW, OLD + "global/": "s3://bucket/"}
+    assert relocate.replace_prefix(OLD + "global/a.nc", prefixes) == "s3://bucket/a.nc"
+    assert relocate.replace_prefix(OLD + "a.nc", prefixes) == NEW + "a.nc"
+    assert relocate.replace_prefix("https://other/a.nc", prefixes) == (
+        "https://other/a.nc"
+    )
+
+
+def test_relocate_references() -> None:
+    refs, count = relocate.relocate_references(make_refs(), {OLD: NEW})
+    assert count == 2
+    assert refs["templates"]["u"] == NEW + "global/LIDAR/5km/a.nc"
+    assert refs["refs"]["inun/0.0"] == ["{{u}}", 100, 50]
+    assert refs["refs"]["lat/0"] == [NEW + "global/LIDAR/5km/a.nc", 0, 10]
+    assert refs["refs"]["lon/0"][0] == "https://elsewhere.example.com/a.nc"
+    assert refs["refs"][".zgroup"] == '{"zarr_format":2}'
+
+    # Version 0 references are a flat mapping.
+    refs, count = relocate.relocate_references(make_refs()["refs"], {OLD: NEW})
+    assert count == 1
+    assert refs["lat/0"][0].startswith(NEW)
+
+
+def test_relocate_files(tmp_path: pathlib.Path) -> None:
+    for i in range(5):
+        (tmp_path / f"{i}.json").write_text(json.dumps(make_refs()))
+    (tmp_path / "other.json").write_text(json.dumps({"a": ["s3://a.nc", 0, 1]}))
+
+    results = list(
+        relocate.relocate_files([str(tmp_path / "*.json")], {OLD: NEW}, max_workers=2)
+    )
+    assert len(results) == 6
+    assert sorted(result.count for result in results) == [0, 2, 2, 2, 2, 2]
+    refs = json.loads((tmp_path / "0.json").read_text())
+    assert refs["templates"]["u"].startswith(NEW)
+
+    missing = list(relocate.relocate_files([str(tmp_path / "missing.json")], {}))
+    assert missing[0].error is not None
+
+
+def test_relocate_files_output_dir_collision(tmp_path: pathlib.Path) -> None:
+    for name in ["a", "b"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "0.json").write_text(json.dumps(make_refs()))
+    output_dir = tmp_path / "output"
+
+    results = list(
+        relocate.relocate_files(
+            [str(tmp_path / "a" / "0.json"), str(tmp_path / "b" / "0.json")],
+            {OLD: NEW},
+            output_dir=str(output_dir),
+        )
+    )
+    errors = {result.source: result.error for result in results}
+    assert errors[str(tmp_path / "a" / "0.json")] is None
+    assert "Another source" in (errors[str(tmp_path / "b" / "0.json")] or "")
+
+
+def test_relocate_items(tmp_path: pathlib.Path) -> None:
+    item = pystac.Item("item", None, None, datetime.datetime(2010, 1, 1), {})
+    item.add_asset("data", pystac.Asset(OLD + "global/a.nc"))
+    item.add_asset("index", pystac.Asset(OLD + "references/a.json"))
+    item.add_asset("cog", pystac.Asset(OLD + "cog/a.tif"))
+    (tmp_path / "items.ndjson").write_text(json.dumps(item.to_dict()) + "\n" * 2)
+    output_dir = tmp_path / "output"
+
+    (result,) = relocate.relocate_files(
+        [str(tmp_path / "items.ndjson")],
+        {OLD: NEW},
+        kind="items",
+        output_dir=str(output_dir),
+    )
+    assert result.count == 2
+
+    (line,) = (output_dir / "items.ndjson").read_text().splitlines()
+    assets = json.loads(line)["assets"]
+    assert assets["data"]["href"] == NEW + "global/a.nc"
+    assert assets["index"]["href"] == NEW + "references/a.json"
+    assert assets["cog"]["href"] == OLD + "cog/a.tif"
+    # The source is unchanged.
+    assert OLD + "global/a.nc" in (tmp_path / "items.ndjson").read_text()
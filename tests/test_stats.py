@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from stactools.deltares import stats
+
+
+def test_running_statistics() -> None:
+    values = np.array([[1.0, 2.0, np.nan], [4.0, 8.0, 16.0], [np.nan] * 3])
+    result = stats.RunningStatistics((0.0, 10.0), 5)
+    for block in values:
+        result.update(block)
+
+    expected = values[np.isfinite(values)]
+    assert result.to_dict() == pytest.approx(
+        {
+            "minimum": 1.0,
+            "maximum": 16.0,
+            "mean": expected.mean(),
+            "stddev": expected.std(),
+            "valid_percent": 100 * 5 / 9,
+        }
+    )
+    assert result.histogram() == {
+        "count": 5,
+        "min": 0.0,
+        "max": 10.0,
+        "buckets": [1, 1, 1, 0, 2],
+    }
+
+
+def test_running_statistics_empty() -> None:
+    result = stats.RunningStatistics()
+    result.update(np.array([np.nan]))
+    assert result.to_dict() == {"valid_percent": 0.0}
+    assert result.histogram() is None
+
+
+def test_flood_statistics() -> None:
+    data = np.zeros((1, 180, 360), dtype="float32")
+    data[0, :90, :] = 0.5
+    data[0, 0, 0] = 12.0
+    da = xr.DataArray(
+        data,
+        dims=["time", "lat", "lon"],
+        coords={"lat": np.linspace(89.5, -89.5, 180), "lon": np.arange(-179.5, 180)},
+    )
+    result, flooded_area = stats.flood_statistics(da, max_block_cells=1000)
+
+    # Dry cells aren't counted.
+    assert result.count == 90 * 360
+    assert result.to_dict()["valid_percent"] == pytest.approx(50.0)
+    assert result.minimum == 0.5
+    assert result.maximum == 12.0
+    assert result.buckets.sum() == 90 * 360
+    assert result.buckets[-1] == 1
+    # The northern hemisphere
+    assert flooded_area == pytest.approx(2 * np.pi * stats.EARTH_RADIUS_KM**2)
+
+
+def test_dataset_statistics() -> None:
+    ds = xr.Dataset(
+        {
+            "P": (("time", "GrandID"), np.arange(20.0).reshape(10, 2)),
+            "latitude": ("GrandID", [1.0, 2.0]),
+        }
+    )
+    result = stats.dataset_statistics(ds, max_block_cells=4)
+    assert list(result) == ["P"]
+    assert result["P"].to_dict()["mean"] == pytest.approx(9.5)
+    assert result["P"].to_dict()["stddev"] == pytest.approx(np.arange(20.0).std())
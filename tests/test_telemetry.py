@@ -0,0 +1,73 @@
+import pathlib
+import pickle
+
+import pytest
+
+from stactools.deltares import telemetry
+
+
+def test_recorder() -> None:
+    recorder = telemetry.Recorder("a.nc")
+    with recorder.span("download") as span:
+        span.bytes_read = 100
+    with recorder.span("upload_item", skipped=True):
+        pass
+    with pytest.raises(ValueError):
+        with recorder.span("create_item"):
+            raise ValueError("bad file")
+
+    download, upload, create = recorder.spans
+    assert (download.key, download.bytes_read) == ("a.nc", 100)
+    assert download.seconds >= 0
+    assert upload.skipped
+    assert create.error == "ValueError: bad file"
+    if download.peak_rss is not None:
+        assert download.peak_rss > 0
+
+
+def make_spans() -> list[telemetry.Span]:
+    return [
+        telemetry.Span(
+            "download", key=str(i), start=1000 + i, seconds=i + 1, bytes_read=100
+        )
+        for i in range(4)
+    ] + [telemetry.Span("upload_item", key="0", skipped=True, error="Error")]
+
+
+def test_summarize() -> None:
+    summary = telemetry.summarize(make_spans())
+    assert list(summary) == ["download", "upload_item"]
+    download = summary["download"]
+    assert download["count"] == 4
+    assert download["total"] == 10
+    assert download["max"] == 4
+    assert download["p50"] == 2.5
+    assert download["bytes_read"] == 400
+    assert download["throughput"] == 40
+    assert summary["upload_item"]["skipped"] == 1
+    assert summary["upload_item"]["errors"] == 1
+
+    report = telemetry.format_report(make_spans())
+    assert report.splitlines()[1].startswith("download")
+    assert report.splitlines()[-1].startswith("4 files in 7.0 s")
+
+
+def test_format_report_failed_task() -> None:
+    spans = make_spans()
+    # A task that failed before recording any spans of its own.
+    spans.append(telemetry.Span("do_one", key="4", error="OSError: lost"))
+    report = telemetry.format_report(spans)
+    assert report.splitlines()[-1].startswith("5 files in 7.0 s")
+
+
+def test_recorded_error() -> None:
+    error = telemetry.RecordedError("ValueError: bad file", make_spans())
+    result = pickle.loads(pickle.dumps(error))
+    assert str(result) == "ValueError: bad file"
+    assert result.spans == make_spans()
+
+
+def test_write_spans(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "spans.ndjson")
+    telemetry.write_spans(make_spans(), path)
+    assert telemetry.read_spans(path) == make_spans()
@@ -0,0 +1,89 @@
+import pathlib
+from typing import Callable
+
+import pystac
+import pytest
+
+from stactools.deltares import validation
+
+EXTENSION = "https://example.com/deltares/v1.0.0/schema.json"
+SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "properties": {
+        "properties": {
+            "type": "object",
+            "required": ["deltares:dem_name"],
+            "properties": {"deltares:dem_name": {"type": "string"}},
+        }
+    },
+}
+
+
+@pytest.fixture
+def cache_dir(tmp_path: pathlib.Path) -> str:
+    validation.SchemaCache(str(tmp_path)).save(EXTENSION, SCHEMA)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def make_extension_item(
+    make_item: Callable[..., pystac.Item]
+) -> Callable[..., pystac.Item]:
+    def make(dem_name: object = "LIDAR") -> pystac.Item:
+        item = make_item(dem_name)
+        item.stac_extensions.append(EXTENSION)
+        return item
+
+    return make
+
+
+def test_schema_cache(cache_dir: str) -> None:
+    cache = validation.SchemaCache(cache_dir, fetch=False)
+    assert cache.get(EXTENSION) == SCHEMA
+    assert cache.filename(EXTENSION).startswith(cache_dir)
+    with pytest.raises(validation.SchemaNotCachedError, match="fetch-schemas"):
+        cache.get("https://example.com/missing/v1.0.0/schema.json")
+
+
+def test_default_cache_dir(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(validation.SCHEMA_CACHE_ENV, "/tmp/schemas")
+    assert validation.default_cache_dir() == "/tmp/schemas"
+
+
+def test_iter_errors(
+    cache_dir: str, make_extension_item: Callable[..., pystac.Item]
+) -> None:
+    validator = validation.CachedSchemaValidator(cache_dir, fetch=False)
+    assert list(validator.iter_errors(make_extension_item().to_dict())) == []
+
+    (error,) = validator.iter_errors(make_extension_item(dem_name=1).to_dict())
+    assert error.startswith(EXTENSION)
+    assert "properties/deltares:dem_name" in error
+
+
+def test_use_cached_schemas(
+    cache_dir: str, make_extension_item: Callable[..., pystac.Item]
+) -> None:
+    original = pystac.validation.RegisteredValidator.get_validator()
+    try:
+        validation.use_cached_schemas(cache_dir, fetch=False)
+        make_extension_item().validate()
+        with pytest.raises(pystac.STACValidationError):
+            make_extension_item(dem_name=1).validate()
+    finally:
+        pystac.validation.set_validator(original)
+
+
+def test_validate_dicts(
+    cache_dir: str, make_extension_item: Callable[..., pystac.Item]
+) -> None:
+    dicts = [
+        make_extension_item(dem_name).to_dict() for dem_name in ["LIDAR", 1, "NASADEM"]
+    ]
+    result = list(
+        validation.validate_dicts(
+            dicts, cache_dir=cache_dir, fetch=False, max_workers=2, chunksize=1
+        )
+    )
+    assert [len(errors) for _, errors in result] == [0, 1, 0]